@@ -2,7 +2,9 @@
 Django settings for Kuberns CRM project.
 """
 import os
+import tempfile
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.AuditLogMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -74,6 +78,13 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Use SQLite for development, PostgreSQL for production
 USE_POSTGRES = config('USE_POSTGRES', default=False, cast=bool)
 
+# Connection reuse. With PostgreSQL, DB_POOL (default) keeps a psycopg connection pool per
+# process: DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections, each checked before it is handed
+# out and replaced after DB_POOL_MAX_LIFETIME seconds; requests wait up to DB_POOL_TIMEOUT
+# seconds for a free one. Without the pool, DB_CONN_MAX_AGE keeps one connection per thread.
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=0, cast=int)
+
 if USE_POSTGRES:
     DATABASES = {
         'default': {
@@ -83,16 +94,57 @@ if USE_POSTGRES:
             'PASSWORD': config('DB_PASSWORD', default='postgres'),
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='5432'),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
+    if DB_POOL:
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+                'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+                'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
         }
     }
 
+# Read replica (core.replicas). With PostgreSQL set REPLICA_DB_HOST (and/or REPLICA_DB_NAME for a
+# second database on the same server); with SQLite set REPLICA_DB_NAME to a copy of db.sqlite3.
+REPLICA_DB_HOST = config('REPLICA_DB_HOST', default='')
+REPLICA_DB_NAME = config('REPLICA_DB_NAME', default='')
+if USE_POSTGRES and (REPLICA_DB_HOST or REPLICA_DB_NAME):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DB_NAME or DATABASES['default']['NAME'],
+        'HOST': REPLICA_DB_HOST or DATABASES['default']['HOST'],
+        'PORT': config('REPLICA_DB_PORT', default=DATABASES['default']['PORT']),
+    }
+elif not USE_POSTGRES and REPLICA_DB_NAME:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / REPLICA_DB_NAME,
+    }
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Reads stay on the primary for REPLICA_PIN_SECONDS after a client's write, and while the
+# replica is more than REPLICA_MAX_LAG_SECONDS behind (checked every REPLICA_CHECK_SECONDS)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_PIN_COOKIE = config('REPLICA_PIN_COOKIE', default='use_primary')
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=float)
+REPLICA_CHECK_SECONDS = config('REPLICA_CHECK_SECONDS', default=5, cast=float)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -137,6 +189,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'EXCEPTION_HANDLER': 'core.exceptions.exception_handler',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_FILTER_BACKENDS': [
@@ -146,6 +208,80 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Rate limiting (core.throttling): every user gets THROTTLE_BURST tokens, refilled at
+# THROTTLE_RATE per second; requests cost their view's throttle_costs entry or
+# THROTTLE_DEFAULT_COST. Buckets are shared by the worker processes through THROTTLE_FILE.
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_RATE = config('THROTTLE_RATE', default=10, cast=float)
+THROTTLE_BURST = config('THROTTLE_BURST', default=100, cast=float)
+THROTTLE_DEFAULT_COST = config('THROTTLE_DEFAULT_COST', default=1, cast=float)
+THROTTLE_FILE = config('THROTTLE_FILE', default=os.path.join(tempfile.gettempdir(), 'kuberns-crm-throttle'))
+THROTTLE_SLOTS = config('THROTTLE_SLOTS', default=65536, cast=int)
+if THROTTLE_ENABLED:
+    REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = ['core.throttling.TokenBucketThrottle']
+
+# Response compression (core.middleware.CompressionMiddleware)
+# Encodings are listed in server preference order; br and zstd need the
+# brotli and zstandard packages.
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+
+# Phone numbers without a country code are assumed to be Indian
+PHONE_DEFAULT_COUNTRY_CODE = config('PHONE_DEFAULT_COUNTRY_CODE', default='91')
+PHONE_LOOKUP_CACHE_SIZE = config('PHONE_LOOKUP_CACHE_SIZE', default=10000, cast=int)
+
+# Duplicate lead detection (leads.dedup)
+DEDUP_THRESHOLD = config('DEDUP_THRESHOLD', default=0.5, cast=float)
+DEDUP_MAX_BLOCK_SIZE = config('DEDUP_MAX_BLOCK_SIZE', default=100, cast=int)
+
+# Lead scoring (leads.scoring); weights are applied to features scaled to [0, 1]
+LEAD_SCORE_WEIGHTS = {
+    'intent': 30,
+    'interest_level': 25,
+    'cloud_spending': 20,
+    'decision_maker': 15,
+    'client_type': 10,
+}
+LEAD_SCORE_SPEND_CAP = config('LEAD_SCORE_SPEND_CAP', default=500000, cast=float)
+
+# Win forecasting (leads.forecast)
+FORECAST_LOOKBACK_WEEKS = config('FORECAST_LOOKBACK_WEEKS', default=26, cast=int)
+FORECAST_PRIOR_WEIGHT = config('FORECAST_PRIOR_WEIGHT', default=20, cast=float)
+FORECAST_CACHE_SECONDS = config('FORECAST_CACHE_SECONDS', default=3600, cast=int)
+
+# Lead auto-assignment (leads.assignment); rep loads are recounted every ASSIGNMENT_LOAD_TTL seconds
+LEAD_AUTO_ASSIGN = config('LEAD_AUTO_ASSIGN', default=True, cast=bool)
+ASSIGNMENT_LOAD_TTL = config('ASSIGNMENT_LOAD_TTL', default=60, cast=int)
+
+# Task reminders (tasks.reminders): remind assignees REMINDER_LEAD_MINUTES before a task
+REMINDER_LEAD_MINUTES = config('REMINDER_LEAD_MINUTES', default=30, cast=int)
+REMINDER_LOOKAHEAD_MINUTES = config('REMINDER_LOOKAHEAD_MINUTES', default=15, cast=int)
+REMINDER_CLAIM_TIMEOUT = config('REMINDER_CLAIM_TIMEOUT', default=300, cast=int)
+REMINDER_CHANNEL = config('REMINDER_CHANNEL', default='tasks.reminders.ConsoleChannel')
+REMINDER_FILE = config('REMINDER_FILE', default=str(BASE_DIR / 'reminders.jsonl'))
+
+# Recurring tasks (tasks.recurrence): occurrences are stored as tasks this far ahead
+TASK_RECURRENCE_HORIZON_DAYS = config('TASK_RECURRENCE_HORIZON_DAYS', default=7, cast=int)
+
+# Archival of closed leads (leads.archive)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=365, cast=int)
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
+# Soft delete (core.models.SoftDeleteModel): deleted leads and tasks can be undeleted for
+# DELETE_UNDO_MINUTES, then leads.purge removes them PURGE_BATCH_SIZE rows at a time
+DELETE_UNDO_MINUTES = config('DELETE_UNDO_MINUTES', default=30, cast=int)
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=500, cast=int)
+PURGE_PAUSE_SECONDS = config('PURGE_PAUSE_SECONDS', default=0.05, cast=float)
+
+# Visit route planning (tasks.routes): average city speed over straight-line distance
+ROUTE_SPEED_KMH = config('ROUTE_SPEED_KMH', default=20, cast=float)
+ROUTE_VISIT_MINUTES = config('ROUTE_VISIT_MINUTES', default=45, cast=int)
+
+# Batch API (core.views.BatchView)
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=20, cast=int)
+BATCH_MAX_SECONDS = config('BATCH_MAX_SECONDS', default=10, cast=float)
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)
+
 # CORS Settings
 # Allow configuration via environment variable, default to localhost for development
 CORS_ALLOWED_ORIGINS = config(
@@ -163,3 +299,29 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'score-touched-leads': {
+        'task': 'leads.tasks.score_touched_leads',
+        'schedule': config('LEAD_SCORE_INTERVAL', default=900, cast=int),
+    },
+    'snapshot-pipeline': {
+        'task': 'leads.tasks.snapshot_pipeline',
+        'schedule': crontab(hour=0, minute=10),
+    },
+    'purge-deleted': {
+        'task': 'leads.tasks.purge_deleted_records',
+        'schedule': config('PURGE_INTERVAL', default=600, cast=int),
+    },
+    'archive-closed-leads': {
+        'task': 'leads.tasks.archive_closed_leads',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'materialize-recurring-tasks': {
+        'task': 'tasks.tasks.materialize_recurring_tasks',
+        'schedule': crontab(minute=5),
+    },
+    'dispatch-reminders': {
+        'task': 'tasks.tasks.dispatch_reminders',
+        'schedule': config('REMINDER_SWEEP_INTERVAL', default=60, cast=int),
+    },
+}
@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import BatchView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,6 +13,7 @@ urlpatterns = [
     path('api/leads/', include('leads.urls')),
     path('api/tasks/', include('tasks.urls')),
     path('api/core/', include('core.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,198 @@
+"""
+Execution of batched API sub-requests (see ``core.views.BatchView``).
+
+Sub-requests are dispatched straight to the resolved view, re-using the user
+the batch request authenticated as. Runs of consecutive ``GET`` requests are
+executed concurrently on a shared thread pool; writes run one at a time in
+request order on the calling thread so they can share its transaction.
+"""
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, transaction
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+from .replicas import is_pinned, pin_primary
+
+
+logger = logging.getLogger(__name__)
+
+# Request headers a sub-request may set, and response headers passed back.
+FORWARDED_REQUEST_HEADERS = {'if-match', 'if-none-match', 'if-modified-since', 'if-unmodified-since'}
+RETURNED_RESPONSE_HEADERS = ['ETag', 'Last-Modified', 'Location', 'Retry-After']
+
+# META entries copied from the batch request so sub-requests look like it.
+INHERITED_META = [
+    'REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'HTTP_HOST',
+    'HTTP_USER_AGENT', 'HTTP_X_FORWARDED_FOR', 'HTTP_ACCEPT_LANGUAGE',
+]
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch'
+        )
+    return _executor
+
+
+def build_request(parent, item):
+    """Build a Django request for ``item`` that inherits ``parent``'s identity."""
+    url = urlsplit(item['url'])
+    body = b''
+    if 'body' in item:
+        body = json.dumps(item['body']).encode()
+
+    environ = {key: parent.META[key] for key in INHERITED_META if key in parent.META}
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': parent.scheme,
+    })
+    for name, value in item.get('headers', {}).items():
+        if name.lower() in FORWARDED_REQUEST_HEADERS:
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    request = WSGIRequest(environ)
+    request.user = parent.user
+    if hasattr(parent, 'session'):
+        request.session = parent.session
+    # DRF picks these up and skips authentication and CSRF checks: the batch
+    # request itself was already authenticated.
+    request._force_auth_user = parent.user
+    request._force_auth_token = getattr(parent, 'auth', None)
+    request._dont_enforce_csrf_checks = True
+    if is_pinned(parent):
+        pin_primary(request)
+    return request
+
+
+def dispatch(parent, item):
+    """Run one sub-request and return its result entry."""
+    request = build_request(parent, item)
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return _result(item, status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'})
+
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Http404:
+        return _result(item, status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'})
+    except Exception:  # noqa: BLE001 - one failing item must not fail the batch
+        logger.exception('Batch sub-request %s %s failed', request.method, request.get_full_path())
+        return _result(item, status.HTTP_500_INTERNAL_SERVER_ERROR, {'detail': 'Internal server error.'})
+
+    if hasattr(response, 'data'):
+        body = response.data
+    elif response.get('Content-Type', '').startswith('application/json') and response.content:
+        body = json.loads(response.content)
+    else:
+        body = None
+    headers = {name: response[name] for name in RETURNED_RESPONSE_HEADERS if response.has_header(name)}
+    return _result(item, response.status_code, body, headers)
+
+
+def _dispatch_in_thread(parent, item):
+    try:
+        return dispatch(parent, item)
+    finally:
+        connections.close_all()
+
+
+def _result(item, status_code, body, headers=None):
+    result = {'status': status_code, 'body': body, 'headers': headers or {}}
+    if item.get('id'):
+        result['id'] = item['id']
+    return result
+
+
+def execute_batch(parent, items, atomic=False):
+    """
+    Execute ``items`` and return ``(results, rolled_back)``.
+
+    With ``atomic`` the writes run inside one transaction that is rolled back
+    as soon as one of them fails; the remaining items are then skipped.
+    Items that could not start or finish within ``BATCH_MAX_SECONDS`` are
+    reported with status 504.
+    """
+    deadline = time.monotonic() + settings.BATCH_MAX_SECONDS
+    results = [None] * len(items)
+
+    if not atomic:
+        _execute(parent, items, results, deadline, atomic=False)
+        return results, False
+
+    with transaction.atomic():
+        failed = _execute(parent, items, results, deadline, atomic=True)
+        if failed:
+            transaction.set_rollback(True)
+    return results, failed
+
+
+def _execute(parent, items, results, deadline, atomic):
+    wrote = False
+    index = 0
+    while index < len(items):
+        if time.monotonic() >= deadline:
+            _skip(items, results, index, status.HTTP_504_GATEWAY_TIMEOUT, 'Batch time limit exceeded.')
+            return atomic
+
+        if items[index]['method'] == 'GET':
+            end = index
+            while end < len(items) and items[end]['method'] == 'GET':
+                end += 1
+            # Reads after a write inside the transaction must see it, so they
+            # stay on this thread's connection.
+            if atomic and wrote:
+                for i in range(index, end):
+                    results[i] = dispatch(parent, items[i])
+            else:
+                _run_concurrently(parent, items, results, range(index, end), deadline)
+            index = end
+            continue
+
+        results[index] = dispatch(parent, items[index])
+        wrote = True
+        # Later reads must see the write, so keep them off the replica
+        pin_primary(parent)
+        if atomic and results[index]['status'] >= 400:
+            _skip(items, results, index + 1, status.HTTP_424_FAILED_DEPENDENCY,
+                  'Skipped because an earlier request in the transaction failed.')
+            return True
+        index += 1
+    return False
+
+
+def _run_concurrently(parent, items, results, indexes, deadline):
+    executor = _get_executor()
+    futures = {executor.submit(_dispatch_in_thread, parent, items[i]): i for i in indexes}
+    done, _ = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+    for future, i in futures.items():
+        if future in done:
+            results[i] = future.result()
+        else:
+            future.cancel()
+            results[i] = _result(items[i], status.HTTP_504_GATEWAY_TIMEOUT,
+                                 {'detail': 'Batch time limit exceeded.'})
+
+
+def _skip(items, results, start, status_code, detail):
+    for i in range(start, len(items)):
+        results[i] = _result(items[i], status_code, {'detail': detail})
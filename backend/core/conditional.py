@@ -0,0 +1,111 @@
+"""
+Conditional request support (ETag / Last-Modified) for model viewsets.
+
+Validators are computed with a single aggregate query over the same scope
+the view would serialize, so a ``304 Not Modified`` never loads or renders
+any rows.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalRequestMixin:
+    """
+    ViewSet mixin adding ETag/Last-Modified validators to ``list`` and ``retrieve``
+    and honouring ``If-Match`` on updates and deletes.
+
+    ``conditional_timestamp_fields`` lists every timestamp whose change should
+    change the response, including those of nested objects, e.g.
+    ``['updated_at', 'lead__updated_at']``.
+    """
+    conditional_timestamp_fields = ['updated_at']
+
+    def get_validators(self, queryset, key=''):
+        """Return ``(etag, last_modified)`` for the rows in ``queryset``."""
+        fields = self.conditional_timestamp_fields
+        aggregates = {f'max_{i}': Max(field) for i, field in enumerate(fields)}
+        result = queryset.order_by().aggregate(count=Count('pk'), **aggregates)
+        if not result['count']:
+            return None, None
+
+        timestamps = [result[f'max_{i}'] for i in range(len(fields))]
+        latest = max((ts for ts in timestamps if ts is not None), default=None)
+        state = ':'.join([
+            queryset.model._meta.label, str(key), str(result['count']),
+            *(ts.isoformat() if ts else '' for ts in timestamps),
+        ])
+        etag = quote_etag(hashlib.md5(state.encode()).hexdigest())
+        last_modified = int(latest.timestamp()) if latest else None
+        return etag, last_modified
+
+    def get_object_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        key = self.kwargs[lookup_url_kwarg]
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: key})
+        return self.get_validators(queryset, key=key)
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_validators(self.filter_queryset(self.get_queryset()))
+        return self._conditional(request, validators, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_object_validators()
+        return self._conditional(request, validators, super().retrieve, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self._if_match(request, super().update, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self._if_match(request, super().destroy, *args, **kwargs)
+
+    def _conditional(self, request, validators, handler, *args, **kwargs):
+        etag, last_modified = validators
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                # A 304 carries the validators the 200 would have (RFC 9110 15.4.5)
+                if not_modified.status_code == status.HTTP_304_NOT_MODIFIED:
+                    not_modified['ETag'] = etag
+                    if last_modified is not None:
+                        not_modified['Last-Modified'] = http_date(last_modified)
+                patch_cache_control(not_modified, private=True, no_cache=True)
+                return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _if_match(self, request, handler, *args, **kwargs):
+        """
+        Reject writes whose ``If-Match`` no longer matches the current ETag.
+
+        Tags are compared ignoring the ``W/`` prefix: they describe the row's
+        state rather than the bytes of one encoding, so a tag weakened by the
+        compression middleware still identifies the version the client saw.
+        """
+        header = request.META.get('HTTP_IF_MATCH')
+        if header:
+            etag, _ = self.get_object_validators()
+            client_etags = [tag.removeprefix('W/') for tag in parse_etags(header)]
+            if etag is not None and client_etags != ['*'] and etag not in client_etags:
+                return Response(
+                    {'detail': 'The resource has changed since it was fetched.'},
+                    status=status.HTTP_412_PRECONDITION_FAILED,
+                    headers={'ETag': etag},
+                )
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            etag, _ = self.get_object_validators()
+            if etag is not None:
+                response['ETag'] = etag
+        return response
@@ -0,0 +1,20 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+class VersionConflict(Exception):
+    """Raised when a versioned row was changed or deleted since it was read."""
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This record was changed by someone else. Reload it and try again.'
+    default_code = 'conflict'
+
+
+def exception_handler(exc, context):
+    """DRF exception handler that maps ``VersionConflict`` to ``409 Conflict``."""
+    if isinstance(exc, VersionConflict):
+        exc = Conflict()
+    return drf_exception_handler(exc, context)
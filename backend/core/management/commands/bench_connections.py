@@ -0,0 +1,166 @@
+"""
+Benchmark request throughput with and without database connection reuse.
+
+Each mode runs in a fresh process with its own settings and sends
+``--requests`` requests from ``--threads`` threads through the WSGI handler,
+so connections are opened and released exactly as under a threaded server:
+
+- ``none``: a new connection for every request (``DB_POOL=False``, ``DB_CONN_MAX_AGE=0``)
+- ``persistent``: one connection kept per thread (``DB_POOL=False``, ``DB_CONN_MAX_AGE=600``)
+- ``pool``: the psycopg connection pool (``DB_POOL=True``; PostgreSQL only)
+
+Usage:
+    USE_POSTGRES=True python manage.py bench_connections --user <username> [--requests 2000] [--threads 8]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+
+MODES = {
+    'none': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '600'},
+    'pool': {'DB_POOL': 'True'},
+}
+
+WARMUP_REQUESTS = 5
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec with a new connection per request, persistent connections and the pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username to run the requests as')
+        parser.add_argument('--url', default='/api/leads/leads/stats/')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated: none, persistent, pool')
+        # Set on the child process that runs one mode
+        parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self._run(options)))
+            return
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}.")
+        if 'pool' in modes and not settings.USE_POSTGRES:
+            self.stdout.write('Skipping pool: it needs USE_POSTGRES=True.')
+            modes.remove('pool')
+
+        self.stdout.write(
+            f"{settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1]}, {options['threads']} threads, "
+            f"{options['requests']} requests to {options['url']}"
+        )
+        self.stdout.write(f"{'mode':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+        for mode in modes:
+            row = self._spawn(mode, options)
+            self.stdout.write(
+                f"{mode:<12}{row['rps']:>9.0f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['errors']:>8}"
+            )
+
+    def _spawn(self, mode, options):
+        env = {**os.environ, **MODES[mode]}
+        # One user sending thousands of requests is what the throttle is there to stop
+        env['THROTTLE_ENABLED'] = 'False'
+        if mode == 'pool':
+            # One connection per thread unless the pool size is set explicitly
+            env.setdefault('DB_POOL_MAX_SIZE', str(options['threads']))
+        result = subprocess.run(
+            [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_connections', '--mode', mode,
+                '--user', options['user'], '--url', options['url'],
+                '--requests', str(options['requests']), '--threads', str(options['threads']),
+            ],
+            env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'{mode} run failed:\n{result.stderr.strip()}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def _run(self, options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        token, _ = Token.objects.get_or_create(user=user)
+        connections.close_all()
+
+        handler = get_wsgi_application()
+        path, _, query = options['url'].partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'HTTP_ACCEPT': 'application/json',
+            'HTTP_AUTHORIZATION': f'Token {token.key}',
+            'wsgi.url_scheme': 'http',
+        }
+
+        def request():
+            statuses = []
+            start = time.perf_counter()
+            response = handler({**environ, 'wsgi.input': io.BytesIO()}, lambda status, *_: statuses.append(status))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                # Fires request_finished, which closes or releases the connection
+                response.close()
+            return time.perf_counter() - start, statuses[0].startswith('200')
+
+        threads = options['threads']
+        per_thread = max(options['requests'] // threads, 1)
+        started = []
+        barrier = threading.Barrier(threads, action=lambda: started.append(time.perf_counter()))
+        latencies = [[] for _ in range(threads)]
+        errors = [0] * threads
+
+        def worker(index):
+            try:
+                for _ in range(WARMUP_REQUESTS):
+                    request()
+                barrier.wait()
+                for _ in range(per_thread):
+                    seconds, ok = request()
+                    latencies[index].append(seconds)
+                    errors[index] += not ok
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started[0]
+
+        samples = np.concatenate([np.array(times) for times in latencies]) * 1000
+        return {
+            'mode': options['mode'],
+            'requests': len(samples),
+            'seconds': round(elapsed, 3),
+            'rps': len(samples) / elapsed,
+            'p50_ms': float(np.percentile(samples, 50)),
+            'p95_ms': float(np.percentile(samples, 95)),
+            'errors': sum(errors),
+        }
@@ -0,0 +1,73 @@
+"""
+Benchmark JSON rendering and response compression on the main list endpoints.
+
+Usage:
+    python manage.py bench_rendering --user <username> [--repeat 50]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.compression import CODECS
+from core.renderers import ORJSONRenderer
+from leads.views import LeadViewSet
+from tasks.views import TaskViewSet, VisitViewSet
+from users.models import User
+
+
+ENDPOINTS = [
+    ('/api/leads/leads/', LeadViewSet),
+    ('/api/tasks/tasks/', TaskViewSet),
+    ('/api/tasks/visits/', VisitViewSet),
+]
+
+
+def _time_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+class Command(BaseCommand):
+    help = 'Report render time and bytes on the wire for the main list endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username to run the requests as')
+        parser.add_argument('--repeat', type=int, default=50, help='Iterations per measurement')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        repeat = options['repeat']
+        factory = APIRequestFactory()
+        codecs = sorted(CODECS)
+
+        header = f"{'endpoint':<22}{'view ms':>9}{'drf ms':>9}{'orjson ms':>11}{'bytes':>10}"
+        for name in codecs:
+            header += f"{name + ' bytes':>12}{name + ' ms':>9}"
+        self.stdout.write(header)
+
+        for url, viewset in ENDPOINTS:
+            view = viewset.as_view({'get': 'list'})
+
+            def call_view():
+                request = factory.get(url)
+                force_authenticate(request, user=user)
+                return view(request)
+
+            view_ms, response = _time_ms(call_view, repeat)
+            data = response.data
+            drf_ms, _ = _time_ms(lambda: JSONRenderer().render(data), repeat)
+            orjson_ms, body = _time_ms(lambda: ORJSONRenderer().render(data), repeat)
+
+            row = f"{url:<22}{view_ms:>9.2f}{drf_ms:>9.2f}{orjson_ms:>11.2f}{len(body):>10}"
+            for name in codecs:
+                compress_ms, compressed = _time_ms(lambda: CODECS[name].compress(body), repeat)
+                row += f"{len(compressed):>12}{compress_ms:>9.2f}"
+            self.stdout.write(row)
@@ -1,6 +1,10 @@
 import json
+from django.conf import settings
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from .compression import astream, negotiate, stream
 from .models import AuditLog
+from .replicas import replica_configured
 
 
 class AuditLogMiddleware:
@@ -38,6 +42,76 @@ class AuditLogMiddleware:
         return ip
 
 
+class ReplicaPinMiddleware:
+    """
+    Keep a client's reads on the primary database for ``REPLICA_PIN_SECONDS``
+    after each successful write, so it reads its own writes even while the
+    replica catches up (see core.replicas).
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_configured() and request.method not in self.SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    Regular responses smaller than ``COMPRESSION_MIN_SIZE`` are sent as-is;
+    streaming responses are always compressed chunk by chunk.
+    """
+    COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.encodings = getattr(settings, 'COMPRESSION_ENCODINGS', ['zstd', 'br', 'gzip'])
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        content_type = response.get('Content-Type', '')
+        if response.has_header('Content-Encoding') or not content_type.startswith(self.COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                response.streaming_content = astream(codec, response.streaming_content)
+            else:
+                response.streaming_content = stream(codec, response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed body is no longer byte-for-byte what a strong ETag promised.
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
+
+
 def log_audit(user, action, instance, changes=None, ip_address=None, user_agent=None):
     """
     Helper function to create audit log entries.
@@ -54,3 +128,20 @@ def log_audit(user, action, instance, changes=None, ip_address=None, user_agent=
         ip_address=ip_address,
         user_agent=user_agent or ''
     )
+
+
+def log_bulk_audit(user, model, ids, changes=None, ip_address=None, user_agent=None):
+    """
+    Helper function to create one audit log entry for a bulk change to the
+    ``model`` rows in ``ids``.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    
+    AuditLog.objects.create(
+        user=user,
+        action='bulk_update',
+        content_type=ContentType.objects.get_for_model(model),
+        changes={**(changes or {}), 'ids': list(ids)},
+        ip_address=ip_address,
+        user_agent=user_agent or ''
+    )
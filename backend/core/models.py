@@ -1,18 +1,119 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from .exceptions import VersionConflict
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract model with optimistic concurrency control.
+
+    Every save of an existing row runs ``UPDATE ... WHERE id = %s AND version = %s``
+    and bumps ``version``. If another writer got there first no row matches and
+    ``VersionConflict`` is raised instead of silently overwriting their change.
+    Set ``version`` to the value the client read before saving to extend the
+    check across requests.
+    """
+    version = models.PositiveIntegerField(default=1)
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        
+        expected = self.version
+        self.version = expected + 1
+        self._expected_version = expected
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = expected
+            raise
+        finally:
+            del self._expected_version
+    
+    def _do_update(self, base_qs, *args, **kwargs):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, *args, **kwargs)
+        updated = super()._do_update(base_qs.filter(version=expected), *args, **kwargs)
+        if not updated:
+            raise VersionConflict(
+                f'{self._meta.label} {self.pk} is no longer at version {expected}.'
+            )
+        return updated
+
+
+class LiveManager(models.Manager):
+    """Manager that leaves out soft-deleted rows."""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract model whose rows are hidden first and removed later.
+    
+    ``soft_delete()`` only sets ``deleted_at``; the default manager (``objects``,
+    and so related managers, serializers and viewsets) no longer returns the
+    row, while ``all_objects`` and foreign key access still do. The row can be
+    brought back with ``undelete()`` for ``DELETE_UNDO_MINUTES``, after which a
+    background worker removes it and its dependent rows (see leads.purge).
+    """
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    objects = LiveManager()
+    all_objects = models.Manager()
+    
+    class Meta:
+        abstract = True
+    
+    def soft_delete(self, now=None):
+        """Hide the row. Returns False if it was already deleted."""
+        now = now or timezone.now()
+        if not type(self).all_objects.filter(pk=self.pk, deleted_at__isnull=True).update(deleted_at=now):
+            return False
+        self.deleted_at = now
+        return True
+    
+    def undelete(self, now=None):
+        """Bring the row back. Returns False once the undo window has passed."""
+        cutoff = undo_cutoff(now)
+        if not type(self).all_objects.filter(pk=self.pk, deleted_at__gte=cutoff).update(deleted_at=None):
+            return False
+        self.deleted_at = None
+        return True
+
+
+def undo_cutoff(now=None):
+    """Rows deleted before this can no longer be undeleted and are due for purging."""
+    return (now or timezone.now()) - timedelta(minutes=settings.DELETE_UNDO_MINUTES)
 
 
 class AuditLog(models.Model):
     """
     Audit log for tracking all changes to leads and other important models.
+    
+    A ``bulk_update`` entry covers many objects of ``content_type`` at once; it
+    has no ``object_id`` and lists the affected ids in ``changes``.
     """
     ACTION_CHOICES = [
         ('create', 'Create'),
         ('update', 'Update'),
         ('delete', 'Delete'),
         ('status_change', 'Status Change'),
+        ('bulk_update', 'Bulk Update'),
     ]
     
     user = models.ForeignKey(
@@ -23,7 +124,7 @@ class AuditLog(models.Model):
     )
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
+    object_id = models.PositiveIntegerField(null=True, blank=True)
     content_object = GenericForeignKey('content_type', 'object_id')
     changes = models.JSONField(default=dict, help_text="Field changes made")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -34,7 +135,7 @@ class AuditLog(models.Model):
         db_table = 'audit_logs'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['content_type', 'object_id']),
+            models.Index(fields=['content_type', 'object_id', 'created_at']),
             models.Index(fields=['user', 'created_at']),
         ]
     
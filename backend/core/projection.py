@@ -0,0 +1,217 @@
+"""
+Sparse fieldsets (``?fields=``) and opt-in nesting (``?expand=``) for API responses.
+
+Both parameters take comma separated, dot-delimited paths, e.g.::
+
+    /api/tasks/visits/?fields=id,created_at,task_detail.scheduled_at
+    /api/tasks/visits/?expand=task_detail.lead_detail.contacts
+
+Without either parameter responses keep their full shape. Once one is given,
+nested serializers are only rendered when they are named in ``fields`` or
+``expand``, and the queryset is rewritten so that only the requested columns
+are loaded and only the requested relations are joined or prefetched.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _parse_paths(value):
+    """Turn ``a,b.c,b.d`` into ``{'a': {}, 'b': {'c': {}, 'd': {}}}``."""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            part = part.strip()
+            if not part:
+                break
+            node = node.setdefault(part, {})
+    return tree
+
+
+class Projection:
+    """
+    Requested response shape for one serializer level.
+
+    ``fields`` is ``None`` when every non-nested field should be rendered,
+    otherwise a tree of the requested field names. ``expand`` is a tree of
+    nested serializers to render in addition to ``fields``.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand or {}
+
+    @classmethod
+    def from_request(cls, request):
+        """Build a projection from query params, or ``None`` if none was asked for."""
+        if request is None:
+            return None
+        fields = request.query_params.get('fields')
+        expand = request.query_params.get('expand')
+        if fields is None and expand is None:
+            return None
+        return cls(
+            fields=_parse_paths(fields) if fields else None,
+            expand=_parse_paths(expand) if expand else {},
+        )
+
+    def includes(self, name, nested):
+        if name in self.expand:
+            return True
+        if self.fields is None:
+            return not nested
+        return name in self.fields
+
+    def child(self, name):
+        fields = self.fields.get(name) if self.fields is not None else None
+        return Projection(fields=fields or None, expand=self.expand.get(name))
+
+
+class QueryPlan:
+    """Columns, joins and prefetches needed to render a projected serializer."""
+
+    def __init__(self):
+        self.only = set()
+        self.select_related = set()
+        self.prefetch_related = []
+
+    def merge(self, other, prefix):
+        self.only.update(f'{prefix}__{name}' for name in other.only)
+        self.select_related.update(f'{prefix}__{name}' for name in other.select_related)
+        self.prefetch_related.extend(
+            (f'{prefix}__{lookup}', queryset) for lookup, queryset in other.prefetch_related
+        )
+
+    def apply(self, queryset):
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*[
+                Prefetch(lookup, queryset=related) for lookup, related in self.prefetch_related
+            ])
+        return queryset.only(*sorted(self.only))
+
+
+class ProjectionSerializerMixin:
+    """
+    Serializer mixin that prunes fields according to a ``Projection``.
+
+    The root serializer reads the projection from ``context['projection']``;
+    nested serializers receive their part of it from the parent.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        projection = self._get_projection()
+        if projection is None:
+            return fields
+
+        for name in list(fields):
+            field = fields[name]
+            nested = _unwrap(field)
+            if not projection.includes(name, nested is not None):
+                del fields[name]
+            elif isinstance(nested, ProjectionSerializerMixin):
+                nested._projection = projection.child(name)
+        return fields
+
+    def _get_projection(self):
+        if hasattr(self, '_projection'):
+            return self._projection
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return None
+        return self.context.get('projection')
+
+    def get_query_plan(self):
+        """Derive the ``only``/``select_related``/``prefetch_related`` plan for these fields."""
+        model = self.Meta.model
+        plan = QueryPlan()
+        all_columns_needed = False
+
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            attr = field.source.split('.')[0]
+            if attr.startswith('get_') and attr.endswith('_display'):
+                attr = attr[len('get_'):-len('_display')]
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # Method or property source: we can't tell which columns it reads.
+                all_columns_needed = True
+                continue
+
+            nested = _unwrap(field)
+            if not model_field.is_relation:
+                plan.only.add(attr)
+            elif model_field.concrete and not model_field.many_to_many:
+                plan.only.add(attr)
+                if isinstance(nested, ProjectionSerializerMixin):
+                    plan.select_related.add(attr)
+                    plan.merge(nested.get_query_plan(), attr)
+            elif isinstance(nested, ProjectionSerializerMixin):
+                plan.prefetch_related.append((attr, nested.get_prefetch_queryset(model_field)))
+            else:
+                plan.prefetch_related.append((attr, model_field.related_model._default_manager.all()))
+
+        if all_columns_needed:
+            plan.only.update(f.name for f in model._meta.concrete_fields)
+        return plan
+
+    def get_prefetch_queryset(self, relation):
+        """Queryset for prefetching this serializer's rows through ``relation``."""
+        plan = self.get_query_plan()
+        if not relation.many_to_many:
+            # The reverse foreign key is needed to attach rows to their parent.
+            plan.only.add(relation.field.name)
+        return plan.apply(self.Meta.model._default_manager.all())
+
+
+def _unwrap(field):
+    """Return the serializer behind a nested field, or ``None`` for plain fields."""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+class ProjectionViewSetMixin:
+    """
+    ViewSet mixin that wires ``?fields=``/``?expand=`` into serializers and querysets.
+
+    Projections only apply to safe methods so that writes never lose fields.
+    """
+
+    def get_projection(self):
+        if not hasattr(self, '_projection'):
+            request = getattr(self, 'request', None)
+            if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                self._projection = None
+            else:
+                self._projection = Projection.from_request(request)
+        return self._projection
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['projection'] = self.get_projection()
+        return context
+
+    def filter_queryset(self, queryset):
+        return self.project_queryset(super().filter_queryset(queryset))
+
+    def project_queryset(self, queryset):
+        """Restrict columns and relations to what the projected serializer renders."""
+        if self.get_projection() is None:
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, ProjectionSerializerMixin):
+            return queryset
+        if serializer.Meta.model is not queryset.model:
+            return queryset
+        return serializer.get_query_plan().apply(queryset)
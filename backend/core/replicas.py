@@ -0,0 +1,156 @@
+"""
+Read-replica routing for heavy read endpoints.
+
+When a ``replica`` database is configured (``REPLICA_DB_HOST`` for
+PostgreSQL, or ``REPLICA_DB_NAME`` for an SQLite copy standing in for one
+locally), views using ``ReplicaReadMixin`` send the queries of the actions
+listed in their ``replica_actions`` (``list``, ``stats``, ``get`` ...) to it;
+everything else, and every write, stays on ``default``.
+
+Reads go back to the primary:
+
+- for ``REPLICA_PIN_SECONDS`` after the client's own write: every successful
+  unsafe request sets the ``REPLICA_PIN_COOKIE`` cookie
+  (``ReplicaPinMiddleware``), so a rep who just completed a task sees it in
+  the next list;
+- while the replica lags by more than ``REPLICA_MAX_LAG_SECONDS`` or cannot
+  be reached. ``replica_monitor`` measures the lag at most every
+  ``REPLICA_CHECK_SECONDS`` per process.
+
+The choice is kept in a context variable for the duration of the view, and
+``ReplicaRouter`` reads it, so querysets, related lookups and prefetches all
+follow it without passing ``using()`` around.
+"""
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+REPLICA = 'replica'
+
+logger = logging.getLogger(__name__)
+
+_reading_replica = contextvars.ContextVar('reading_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_lag():
+    """
+    Seconds the replica is behind the primary. A database that is not
+    replaying WAL (such as a local stand-in) counts as up to date.
+    """
+    connection = connections[REPLICA]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )
+        else:
+            # Fails on a stand-in file that was never copied from the primary
+            cursor.execute('SELECT 0 FROM django_migrations LIMIT 1')
+        row = cursor.fetchone()
+    return float(row[0] or 0) if row else 0.0
+
+
+class ReplicaMonitor:
+    """Process-wide replica health, re-measured when older than ``REPLICA_CHECK_SECONDS``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._available = False
+        self._checked_at = None
+
+    def available(self):
+        if not replica_configured():
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at > settings.REPLICA_CHECK_SECONDS:
+                self._available = self._check()
+                self._checked_at = now
+            return self._available
+
+    def _check(self):
+        try:
+            lag = replica_lag()
+        except DatabaseError:
+            logger.warning('Replica unreachable; reading from the primary.', exc_info=True)
+            return False
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning('Replica %.1fs behind; reading from the primary.', lag)
+            return False
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._checked_at = None
+
+
+replica_monitor = ReplicaMonitor()
+
+
+class ReplicaRouter:
+    """Send reads to the replica inside ``ReplicaReadMixin`` actions, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if _reading_replica.get() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def pin_primary(request):
+    """Keep the rest of ``request``'s reads (and sub-requests built from it) on the primary."""
+    request._pin_primary = True
+
+
+def is_pinned(request):
+    return getattr(request, '_pin_primary', False) or settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+
+class ReplicaReadMixin:
+    """
+    View mixin routing the reads of ``replica_actions`` to the replica.
+
+    Entries are viewset action names (``list``, ``retrieve``, ``stats``) or,
+    on plain API views, handler names (``get``). Only safe methods are routed.
+    """
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        handler = getattr(self, 'action', None) or request.method.lower()
+        if (
+            handler in self.replica_actions
+            and request.method in SAFE_METHODS
+            and not is_pinned(request)
+            and replica_monitor.available()
+        ):
+            self._replica_token = _reading_replica.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        # In ``finally``, so an unhandled exception cannot leave the flag set
+        # for the next request on this thread
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            token = getattr(self, '_replica_token', None)
+            if token is not None:
+                _reading_replica.reset(token)
+                self._replica_token = None
@@ -1,9 +1,11 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import AuditLog, ActivityLog
 from users.serializers import UserSerializer
+from .projection import ProjectionSerializerMixin
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for AuditLog model."""
     user_detail = UserSerializer(source='user', read_only=True)
     
@@ -16,7 +18,7 @@ class AuditLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for ActivityLog model."""
     user_detail = UserSerializer(source='user', read_only=True)
     
@@ -28,3 +30,39 @@ class ActivityLogSerializer(serializers.ModelSerializer):
             'leads_updated', 'notes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """A single sub-request of a batch."""
+    METHOD_CHOICES = ['GET', 'POST', 'PATCH']
+    
+    id = serializers.CharField(required=False, allow_blank=True)
+    method = serializers.ChoiceField(choices=METHOD_CHOICES, default='GET')
+    url = serializers.CharField()
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+    
+    def to_internal_value(self, data):
+        # Accept lowercase methods; ChoiceField would reject them before any validate_method
+        if isinstance(data, dict) and isinstance(data.get('method'), str):
+            data = {**data, 'method': data['method'].upper()}
+        return super().to_internal_value(data)
+    
+    def validate_url(self, value):
+        if not value.startswith('/api/') or value.startswith('/api/batch/'):
+            raise serializers.ValidationError('Only /api/ endpoints other than the batch endpoint can be batched.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for batch API requests."""
+    requests = BatchItemSerializer(many=True)
+    transaction = serializers.BooleanField(default=False)
+    
+    def validate_requests(self, value):
+        max_requests = settings.BATCH_MAX_REQUESTS
+        if not value:
+            raise serializers.ValidationError('At least one request is required.')
+        if len(value) > max_requests:
+            raise serializers.ValidationError(f'A batch can contain at most {max_requests} requests.')
+        return value
@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from .replicas import REPLICA, ReplicaReadMixin, ReplicaRouter, _reading_replica, replica_monitor
+
+
+class ReplicaView(ReplicaReadMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = []
+    replica_actions = ('get',)
+
+    def get(self, request):
+        if request.query_params.get('fail'):
+            raise RuntimeError('boom')
+        return Response({'db': ReplicaRouter().db_for_read(None)})
+
+
+@mock.patch.object(replica_monitor, 'available', return_value=True)
+class ReplicaReadMixinTests(SimpleTestCase):
+    def setUp(self):
+        self.view = ReplicaView.as_view()
+        self.factory = APIRequestFactory()
+
+    def test_routes_listed_actions_to_the_replica(self, available):
+        response = self.view(self.factory.get('/'))
+        self.assertEqual(response.data, {'db': REPLICA})
+        self.assertFalse(_reading_replica.get())
+
+    def test_unhandled_exception_resets_routing(self, available):
+        with self.assertRaises(RuntimeError):
+            self.view(self.factory.get('/', {'fail': '1'}))
+        self.assertFalse(_reading_replica.get())
+        self.assertEqual(ReplicaRouter().db_for_read(None), 'default')
@@ -0,0 +1,142 @@
+"""
+Token-bucket rate limiting shared by the worker processes on a host.
+
+A script hammering search, stats or the forecast can keep the database busy
+for everyone else. ``TokenBucketThrottle`` (enabled in ``REST_FRAMEWORK``)
+gives every user, or every address for anonymous requests, a bucket of
+``THROTTLE_BURST`` tokens refilled at ``THROTTLE_RATE`` tokens per second.
+A request costs the entry for its action in the view's ``throttle_costs``
+(``{'stats': 5}`` on a viewset, ``{'get': 5}`` on a plain API view), or
+``THROTTLE_DEFAULT_COST``; a cost of 0 exempts it. A request that does not
+fit gets ``429 Too Many Requests`` with a ``Retry-After`` header.
+
+Buckets live in ``THROTTLE_FILE``, memory-mapped by every process, so the
+workers of a server share one limit instead of each keeping its own, as they
+would with Django's default local-memory cache. A bucket is a single float,
+the "theoretical arrival time" of the generic cell rate algorithm: when the
+bucket will be full again. A check adds ``cost / rate`` to it and stores the
+result if that is no more than ``burst / rate`` ahead of now, so there is no
+refill timer and nothing to reset. Python has no atomic compare-and-swap on
+shared memory, so the read-modify-write holds a lock on the bucket's slot
+group only, a thread lock stripe within the process and an ``fcntl``
+byte-range lock across processes, for a few microseconds.
+
+The table has ``THROTTLE_SLOTS`` slots in groups of four, chosen by a hash of
+the key. A key uses the slot in its group it already owns, or one that is
+empty or whose bucket is full again; when all four hold active buckets of
+other keys it shares the first, which can only make its limit stricter.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: a single process, so the thread locks are enough
+    fcntl = None
+
+
+# Key hash and theoretical arrival time
+SLOT = struct.Struct('=Qd')
+GROUP = 4
+STRIPES = 256
+
+
+def _hash(key):
+    # Not hash(), which is salted per process
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') | 1
+
+
+class BucketTable:
+    """Token buckets in a file mapped by every process that opens it (``THROTTLE_FILE`` by default)."""
+
+    def __init__(self, path=None, slots=None):
+        self.path = path
+        self.slots = slots
+        self._map = None
+        self._fd = None
+        self._groups = None
+        self._open_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(STRIPES)]
+
+    def _open(self):
+        with self._open_lock:
+            if self._map is None:
+                self._groups = max((self.slots or settings.THROTTLE_SLOTS) // GROUP, 1)
+                size = self._groups * GROUP * SLOT.size
+                fd = os.open(self.path or settings.THROTTLE_FILE, os.O_RDWR | os.O_CREAT, 0o600)
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._fd = fd
+                self._map = mmap.mmap(fd, size)
+        return self._map
+
+    def consume(self, key, cost, rate, burst, now=None):
+        """
+        Take ``cost`` tokens from ``key``'s bucket of ``burst`` tokens refilled
+        at ``rate`` per second. Returns 0 if they were taken, otherwise the
+        seconds until they would be.
+        """
+        table = self._map or self._open()
+        key_hash = _hash(key)
+        group = key_hash % self._groups
+        start = group * GROUP * SLOT.size
+        length = GROUP * SLOT.size
+        interval = 1 / rate
+        with self._stripes[group % STRIPES]:
+            if fcntl:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+            try:
+                now = time.time() if now is None else now
+                offset = self._slot(table, start, key_hash, now)
+                _, arrival = SLOT.unpack_from(table, offset)
+                # A cost above the burst could never fit
+                arrival = max(arrival, now) + min(cost, burst) * interval
+                wait = arrival - now - burst * interval
+                if wait > 0:
+                    return wait
+                SLOT.pack_into(table, offset, key_hash, arrival)
+                return 0
+            finally:
+                if fcntl:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _slot(self, table, start, key_hash, now):
+        """Offset of the slot for ``key_hash`` in the group at ``start``."""
+        free = None
+        for offset in range(start, start + GROUP * SLOT.size, SLOT.size):
+            owner, arrival = SLOT.unpack_from(table, offset)
+            if owner == key_hash:
+                return offset
+            if free is None and arrival <= now:
+                free = offset
+        return start if free is None else free
+
+
+bucket_table = BucketTable()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Charge each request its view's ``throttle_costs`` entry against the user's bucket."""
+
+    def allow_request(self, request, view):
+        handler = getattr(view, 'action', None) or request.method.lower()
+        cost = getattr(view, 'throttle_costs', {}).get(handler, settings.THROTTLE_DEFAULT_COST)
+        if cost <= 0:
+            return True
+        user = request.user
+        key = f'user:{user.pk}' if user and user.is_authenticated else f'anon:{self.get_ident(request)}'
+        self._wait = bucket_table.consume(key, cost, settings.THROTTLE_RATE, settings.THROTTLE_BURST)
+        return not self._wait
+
+    def wait(self):
+        # Retry-After is in whole seconds
+        return math.ceil(self._wait)
@@ -1,22 +1,27 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta, date
 from .models import AuditLog, ActivityLog
-from .serializers import AuditLogSerializer, ActivityLogSerializer
+from .batch import execute_batch
+from .serializers import AuditLogSerializer, ActivityLogSerializer, BatchSerializer
 from users.permissions import IsManagerOrAdmin, IsSalesExecutiveOrAbove
+from .projection import ProjectionViewSetMixin
+from .replicas import ReplicaReadMixin
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(ReplicaReadMixin, ProjectionViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing audit logs.
     """
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsManagerOrAdmin]
+    replica_actions = ('list', 'retrieve')
     
     def get_queryset(self):
         queryset = AuditLog.objects.select_related('user', 'content_type')
@@ -39,13 +44,15 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class ActivityLogViewSet(viewsets.ModelViewSet):
+class ActivityLogViewSet(ReplicaReadMixin, ProjectionViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for activity logs.
     """
     queryset = ActivityLog.objects.all()
     serializer_class = ActivityLogSerializer
     permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    replica_actions = ('stats',)
+    throttle_costs = {'stats': 3}
     
     def get_queryset(self):
         user = self.request.user
@@ -114,3 +121,31 @@ class ActivityLogViewSet(viewsets.ModelViewSet):
         )
         
         return Response(stats)
+
+
+class BatchView(APIView):
+    """
+    Execute several API requests in one round trip.
+    
+    POST a body like::
+    
+        {"transaction": false, "requests": [
+            {"id": "lead", "method": "GET", "url": "/api/leads/leads/1/"},
+            {"id": "tasks", "method": "GET", "url": "/api/tasks/tasks/?lead=1"}
+        ]}
+    
+    Reads run concurrently, writes run in order (inside one transaction when
+    ``transaction`` is true). Each result carries its own status and body.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results, rolled_back = execute_batch(
+            request,
+            serializer.validated_data['requests'],
+            atomic=serializer.validated_data['transaction'],
+        )
+        return Response({'results': results, 'rolled_back': rolled_back}, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Lead, Contact
+from .models import Lead, Contact, City, Locality, Territory, ArchivedLead
 
 
 class ContactInline(admin.TabularInline):
@@ -11,10 +11,10 @@ class ContactInline(admin.TabularInline):
 class LeadAdmin(admin.ModelAdmin):
     list_display = ['company_name', 'first_name', 'last_name', 'status', 'city', 
                     'intent', 'assigned_to', 'created_at']
-    list_filter = ['status', 'intent', 'city', 'infrastructure', 'client_type']
+    list_filter = ['status', 'intent', 'canonical_city__territory', 'infrastructure', 'client_type']
     search_fields = ['company_name', 'first_name', 'last_name', 'phone', 'email']
     inlines = [ContactInline]
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['version', 'created_at', 'updated_at']
 
 
 @admin.register(Contact)
@@ -22,3 +22,31 @@ class ContactAdmin(admin.ModelAdmin):
     list_display = ['name', 'role', 'lead', 'decision_maker', 'phone']
     list_filter = ['decision_maker']
     search_fields = ['name', 'lead__company_name']
+
+
+@admin.register(Territory)
+class TerritoryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug']
+
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ['name', 'state', 'territory']
+    list_filter = ['territory']
+    search_fields = ['name', 'state']
+
+
+@admin.register(Locality)
+class LocalityAdmin(admin.ModelAdmin):
+    list_display = ['name', 'city', 'latitude', 'longitude']
+    list_filter = ['city__territory']
+    search_fields = ['name', 'city__name']
+
+
+@admin.register(ArchivedLead)
+class ArchivedLeadAdmin(admin.ModelAdmin):
+    list_display = ['company_name', 'first_name', 'last_name', 'status', 'city', 'assigned_to',
+                    'updated_at', 'archived_at']
+    list_filter = ['status', 'canonical_city__territory']
+    search_fields = ['company_name', 'first_name', 'last_name', 'phone', 'email']
+    readonly_fields = [field.name for field in ArchivedLead._meta.fields]
@@ -0,0 +1,340 @@
+"""
+Archival of closed leads.
+
+Won and lost leads untouched for ``ARCHIVE_AFTER_DAYS`` are moved, with all
+their rows, out of the hot tables into ``ArchivedLead`` and ``ArchivedTask``,
+so everyday lists, searches and statistics only read the working set.
+
+Each archive row keeps the columns the list endpoints filter and sort on,
+and the lead's or task's rows serialized with Django's serializers: the
+lead with its contacts, status history, framework links and task templates;
+the task with its visit, visit framework links and reminders. Derived rows
+(search documents, duplicate candidates) are dropped and rebuilt on
+restore. Leads are moved, and restored, in batches of
+``ARCHIVE_BATCH_SIZE``, each batch in one transaction, so a failure leaves
+every lead entirely in one place.
+
+Lists and details include archived rows with ``?include_archived=true``
+(``ArchiveUnion``); the rows are rebuilt as unsaved model instances and
+rendered by the usual serializers.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+CLOSED_STATUSES = ('won', 'lost')
+
+# Models in a snapshot, parents before children
+RESTORE_ORDER = [
+    'leads.lead', 'leads.contact', 'leads.leadstatustransition', 'leads.leadframework',
+    'tasks.tasktemplate', 'tasks.task', 'tasks.visit', 'tasks.visitframework', 'tasks.reminder',
+]
+
+
+def include_archived(request):
+    return request.query_params.get('include_archived') == 'true'
+
+
+def archivable(now=None):
+    """
+    Closed leads untouched for ``ARCHIVE_AFTER_DAYS``, with no task changed
+    since then, nothing planned and no active recurring task.
+    """
+    from tasks.models import Task, TaskTemplate
+    from .models import Lead
+
+    cutoff = (now or timezone.now()) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    recent = Task.objects.filter(Q(status='planned') | Q(updated_at__gte=cutoff)).values('lead_id')
+    recurring = TaskTemplate.objects.filter(active=True).values('lead_id')
+    return Lead.objects.filter(status__in=CLOSED_STATUSES, updated_at__lt=cutoff).exclude(
+        pk__in=recent
+    ).exclude(pk__in=recurring)
+
+
+def _by(rows, attribute):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[getattr(row, attribute)].append(row)
+    return grouped
+
+
+def _snapshot(objects):
+    return {'rows': serializers.serialize('python', objects)}
+
+
+def archive_leads(queryset=None, now=None, batch_size=None):
+    """
+    Move the archivable leads in ``queryset`` (default: all of them) to the
+    archive. Returns the number of leads archived.
+    """
+    eligible = archivable(now)
+    if queryset is not None:
+        eligible = eligible.filter(pk__in=queryset.values('pk'))
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    archived = 0
+    last_pk = 0
+    while True:
+        ids = list(eligible.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        archived += _archive_batch(eligible, ids)
+        last_pk = ids[-1]
+    return archived
+
+
+def _archive_batch(eligible, ids):
+    from tasks.models import ArchivedTask, Reminder, Task, TaskTemplate, Visit, VisitFramework
+    from .models import ArchivedLead, Contact, Lead, LeadFramework, LeadStatusTransition
+
+    with transaction.atomic():
+        # Re-check under lock: a lead touched since it was picked stays hot.
+        ids = list(eligible.filter(pk__in=ids).select_for_update().values_list('pk', flat=True))
+        if not ids:
+            return 0
+        leads = list(Lead.objects.filter(pk__in=ids).order_by('pk'))
+        contacts = _by(Contact.objects.filter(lead_id__in=ids).order_by('pk'), 'lead_id')
+        transitions = _by(LeadStatusTransition.objects.filter(lead_id__in=ids).order_by('pk'), 'lead_id')
+        links = _by(LeadFramework.objects.filter(lead_id__in=ids).select_related('tag').order_by('pk'), 'lead_id')
+        templates = _by(TaskTemplate.objects.filter(lead_id__in=ids).order_by('pk'), 'lead_id')
+        tasks = list(Task.objects.filter(lead_id__in=ids).order_by('pk'))
+        task_ids = [task.pk for task in tasks]
+        visits = {visit.task_id: visit for visit in Visit.objects.filter(task_id__in=task_ids)}
+        visit_links = _by(VisitFramework.objects.filter(visit__task_id__in=task_ids).order_by('pk'), 'visit_id')
+        reminders = _by(Reminder.objects.filter(task_id__in=task_ids).order_by('pk'), 'task_id')
+
+        archived_leads = []
+        for lead in leads:
+            slugs = [link.tag.slug for link in links[lead.pk]]
+            archived_leads.append(ArchivedLead(
+                id=lead.pk,
+                status=lead.status,
+                first_name=lead.first_name,
+                last_name=lead.last_name,
+                company_name=lead.company_name,
+                city=lead.city,
+                canonical_city_id=lead.canonical_city_id,
+                phone=lead.phone,
+                email=lead.email,
+                intent=lead.intent,
+                frameworks=f" {' '.join(slugs)} " if slugs else '',
+                assigned_to_id=lead.assigned_to_id,
+                created_at=lead.created_at,
+                updated_at=lead.updated_at,
+                data=_snapshot([
+                    lead, *contacts[lead.pk], *transitions[lead.pk], *links[lead.pk], *templates[lead.pk]
+                ]),
+            ))
+        archived_tasks = []
+        for task in tasks:
+            visit = visits.get(task.pk)
+            rows = [task]
+            if visit is not None:
+                rows += [visit, *visit_links[visit.pk]]
+            archived_tasks.append(ArchivedTask(
+                id=task.pk,
+                lead_id=task.lead_id,
+                task_type=task.task_type,
+                status=task.status,
+                scheduled_at=task.scheduled_at,
+                assigned_to_id=task.assigned_to_id,
+                created_at=task.created_at,
+                updated_at=task.updated_at,
+                data=_snapshot(rows + reminders[task.pk]),
+            ))
+        ArchivedLead.objects.bulk_create(archived_leads)
+        ArchivedTask.objects.bulk_create(archived_tasks, batch_size=1000)
+        # Cascades to every row captured above, plus search documents and duplicate candidates
+        Lead.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def _rows(archived):
+    return [item.object for item in serializers.deserialize('python', archived.data['rows'])]
+
+
+def _drop_dangling(objects):
+    """
+    Clear references to rows deleted since archiving (users, cities, framework
+    tags), or drop the object when the reference is required.
+    """
+    restored = {label.lower() for label in RESTORE_ORDER}
+    references = defaultdict(set)
+    for obj in objects:
+        for field in obj._meta.concrete_fields:
+            if field.is_relation and field.related_model._meta.label_lower not in restored:
+                value = getattr(obj, field.attname)
+                if value is not None:
+                    references[field.related_model].add(value)
+    existing = {
+        model: set(model._default_manager.filter(pk__in=ids).values_list('pk', flat=True))
+        for model, ids in references.items()
+    }
+    kept = []
+    for obj in objects:
+        keep = True
+        for field in obj._meta.concrete_fields:
+            if field.is_relation and field.related_model in existing:
+                value = getattr(obj, field.attname)
+                if value is not None and value not in existing[field.related_model]:
+                    if field.null:
+                        setattr(obj, field.attname, None)
+                    else:
+                        keep = False
+        if keep:
+            kept.append(obj)
+    return kept
+
+
+def restore_leads(queryset, batch_size=None):
+    """
+    Move the archived leads in ``queryset`` (of ``ArchivedLead``) and their
+    tasks back to the hot tables with their original ids. Restored leads count
+    as updated now, so they are not archived again straight away. Returns how
+    many were restored.
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    restored = 0
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        restored += _restore_batch(ids)
+        last_pk = ids[-1]
+    return restored
+
+
+def _restore_batch(ids):
+    from tasks.models import ArchivedTask
+    from .models import ArchivedLead, Lead
+    from .search import index_document
+
+    with transaction.atomic():
+        archived = list(ArchivedLead.objects.filter(pk__in=ids).select_for_update().order_by('pk'))
+        if not archived:
+            return 0
+        objects = [obj for lead in archived for obj in _rows(lead)]
+        for task in ArchivedTask.objects.filter(lead__in=archived).order_by('pk'):
+            objects += _rows(task)
+
+        by_model = defaultdict(list)
+        for obj in _drop_dangling(objects):
+            by_model[obj._meta.label_lower].append(obj)
+        for label in RESTORE_ORDER:
+            for obj in by_model[label]:
+                # Raw saves keep auto_now timestamps as they were archived
+                obj.save_base(raw=True, force_insert=True)
+        Lead.objects.filter(pk__in=[lead.pk for lead in archived]).update(updated_at=timezone.now())
+
+        tasks = {task.pk: task for task in by_model['tasks.task']}
+        for lead in by_model['leads.lead']:
+            index_document(lead, 'lead')
+        for task in tasks.values():
+            index_document(task, 'task')
+        for visit in by_model['tasks.visit']:
+            visit.task = tasks[visit.task_id]
+            index_document(visit, 'visit')
+        ArchivedLead.objects.filter(pk__in=[lead.pk for lead in archived]).delete()
+    return len(archived)
+
+
+def _prefetched(queryset, rows):
+    queryset._result_cache = rows
+    queryset._prefetch_done = True
+    return queryset
+
+
+def _attach_users(instances, fields):
+    User = get_user_model()
+    ids = {getattr(obj, f'{field}_id') for obj in instances for field in fields} - {None}
+    users = User.objects.in_bulk(ids)
+    for obj in instances:
+        for field in fields:
+            setattr(obj, field, users.get(getattr(obj, f'{field}_id')))
+
+
+def archived_leads(queryset):
+    """Unsaved ``Lead`` instances, with their contacts, for the ``ArchivedLead`` rows in ``queryset``."""
+    from .models import Contact
+
+    leads = []
+    for archived in queryset:
+        rows = _rows(archived)
+        lead = rows[0]
+        contacts = [row for row in rows if isinstance(row, Contact)]
+        lead._prefetched_objects_cache = {'contacts': _prefetched(Contact.objects.filter(lead_id=lead.pk), contacts)}
+        lead.is_archived = True
+        leads.append(lead)
+    _attach_users(leads, ['assigned_to', 'created_by'])
+    return leads
+
+
+def archived_tasks(queryset):
+    """Unsaved ``Task`` instances, with their leads, for the ``ArchivedTask`` rows in ``queryset``."""
+    archived = list(queryset.select_related('lead'))
+    leads = {lead.pk: lead for lead in archived_leads({task.lead for task in archived})}
+    tasks = []
+    for row in archived:
+        task = _rows(row)[0]
+        task.lead = leads[task.lead_id]
+        task.is_archived = True
+        tasks.append(task)
+    _attach_users(tasks, ['assigned_to'])
+    return tasks
+
+
+class ArchiveUnion:
+    """
+    A hot queryset and the matching archive rows read as one sequence sorted
+    by ``ordering`` (all ascending or all descending, ending with the primary
+    key). It supports what Django's paginator needs: ``count()`` and slices.
+
+    A slice reads only the sort keys of the first ``stop`` rows of each side,
+    merges them and then loads the objects on the page.
+    """
+
+    def __init__(self, hot, archived, ordering, load_archived):
+        self.hot = hot
+        self.archived = archived
+        self.ordering = ordering
+        self.load_archived = load_archived
+
+    def count(self):
+        return self.hot.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        fields = [field.lstrip('-') for field in self.ordering]
+        sides = [
+            [(key, archived) for key in queryset.order_by(*self.ordering).values_list(*fields)[:stop]]
+            for archived, queryset in ((False, self.hot), (True, self.archived))
+        ]
+        page = list(heapq.merge(*sides, reverse=self.ordering[0].startswith('-')))[start:stop]
+
+        hot = self.hot.in_bulk([key[-1] for key, archived in page if not archived])
+        cold = {
+            obj.pk: obj for obj in self.load_archived(
+                self.archived.filter(pk__in=[key[-1] for key, archived in page if archived])
+            )
+        }
+        return [cold[key[-1]] if archived else hot[key[-1]] for key, archived in page]
+
+
+def flag_archived(data, instances):
+    """Add ``archived`` to each serialized row."""
+    for row, obj in zip(data, instances):
+        row['archived'] = getattr(obj, 'is_archived', False)
+    return data
@@ -0,0 +1,171 @@
+"""
+Automatic assignment of new leads to sales executives.
+
+A lead goes to a rep in its territory (the territory of the rep's
+``User.city``), or to any rep when nobody covers it. Among those, the rep
+with the lowest ``(load + 1) / assignment_weight`` wins, where load is the
+rep's open leads plus planned tasks; ties go to whoever was assigned least
+recently. With equal loads this is weighted round robin, and reps who
+fall behind catch up.
+
+Loads are counted with two ``GROUP BY`` queries into a ``LoadBoard`` that
+is then updated in memory as leads are assigned, instead of recounting per
+lead. ``assigner`` keeps one board per process for ``ASSIGNMENT_LOAD_TTL``
+seconds, so changes made elsewhere (other processes, manual reassignment,
+closed leads) are picked up within that time.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .cities import city_directory
+
+
+OPEN_STATUSES = ('open', 'sales_nurture')
+ANY_TERRITORY = 'any'
+
+
+class LoadBoard:
+    """
+    Load per rep, with a heap of candidates per territory.
+
+    Heap entries go stale when the rep is picked through another heap; a
+    stale entry always understates the rep's load, so it surfaces early and
+    is refreshed before it can win.
+    """
+
+    def __init__(self, reps):
+        """``reps`` is an iterable of ``(user_id, territory_id, weight, load)``."""
+        self._sequence = itertools.count()
+        self._reps = {}
+        self._heaps = defaultdict(list)
+        for user_id, territory_id, weight, load in reps:
+            self._reps[user_id] = [load, weight, next(self._sequence)]
+            entry = (*self._key(user_id), user_id)
+            self._heaps[ANY_TERRITORY].append(entry)
+            if territory_id is not None:
+                self._heaps[territory_id].append(entry)
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def _key(self, user_id):
+        load, weight, sequence = self._reps[user_id]
+        return (load + 1) / weight, sequence
+
+    def choose(self, territory_id=None):
+        """Pick the rep for a lead in ``territory_id`` and count the lead against them."""
+        heap = self._heaps.get(territory_id) or self._heaps.get(ANY_TERRITORY)
+        if not heap:
+            return None
+        while True:
+            ratio, sequence, user_id = heap[0]
+            current = self._key(user_id)
+            if (ratio, sequence) == current:
+                break
+            heapq.heapreplace(heap, (*current, user_id))
+        rep = self._reps[user_id]
+        rep[0] += 1
+        rep[2] = next(self._sequence)
+        heapq.heapreplace(heap, (*self._key(user_id), user_id))
+        return user_id
+
+    def loads(self):
+        return {user_id: rep[0] for user_id, rep in self._reps.items()}
+
+
+def load_board():
+    """Build a ``LoadBoard`` of the active sales executives that take auto-assigned leads."""
+    from tasks.models import Task
+    from users.models import User
+    from .models import Lead
+
+    reps = list(
+        User.objects.filter(is_active=True, role='sales_executive', assignment_weight__gt=0)
+        .values_list('id', 'city', 'assignment_weight')
+    )
+    ids = [user_id for user_id, _, _ in reps]
+    loads = defaultdict(int)
+    for queryset in (
+        Lead.objects.filter(status__in=OPEN_STATUSES, assigned_to_id__in=ids),
+        Task.objects.filter(status='planned', assigned_to_id__in=ids),
+    ):
+        for user_id, count in queryset.order_by().values('assigned_to').annotate(n=Count('id')).values_list(
+            'assigned_to', 'n'
+        ):
+            loads[user_id] += count
+
+    board = []
+    for user_id, city, weight in reps:
+        resolved = city_directory.resolve(city)
+        board.append((user_id, resolved.territory_id if resolved else None, weight, loads[user_id]))
+    return LoadBoard(board)
+
+
+class Assigner:
+    """Process-wide ``LoadBoard``, rebuilt when older than ``ASSIGNMENT_LOAD_TTL`` seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._board = None
+        self._loaded_at = 0.0
+
+    def assign(self, territory_ids):
+        """Return the chosen user id (or ``None``) for each territory id in turn."""
+        with self._lock:
+            if self._board is None or time.monotonic() - self._loaded_at > settings.ASSIGNMENT_LOAD_TTL:
+                self._board = load_board()
+                self._loaded_at = time.monotonic()
+            return [self._board.choose(territory_id) for territory_id in territory_ids]
+
+    def clear(self):
+        with self._lock:
+            self._board = None
+
+
+assigner = Assigner()
+
+
+def choose_assignee(city):
+    """The user id a new lead in ``city`` should go to, or ``None`` if no rep takes leads."""
+    resolved = city_directory.resolve(city)
+    return assigner.assign([resolved.territory_id if resolved else None])[0]
+
+
+def assign_leads(queryset=None, batch_size=1000):
+    """
+    Assign the unassigned open leads in ``queryset`` (default: all of them).
+
+    Leads are routed in memory and written with one ``UPDATE`` per rep and
+    batch, skipping any lead someone assigned in the meantime. Returns
+    ``{user_id: leads assigned}``.
+    """
+    from .models import Lead
+
+    if queryset is None:
+        queryset = Lead.objects.all()
+    rows = list(
+        queryset.filter(assigned_to__isnull=True, status__in=OPEN_STATUSES)
+        .order_by('created_at', 'pk').values_list('pk', 'canonical_city__territory_id')
+    )
+    chosen = assigner.assign([territory_id for _, territory_id in rows])
+
+    by_user = defaultdict(list)
+    for (lead_id, _), user_id in zip(rows, chosen):
+        if user_id is not None:
+            by_user[user_id].append(lead_id)
+
+    now = timezone.now()
+    assigned = {}
+    for user_id, lead_ids in by_user.items():
+        assigned[user_id] = 0
+        for start in range(0, len(lead_ids), batch_size):
+            assigned[user_id] += Lead.objects.filter(
+                pk__in=lead_ids[start:start + batch_size], assigned_to__isnull=True
+            ).update(assigned_to_id=user_id, updated_at=now, version=F('version') + 1)
+    return assigned
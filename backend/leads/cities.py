@@ -0,0 +1,224 @@
+"""
+Canonical cities and territories.
+
+Lead and user cities are free text ("Bangalore", "bengaluru ", "BLR"). They
+are resolved against the ``City`` table and its aliases so that filtering and
+aggregation can go through ``Lead.canonical_city`` instead of string matching.
+The table is small, so it is held in memory for resolution and autocomplete.
+
+The bundled dataset also carries coordinates for each city and for the main
+localities within it. Leads are placed at their locality, or at the city
+centre, without calling out to a geocoder, and since every lead sits on one
+of a city's few known places, the distances between those places are
+computed once per city and reused by route planning (tasks.routes).
+"""
+import bisect
+import json
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+SEED_PATH = Path(__file__).resolve().parent / 'data' / 'cities.json'
+EARTH_RADIUS_KM = 6371.0
+
+_WORDS = re.compile(r'[a-z]+')
+
+
+def city_key(name):
+    """Lookup key for a city name: ``' New  Delhi.'`` -> ``'new delhi'``."""
+    return ' '.join(_WORDS.findall((name or '').lower()))
+
+
+def haversine_matrix(points, others=None):
+    """Great-circle distances in km between ``(latitude, longitude)`` rows of ``points`` and ``others``."""
+    a = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    b = a if others is None else np.radians(np.asarray(others, dtype=float).reshape(-1, 2))
+    dlat = b[:, 0] - a[:, 0, None]
+    dlng = b[:, 1] - a[:, 1, None]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, 0, None]) * np.cos(b[:, 0]) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def read_seed(path=None):
+    """Load the bundled territory/city dataset."""
+    with open(path or SEED_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CityDirectory:
+    """
+    In-memory index of ``City`` rows by name and alias, with their localities.
+
+    Loaded on first use and cleared whenever a city or locality is saved or
+    deleted in this process; other processes pick up changes on their next
+    restart or ``clear()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_key = None
+        self._keys = None
+        self._cities = None
+        self._localities = None
+        self._matrices = {}
+
+    def _load(self):
+        from .models import City
+
+        by_key = {}
+        cities = {}
+        localities = {}
+        for city in City.objects.select_related('territory').prefetch_related('localities'):
+            cities[city.pk] = city
+            for name in [city.name, *city.aliases]:
+                by_key.setdefault(city_key(name), city)
+            by_name = localities[city.pk] = {}
+            for locality in city.localities.all():
+                for name in [locality.name, *locality.aliases]:
+                    by_name.setdefault(city_key(name), locality)
+        self._keys = sorted(by_key)
+        self._cities = cities
+        self._localities = localities
+        self._matrices = {}
+        self._by_key = by_key
+
+    def _index(self):
+        if self._by_key is None:
+            with self._lock:
+                if self._by_key is None:
+                    self._load()
+        return self._by_key, self._keys
+
+    def resolve(self, name):
+        """Return the ``City`` that ``name`` refers to, or ``None``."""
+        key = city_key(name)
+        if not key:
+            return None
+        by_key, _ = self._index()
+        return by_key.get(key)
+
+    def resolve_locality(self, city, name):
+        """Return the ``Locality`` of ``city`` that ``name`` refers to, or ``None``."""
+        key = city_key(name)
+        if city is None or not key:
+            return None
+        self._index()
+        return self._localities.get(city.pk, {}).get(key)
+
+    def coordinates(self, city_id, locality_id=None):
+        """``(latitude, longitude)`` of the locality, else of the city centre, or ``None``."""
+        index, points = self._places(city_id)
+        row = index.get(locality_id, index.get(None))
+        return None if row is None else tuple(points[row].tolist())
+
+    def _places(self, city_id):
+        """``(index, points)``: row of each locality id (``None`` for the centre) and their coordinates."""
+        self._index()
+        city = self._cities.get(city_id)
+        index, points = {}, []
+        if city is not None:
+            if city.latitude is not None and city.longitude is not None:
+                index[None] = len(points)
+                points.append((city.latitude, city.longitude))
+            for locality in city.localities.all():
+                index[locality.pk] = len(points)
+                points.append((locality.latitude, locality.longitude))
+        return index, np.array(points, dtype=float).reshape(-1, 2)
+
+    def distance_matrix(self, city_id):
+        """
+        ``(index, matrix)`` for a city: km between each pair of its places,
+        with ``index`` mapping a locality id (``None`` for the centre) to its
+        row. Computed once per city and kept until ``clear()``.
+        """
+        matrices = self._matrices
+        if city_id not in matrices:
+            index, points = self._places(city_id)
+            matrices[city_id] = (index, haversine_matrix(points))
+        return matrices[city_id]
+
+    def search(self, prefix, limit=10):
+        """Cities whose name or an alias starts with ``prefix``, by name."""
+        prefix = city_key(prefix)
+        if not prefix:
+            return []
+        by_key, keys = self._index()
+        found = {}
+        start = bisect.bisect_left(keys, prefix)
+        for key in keys[start:]:
+            if not key.startswith(prefix):
+                break
+            city = by_key[key]
+            found[city.pk] = city
+        return sorted(found.values(), key=lambda city: city.name)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._by_key = None
+            self._keys = None
+            self._cities = None
+            self._localities = None
+            self._matrices = {}
+
+
+city_directory = CityDirectory()
+
+
+def load_cities(seed=None):
+    """
+    Create or update territories, cities and their localities from ``seed``
+    (the bundled dataset by default). Returns the number of cities written.
+    """
+    from .models import City, Locality, Territory
+
+    seed = seed or read_seed()
+    territories = {}
+    for row in seed['territories']:
+        territories[row['slug']], _ = Territory.objects.update_or_create(
+            slug=row['slug'], defaults={'name': row['name']}
+        )
+    for row in seed['cities']:
+        city, _ = City.objects.update_or_create(name=row['name'], defaults={
+            'state': row['state'],
+            'territory': territories[row['territory']],
+            'aliases': row['aliases'],
+            'latitude': row.get('latitude'),
+            'longitude': row.get('longitude'),
+        })
+        for locality in row.get('localities', []):
+            Locality.objects.update_or_create(city=city, name=locality['name'], defaults={
+                'aliases': locality['aliases'],
+                'latitude': locality['latitude'],
+                'longitude': locality['longitude'],
+            })
+    return len(seed['cities'])
+
+
+def resolve_lead_cities(batch_size=2000):
+    """Re-resolve ``Lead.canonical_city`` and ``canonical_locality`` for every lead. Returns the number changed."""
+    from .models import Lead
+
+    changed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Lead.all_objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'city', 'canonical_city', 'locality', 'canonical_locality')[:batch_size]
+        )
+        if not batch:
+            break
+        updated = []
+        for lead in batch:
+            city = city_directory.resolve(lead.city)
+            locality = city_directory.resolve_locality(city, lead.locality)
+            resolved = (city.pk if city else None, locality.pk if locality else None)
+            if (lead.canonical_city_id, lead.canonical_locality_id) != resolved:
+                lead.canonical_city_id, lead.canonical_locality_id = resolved
+                updated.append(lead)
+        Lead.all_objects.bulk_update(updated, ['canonical_city', 'canonical_locality'])
+        changed += len(updated)
+        last_pk = batch[-1].pk
+    return changed
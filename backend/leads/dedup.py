@@ -0,0 +1,236 @@
+"""
+Duplicate lead detection and merging.
+
+Comparing every lead with every other lead is O(n²), so candidates are only
+generated within *blocks*: groups of leads sharing a blocking key such as a
+distinctive company-name token, the same phone number or the same company
+email domain. Pairs found in any block are scored once and the ones above
+``DEDUP_THRESHOLD`` go to the review queue (``DuplicateCandidate``).
+"""
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+# Tokens that say nothing about which company a name refers to.
+LEGAL_TOKENS = {
+    'pvt', 'private', 'ltd', 'limited', 'llp', 'llc', 'inc', 'co', 'corp',
+    'corporation', 'company', 'the', 'and', 'of',
+}
+GENERIC_TOKENS = {
+    'technologies', 'technology', 'tech', 'solutions', 'solution', 'software',
+    'softwares', 'systems', 'services', 'infotech', 'it', 'digital', 'labs',
+    'consulting', 'consultancy', 'consultants', 'global', 'india', 'web',
+    'info', 'infosystems', 'innovations', 'studio', 'studios', 'agency',
+    'media', 'apps', 'cloud', 'data', 'group', 'enterprises', 'ventures',
+}
+FREE_EMAIL_DOMAINS = {
+    'gmail.com', 'yahoo.com', 'yahoo.co.in', 'outlook.com', 'hotmail.com',
+    'live.com', 'icloud.com', 'rediffmail.com', 'protonmail.com', 'aol.com',
+}
+
+WEIGHTS = {'name': 0.55, 'phone': 0.25, 'email_domain': 0.1, 'city': 0.1}
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_GLUED_SUFFIXES = sorted((t for t in GENERIC_TOKENS if len(t) >= 4), key=len, reverse=True)
+
+
+def company_tokens(name):
+    """
+    Lowercased name tokens without legal words, with generic words that were
+    glued on (``'acmetech'``) split off.
+    """
+    tokens = []
+    for token in _TOKEN.findall(name.lower()):
+        if token in LEGAL_TOKENS:
+            continue
+        if token not in GENERIC_TOKENS:
+            for suffix in _GLUED_SUFFIXES:
+                if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                    tokens.append(token[:-len(suffix)])
+                    token = suffix
+                    break
+        tokens.append(token)
+    return tokens
+
+
+class LeadRecord:
+    """The fields of a lead that blocking and scoring look at."""
+    __slots__ = ('id', 'tokens', 'compact', 'city', 'phone_key', 'domain')
+
+    def __init__(self, id, company_name, city, phone_key, email):
+        tokens = company_tokens(company_name)
+        distinctive = [t for t in tokens if t not in GENERIC_TOKENS] or tokens
+        self.id = id
+        self.tokens = tuple(distinctive)
+        self.compact = ''.join(distinctive)
+        self.city = city.strip().lower()
+        self.phone_key = phone_key
+        domain = email.rpartition('@')[2].strip().lower() if '@' in email else ''
+        self.domain = '' if domain in FREE_EMAIL_DOMAINS else domain
+
+    def blocking_keys(self):
+        keys = [f'n:{token}' for token in self.tokens if len(token) >= 3]
+        if self.compact:
+            keys.append(f'c:{self.compact}')
+            if self.city:
+                keys.append(f'p:{self.city}:{self.compact[:5]}')
+        if self.phone_key:
+            keys.append(f't:{self.phone_key}')
+        if self.domain:
+            keys.append(f'd:{self.domain}')
+        return keys
+
+
+def name_similarity(a, b):
+    if not a.compact or not b.compact:
+        return 0.0
+    if a.compact == b.compact:
+        return 1.0
+    tokens_a, tokens_b = set(a.tokens), set(b.tokens)
+    jaccard = len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+    return max(jaccard, SequenceMatcher(None, a.compact, b.compact).ratio())
+
+
+def score_pair(a, b):
+    """Return ``(score, reasons)`` for two ``LeadRecord``s."""
+    name = name_similarity(a, b)
+    reasons = []
+    score = WEIGHTS['name'] * name
+    if name >= 0.8:
+        reasons.append('name')
+    if a.phone_key and a.phone_key == b.phone_key:
+        score += WEIGHTS['phone']
+        reasons.append('phone')
+    if a.domain and a.domain == b.domain:
+        score += WEIGHTS['email_domain']
+        reasons.append('email_domain')
+    if a.city and a.city == b.city:
+        score += WEIGHTS['city']
+        reasons.append('city')
+    return round(score, 3), reasons
+
+
+def build_blocks(records, max_block_size=None):
+    """
+    Group record indexes by blocking key.
+
+    Blocks larger than ``max_block_size`` are dropped: a key shared by that
+    many leads isn't distinctive, and the leads in it still meet through
+    their other keys.
+    """
+    max_block_size = max_block_size or settings.DEDUP_MAX_BLOCK_SIZE
+    blocks = defaultdict(list)
+    for index, record in enumerate(records):
+        for key in record.blocking_keys():
+            blocks[key].append(index)
+    return [members for members in blocks.values() if 1 < len(members) <= max_block_size]
+
+
+def find_candidates(records, threshold=None, max_block_size=None):
+    """
+    Yield ``(lead_a_id, lead_b_id, score, reasons)`` for likely duplicates,
+    with ``lead_a_id < lead_b_id``. Each pair is scored at most once.
+    """
+    threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+    seen = set()
+    for members in build_blocks(records, max_block_size):
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pair = (first, second) if first < second else (second, first)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                a, b = records[pair[0]], records[pair[1]]
+                score, reasons = score_pair(a, b)
+                if score >= threshold:
+                    low, high = sorted((a.id, b.id))
+                    yield low, high, score, reasons
+
+
+def load_records(queryset, chunk_size=5000):
+    """Read the blocking fields of every lead in ``queryset`` in one streaming pass."""
+    rows = queryset.values_list('id', 'company_name', 'city', 'phone_key', 'email')
+    return [LeadRecord(*row) for row in rows.iterator(chunk_size=chunk_size)]
+
+
+def refresh_candidates(queryset=None, batch_size=1000):
+    """
+    Rescan leads and add new pairs to the review queue.
+
+    Existing pairs keep their status, so dismissed pairs stay dismissed.
+    Returns the number of candidate pairs found.
+    """
+    from .models import DuplicateCandidate, Lead
+
+    if queryset is None:
+        queryset = Lead.objects.all()
+    records = load_records(queryset)
+
+    found = 0
+    batch = []
+    for lead_a_id, lead_b_id, score, reasons in find_candidates(records):
+        batch.append(DuplicateCandidate(
+            lead_a_id=lead_a_id, lead_b_id=lead_b_id, score=score, reasons=reasons
+        ))
+        if len(batch) >= batch_size:
+            DuplicateCandidate.objects.bulk_create(batch, ignore_conflicts=True)
+            found += len(batch)
+            batch = []
+    if batch:
+        DuplicateCandidate.objects.bulk_create(batch, ignore_conflicts=True)
+        found += len(batch)
+    return found
+
+
+# Fields copied from a duplicate when the surviving lead has them blank.
+MERGE_FILL_FIELDS = [
+    'company_size', 'industry', 'state', 'phone', 'email', 'infrastructure',
+    'client_type', 'cloud_spending', 'role', 'intent', 'research_notes',
+    'closing_strategy',
+]
+
+
+@transaction.atomic
+def merge_leads(survivor, duplicate_ids):
+    """
+    Merge the leads in ``duplicate_ids`` into ``survivor``.
+
+    Contacts, tasks (and with them their visits), recurring task templates
+    and the tasks' search documents are moved with one bulk ``UPDATE`` each, blank fields on the survivor are filled in from the
+    duplicates, and the duplicates are deleted. Returns the counts moved.
+    """
+    from tasks.models import Task, TaskTemplate
+    from .models import Contact, Lead, SearchDocument
+
+    duplicate_ids = [pk for pk in duplicate_ids if pk != survivor.pk]
+    duplicates = list(Lead.objects.filter(pk__in=duplicate_ids).order_by('-updated_at'))
+
+    for field in MERGE_FILL_FIELDS:
+        if not getattr(survivor, field):
+            value = next((getattr(d, field) for d in duplicates if getattr(d, field)), None)
+            if value:
+                setattr(survivor, field, value)
+    frameworks = list(survivor.frameworks_used or [])
+    for duplicate in duplicates:
+        frameworks += [f for f in duplicate.frameworks_used or [] if f not in frameworks]
+    survivor.frameworks_used = frameworks
+    if not survivor.decision_maker:
+        survivor.decision_maker = any(d.decision_maker for d in duplicates)
+    survivor.save()
+
+    ids = [d.pk for d in duplicates]
+    contacts = Contact.objects.filter(lead_id__in=ids).update(lead=survivor)
+    tasks = Task.objects.filter(lead_id__in=ids).update(
+        lead=survivor, updated_at=timezone.now(), version=F('version') + 1
+    )
+    # Templates cascade with their lead; moving them keeps the recurrences going
+    templates = TaskTemplate.objects.filter(lead_id__in=ids).update(lead=survivor, updated_at=timezone.now())
+    SearchDocument.objects.filter(lead_id__in=ids, task__isnull=False).update(lead=survivor)
+    Lead.objects.filter(pk__in=ids).delete()
+    return {'merged': len(ids), 'contacts': contacts, 'tasks': tasks, 'templates': templates}
@@ -0,0 +1,209 @@
+"""
+Win forecasting from historical stage-to-stage conversion.
+
+Lead history is treated as a weekly Markov chain over the lead statuses, with
+won and lost absorbing. For every intent x infrastructure segment a 4x4
+weekly transition matrix is estimated from the status each lead had at
+consecutive week boundaries over the last ``FORECAST_LOOKBACK_WEEKS``. Sparse
+segments are shrunk towards the all-leads matrix. Raising a segment's matrix
+to the k-th power gives the probability that an open lead in it is won within
+k weeks; summing those probabilities per rep gives expected wins.
+
+All of it runs on NumPy arrays filled straight from raw cursor rows, skipping
+model and queryset overhead.
+"""
+import hashlib
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Max
+from django.utils import timezone
+
+
+STATES = ['open', 'sales_nurture', 'won', 'lost']
+OPEN_STATES = [0, 1]
+WON, LOST = 2, 3
+INTENTS = ['', 'low', 'medium', 'high']
+INFRASTRUCTURES = ['', 'aws', 'azure', 'gcp', 'on_prem', 'mixed']
+SECONDS_PER_WEEK = 7 * 86400
+
+
+def encode(values, vocabulary):
+    """Index of each value in ``vocabulary`` (0 for unknown values)."""
+    lookup = {value: index for index, value in enumerate(vocabulary)}
+    return np.fromiter((lookup.get(value, 0) for value in values), dtype=np.int64, count=len(values))
+
+
+def segment_of(intents, infrastructures):
+    return encode(intents, INTENTS) * len(INFRASTRUCTURES) + encode(infrastructures, INFRASTRUCTURES)
+
+
+def states_at(lead_index, changed_at, to_state, boundaries, lead_count):
+    """
+    Status of every lead at each boundary, ``-1`` where the lead didn't exist yet.
+
+    ``lead_index``, ``changed_at`` and ``to_state`` describe transitions sorted
+    by lead and time. Returns an ``int8`` array of shape (leads, boundaries).
+    """
+    states = np.full((lead_count, len(boundaries)), -1, dtype=np.int8)
+    if not len(lead_index):
+        return states
+    positions = np.arange(len(lead_index))
+    starts = np.flatnonzero(np.r_[True, lead_index[1:] != lead_index[:-1]])
+    present = lead_index[starts]
+    for column, boundary in enumerate(boundaries):
+        last = np.maximum.reduceat(np.where(changed_at <= boundary, positions, -1), starts)
+        states[present, column] = np.where(last >= 0, to_state[last], -1)
+    return states
+
+
+def transition_counts(states, segments, segment_count):
+    """Observed week-over-week transitions, shape (segments, states, states)."""
+    size = len(STATES)
+    before, after = states[:, :-1], states[:, 1:]
+    valid = (before >= 0) & (after >= 0)
+    cells = (np.broadcast_to(segments[:, None], before.shape)[valid] * size * size
+             + before[valid].astype(np.int64) * size + after[valid])
+    counts = np.bincount(cells, minlength=segment_count * size * size)
+    return counts.reshape(segment_count, size, size).astype(float)
+
+
+def transition_matrices(counts, prior_weight=None):
+    """
+    Row-stochastic weekly transition matrices per segment.
+
+    Each segment row gets ``prior_weight`` pseudo-observations of the pooled
+    matrix, so segments with little history fall back to the overall rates.
+    """
+    prior_weight = settings.FORECAST_PRIOR_WEIGHT if prior_weight is None else prior_weight
+    identity = np.eye(len(STATES))
+
+    pooled = counts.sum(axis=0)
+    totals = pooled.sum(axis=1, keepdims=True)
+    pooled = np.where(totals > 0, pooled / np.where(totals > 0, totals, 1), identity)
+
+    totals = counts.sum(axis=2, keepdims=True)
+    matrices = (counts + prior_weight * pooled) / (totals + prior_weight)
+    matrices[:, [WON, LOST], :] = identity[[WON, LOST]]
+    return matrices
+
+
+def win_probabilities(matrices, weeks):
+    """``result[segment, week - 1, state]`` = P(won within ``week`` weeks)."""
+    result = np.empty((len(matrices), weeks, len(STATES)))
+    power = matrices.copy()
+    for week in range(weeks):
+        result[:, week, :] = power[:, :, WON]
+        power = power @ matrices
+    return result
+
+
+def project(matrices, segments, states, owners, weeks):
+    """
+    Expected cumulative wins per owner for weeks 1..``weeks``.
+
+    Returns ``(owner_keys, expected)`` where ``expected`` has shape (owners, weeks).
+    """
+    probabilities = win_probabilities(matrices, weeks)[segments, :, states]
+    owner_keys, owner_index = np.unique(owners, return_inverse=True)
+    expected = np.zeros((len(owner_keys), weeks))
+    np.add.at(expected, owner_index, probabilities)
+    return owner_keys, expected
+
+
+def _columns(queryset, count):
+    """Run ``queryset`` on a raw cursor and return its columns as lists."""
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return list(zip(*rows)) if rows else [()] * count
+
+
+def _epoch_seconds(values):
+    """Timestamps from a raw cursor (datetimes, or ISO strings on SQLite) as float seconds."""
+    if not len(values):
+        return np.zeros(0)
+    if isinstance(values[0], datetime):
+        return np.array([value.timestamp() for value in values], dtype=float)
+    return np.array(values, dtype='datetime64[us]').astype(np.int64) / 1e6
+
+
+def _cache_key(weeks):
+    from .models import Lead, LeadStatusTransition
+
+    leads = Lead.objects.order_by().aggregate(count=Count('id'), updated=Max('updated_at'))
+    history = LeadStatusTransition.objects.order_by().aggregate(last=Max('id'))
+    state = f"{leads['count']}:{leads['updated']}:{history['last']}:{weeks}"
+    return 'leads:forecast:' + hashlib.md5(state.encode()).hexdigest()
+
+
+def build_forecast(weeks):
+    """Compute the forecast from the database (uncached)."""
+    from .models import Lead, LeadStatusTransition
+
+    now = timezone.now()
+    lookback = settings.FORECAST_LOOKBACK_WEEKS
+    boundaries = now.timestamp() - SECONDS_PER_WEEK * np.arange(lookback, -1, -1)
+
+    lead_ids, intents, infrastructures, statuses, owners = _columns(
+        Lead.objects.order_by('id').values_list('id', 'intent', 'infrastructure', 'status', 'assigned_to_id'), 5
+    )
+    lead_ids = np.array(lead_ids, dtype=np.int64)
+    segments = segment_of(intents, infrastructures)
+
+    history_leads, to_statuses, changed_at = _columns(
+        LeadStatusTransition.objects.filter(changed_at__lte=now, lead__deleted_at__isnull=True)
+        .order_by('lead_id', 'changed_at', 'id').values_list('lead_id', 'to_status', 'changed_at'), 3
+    )
+    history_ids = np.array(history_leads, dtype=np.int64)
+    lead_index = np.searchsorted(lead_ids, history_ids)
+    # Leads created or removed between the two queries have history but no columns
+    known = lead_index < len(lead_ids)
+    known[known] = lead_ids[lead_index[known]] == history_ids[known]
+    states = states_at(
+        lead_index[known], _epoch_seconds(changed_at)[known], encode(to_statuses, STATES).astype(np.int8)[known],
+        boundaries, len(lead_ids),
+    )
+    segment_count = len(INTENTS) * len(INFRASTRUCTURES)
+    matrices = transition_matrices(transition_counts(states, segments, segment_count))
+
+    current = encode(statuses, STATES)
+    is_open = np.isin(current, OPEN_STATES)
+    owner_ids = np.array([owner or 0 for owner in owners], dtype=np.int64)[is_open]
+    owner_keys, expected = project(matrices, segments[is_open], current[is_open], owner_ids, weeks)
+    open_leads = np.bincount(np.searchsorted(owner_keys, owner_ids), minlength=len(owner_keys))
+
+    return {
+        'weeks': weeks,
+        'generated_at': now.isoformat(),
+        'team': {
+            'open_leads': int(is_open.sum()),
+            'expected_wins': [round(float(v), 2) for v in expected.sum(axis=0)],
+        },
+        'reps': [
+            {
+                'user_id': int(owner) or None,
+                'open_leads': int(count),
+                'expected_wins': [round(float(v), 2) for v in row],
+            }
+            for owner, count, row in zip(owner_keys, open_leads, expected)
+        ],
+    }
+
+
+def get_forecast(weeks):
+    """
+    Forecast for the next ``weeks`` weeks, cached until a lead or its status
+    history changes (and at most ``FORECAST_CACHE_SECONDS``, as the lookback
+    window moves with time).
+    """
+    key = _cache_key(weeks)
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = build_forecast(weeks)
+        cache.set(key, forecast, settings.FORECAST_CACHE_SECONDS)
+    return forecast
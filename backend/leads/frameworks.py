@@ -0,0 +1,71 @@
+"""
+Normalized framework tags kept in sync with the ``frameworks_used`` /
+``frameworks_discussed`` JSON lists, so leads and visits can be filtered and
+counted by framework through an indexed through-table.
+"""
+import re
+
+# Spellings that refer to the same framework.
+ALIASES = {
+    'reactjs': 'react',
+    'nodejs': 'node',
+    'vuejs': 'vue',
+    'nextjs': 'next',
+    'nuxtjs': 'nuxt',
+    'angularjs': 'angular',
+    'expressjs': 'express',
+    'net': 'dotnet',
+    'aspnet': 'dotnet',
+    'aspnetcore': 'dotnet',
+    'golang': 'go',
+    'ror': 'rails',
+    'rubyonrails': 'rails',
+    'springboot': 'spring',
+    'djangorestframework': 'django',
+}
+
+_INVALID = re.compile(r'[^a-z0-9+#]+')
+
+
+def framework_slug(name):
+    """Canonical key for a framework name: ``'React.js'`` -> ``'react'``."""
+    slug = _INVALID.sub('', str(name).lower())
+    return ALIASES.get(slug, slug)
+
+
+def parse_frameworks(value):
+    """Split a ``?frameworks=`` query value into canonical slugs."""
+    return sorted({framework_slug(part) for part in value.split(',') if framework_slug(part)})
+
+
+def sync_framework_tags(instance, names, through_model, owner_field):
+    """
+    Make the ``through_model`` rows of ``instance`` match ``names``.
+
+    Missing tags are created; only the through rows that actually changed are
+    inserted or deleted.
+    """
+    from .models import FrameworkTag
+
+    labels = {}
+    for name in names or []:
+        slug = framework_slug(name)
+        if slug:
+            labels.setdefault(slug, str(name).strip())
+
+    if labels:
+        FrameworkTag.objects.bulk_create(
+            [FrameworkTag(slug=slug, label=label) for slug, label in labels.items()],
+            ignore_conflicts=True,
+        )
+    wanted = set(FrameworkTag.objects.filter(slug__in=labels).values_list('id', flat=True)) if labels else set()
+
+    rows = through_model.objects.filter(**{owner_field: instance})
+    current = set(rows.values_list('tag_id', flat=True))
+    if current - wanted:
+        rows.filter(tag_id__in=current - wanted).delete()
+    if wanted - current:
+        through_model.objects.bulk_create(
+            [through_model(**{owner_field: instance}, tag_id=tag_id) for tag_id in wanted - current],
+            ignore_conflicts=True,
+        )
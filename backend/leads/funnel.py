@@ -0,0 +1,145 @@
+"""
+Lead funnel analytics over ``LeadStatusTransition``.
+
+Each transition is annotated in SQL with window functions: when the lead left
+that stage (``LEAD(changed_at)``), when it entered the funnel
+(``FIRST_VALUE(changed_at)``) and where it ended up (``LAST_VALUE(to_status)``).
+One pass over those rows feeds stage durations, conversion rates and cohort
+curves, which are aggregated with NumPy.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import F, RowRange, Window
+from django.db.models.functions import FirstValue, LastValue, Lead as NextValue
+from django.utils import timezone
+
+
+SECONDS_PER_DAY = 86400.0
+
+
+def bulk_change_status(queryset, to_status, user=None, **fields):
+    """
+    Move every lead in ``queryset`` to ``to_status`` with set-based updates,
+    recording their transitions in the same transaction. Extra ``fields``
+    (e.g. ``lost_reason``) are set on the changed leads. Returns the number
+    of leads changed.
+    """
+    from .models import Lead, LeadStatusTransition
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            queryset.order_by().exclude(status=to_status).select_for_update().values_list('id', 'status')
+        )
+        LeadStatusTransition.objects.bulk_create([
+            LeadStatusTransition(
+                lead_id=lead_id, from_status=from_status, to_status=to_status,
+                changed_by=user, changed_at=now,
+            )
+            for lead_id, from_status in rows
+        ], batch_size=1000)
+        ids = [lead_id for lead_id, _ in rows]
+        for start in range(0, len(ids), 1000):
+            Lead.objects.filter(pk__in=ids[start:start + 1000]).update(
+                status=to_status, updated_at=now, version=F('version') + 1, **fields
+            )
+    return len(ids)
+
+
+class FunnelHistory:
+    """Status history of a set of leads in columnar form."""
+
+    def __init__(self, rows, now=None):
+        now = (now or timezone.now()).timestamp()
+        columns = list(zip(*rows)) if rows else [()] * 6
+        lead_ids, stages, changed_at, left_at, entered_at, final = columns
+        self.lead_ids = np.array(lead_ids, dtype=np.int64)
+        self.stages = np.array(stages, dtype=object)
+        self.changed_at = np.array([ts.timestamp() for ts in changed_at], dtype=float)
+        self.left_at = np.array([ts.timestamp() if ts else np.nan for ts in left_at], dtype=float)
+        self.entered_at = np.array([ts.timestamp() for ts in entered_at], dtype=float)
+        self._entered_datetimes = entered_at
+        self.final = np.array(final, dtype=object)
+        self.now = now
+
+    @classmethod
+    def load(cls, transitions):
+        by_lead = {'partition_by': [F('lead_id')], 'order_by': [F('changed_at').asc(), F('id').asc()]}
+        rows = transitions.order_by().annotate(
+            left_at=Window(NextValue('changed_at'), **by_lead),
+            entered_at=Window(FirstValue('changed_at'), **by_lead),
+            final_status=Window(LastValue('to_status'), frame=RowRange(None, None), **by_lead),
+        ).values_list('lead_id', 'to_status', 'changed_at', 'left_at', 'entered_at', 'final_status')
+        return cls(list(rows.iterator(chunk_size=5000)))
+
+    def stage_durations(self, stages):
+        """
+        Days spent per visit to each stage, for visits that ended, plus the
+        number of leads currently in the stage and how long they've been there.
+        """
+        result = {}
+        for stage in stages:
+            in_stage = self.stages == stage
+            left = in_stage & ~np.isnan(self.left_at)
+            current = in_stage & np.isnan(self.left_at)
+            days = (self.left_at[left] - self.changed_at[left]) / SECONDS_PER_DAY
+            ages = (self.now - self.changed_at[current]) / SECONDS_PER_DAY
+            result[stage] = {
+                'completed': int(left.sum()),
+                'avg_days': _round(days.mean()) if days.size else None,
+                'median_days': _round(np.median(days)) if days.size else None,
+                'p90_days': _round(np.percentile(days, 90)) if days.size else None,
+                'current': int(current.sum()),
+                'current_avg_age_days': _round(ages.mean()) if ages.size else None,
+            }
+        return result
+
+    def conversion_rates(self, stages, outcomes=('won', 'lost')):
+        """Share of leads that ever entered each stage and are now in each outcome."""
+        result = {}
+        for stage in stages:
+            leads, first = np.unique(self.lead_ids[self.stages == stage], return_index=True)
+            final = self.final[self.stages == stage][first]
+            rates = {'entered': int(leads.size)}
+            for outcome in outcomes:
+                count = int(np.count_nonzero(final == outcome))
+                rates[outcome] = count
+                rates[f'{outcome}_rate'] = _round(count / leads.size) if leads.size else None
+            result[stage] = rates
+        return result
+
+    def cohort_curves(self, weeks=12, outcome='won'):
+        """
+        Leads grouped by the month they entered the funnel, with the cumulative
+        share that reached ``outcome`` within 0..``weeks`` weeks of entering.
+        """
+        leads, first = np.unique(self.lead_ids, return_index=True)
+        entered = self.entered_at[first]
+        tz = timezone.get_current_timezone()
+        cohorts = np.array(
+            [self._entered_datetimes[i].astimezone(tz).strftime('%Y-%m') for i in first], dtype=object
+        )
+
+        reached = self.stages == outcome
+        outcome_leads, first_reached = np.unique(self.lead_ids[reached], return_index=True)
+        reached_at = np.full(leads.size, np.nan)
+        reached_at[np.searchsorted(leads, outcome_leads)] = self.changed_at[reached][first_reached]
+        week = np.floor((reached_at - entered) / (7 * SECONDS_PER_DAY))
+
+        result = []
+        for cohort in sorted(set(cohorts.tolist())):
+            members = cohorts == cohort
+            size = int(members.sum())
+            cohort_weeks = week[members]
+            cohort_weeks = cohort_weeks[~np.isnan(cohort_weeks)].astype(int)
+            counts = np.bincount(np.clip(cohort_weeks, 0, weeks + 1), minlength=weeks + 2)[:weeks + 1]
+            result.append({
+                'cohort': cohort,
+                'leads': size,
+                'curve': [_round(value) for value in np.cumsum(counts) / size],
+            })
+        return result
+
+
+def _round(value):
+    return round(float(value), 3)
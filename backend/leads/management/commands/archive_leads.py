@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.archive import archivable, archive_leads
+
+
+class Command(BaseCommand):
+    help = 'Move closed leads untouched for ARCHIVE_AFTER_DAYS, with their tasks, to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the leads that would be archived')
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'{archivable().count()} leads would be archived.')
+            return
+        archived = archive_leads(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} leads.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from leads.assignment import assign_leads
+
+
+class Command(BaseCommand):
+    help = 'Assign unassigned open leads to sales executives by territory and load.'
+
+    def handle(self, *args, **options):
+        assigned = assign_leads()
+        self.stdout.write(self.style.SUCCESS(
+            f'Assigned {sum(assigned.values())} leads to {len(assigned)} sales executives.'
+        ))
@@ -0,0 +1,57 @@
+"""
+Benchmark lead assignment on synthetic reps and leads (no database access).
+
+Usage:
+    python manage.py bench_assignment [--leads 100000] [--reps 40] [--territories 6]
+"""
+import time
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from leads.assignment import LoadBoard
+
+
+class Command(BaseCommand):
+    help = 'Benchmark lead assignment on synthetic reps and leads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leads', type=int, default=100000)
+        parser.add_argument('--reps', type=int, default=40)
+        parser.add_argument('--territories', type=int, default=6)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(42)
+        count, territories = options['leads'], options['territories']
+        # A tenth of the reps cover no known territory; weights 1-3; existing loads 0-50
+        reps = [
+            (user_id, int(rng.integers(0, territories)) if rng.random() > 0.1 else None,
+             int(rng.integers(1, 4)), int(rng.integers(0, 51)))
+            for user_id in range(1, options['reps'] + 1)
+        ]
+        # A twentieth of the leads have no recognised city
+        lead_territories = [
+            None if missing else int(territory)
+            for territory, missing in zip(rng.integers(0, territories + 2, count), rng.random(count) < 0.05)
+        ]
+
+        started = time.perf_counter()
+        board = LoadBoard(reps)
+        built = time.perf_counter()
+        chosen = [board.choose(territory) for territory in lead_territories]
+        finished = time.perf_counter()
+
+        self.stdout.write(f"{count} leads, {len(reps)} reps, {territories} territories")
+        self.stdout.write(f'build board:    {(built - started) * 1000:.1f}ms')
+        self.stdout.write(
+            f'assign:         {finished - built:.2f}s ({count / (finished - built):,.0f} leads/s)'
+        )
+        unassigned = chosen.count(None)
+        per_rep = Counter(user_id for user_id in chosen if user_id is not None)
+        loads = board.loads()
+        ratios = [loads[user_id] / weight for user_id, _, weight, _ in reps]
+        self.stdout.write(
+            f'unassigned: {unassigned}; per rep: {min(per_rep.values())}-{max(per_rep.values())}; '
+            f'load per weight: {min(ratios):.1f}-{max(ratios):.1f}'
+        )
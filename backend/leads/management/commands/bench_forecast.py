@@ -0,0 +1,87 @@
+"""
+Benchmark the win forecast on synthetic lead histories (no database access).
+
+Usage:
+    python manage.py bench_forecast [--leads 500000] [--weeks 12]
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.forecast import (
+    INFRASTRUCTURES, INTENTS, LOST, SECONDS_PER_WEEK, WON, project, states_at,
+    transition_counts, transition_matrices,
+)
+
+
+def generate(count, now, seed=42):
+    """
+    Return ``(segments, owners, lead_index, changed_at, to_state)`` for
+    ``count`` leads created over the past year. Leads move open -> nurture ->
+    won/lost, or straight from open to lost; higher intent wins more often.
+    """
+    rng = np.random.default_rng(seed)
+    intents = rng.integers(0, len(INTENTS), count)
+    segments = intents * len(INFRASTRUCTURES) + rng.integers(0, len(INFRASTRUCTURES), count)
+    owners = rng.integers(1, 41, count)
+
+    created = now - rng.uniform(0, 52, count) * SECONDS_PER_WEEK
+    nurtured = created + rng.exponential(3, count) * SECONDS_PER_WEEK
+    closed = nurtured + rng.exponential(4, count) * SECONDS_PER_WEEK
+    goes_to_nurture = rng.random(count) < 0.5
+    won = rng.random(count) < 0.15 + 0.1 * intents
+
+    lead_index, changed_at, to_state = [np.arange(count)], [created], [np.zeros(count)]
+    nurture_leads = np.flatnonzero(goes_to_nurture & (nurtured < now))
+    lead_index.append(nurture_leads)
+    changed_at.append(nurtured[nurture_leads])
+    to_state.append(np.ones(len(nurture_leads)))
+    closing = np.flatnonzero((goes_to_nurture & (closed < now)) | (~goes_to_nurture & (nurtured < now) & ~won))
+    lead_index.append(closing)
+    changed_at.append(np.where(goes_to_nurture, closed, nurtured)[closing])
+    to_state.append(np.where(won[closing] & goes_to_nurture[closing], WON, LOST))
+
+    lead_index, changed_at, to_state = (np.concatenate(a) for a in (lead_index, changed_at, to_state))
+    order = np.lexsort((changed_at, lead_index))
+    return segments, owners, lead_index[order], changed_at[order], to_state[order].astype(np.int8)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the win forecast on synthetic lead histories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leads', type=int, default=500000)
+        parser.add_argument('--weeks', type=int, default=12)
+
+    def handle(self, *args, **options):
+        now = time.time()
+        segments, owners, lead_index, changed_at, to_state = generate(options['leads'], now)
+        self.stdout.write(f"{options['leads']} leads, {len(lead_index)} transitions")
+
+        lookback = settings.FORECAST_LOOKBACK_WEEKS
+        boundaries = now - SECONDS_PER_WEEK * np.arange(lookback, -1, -1)
+
+        started = time.perf_counter()
+        states = states_at(lead_index, changed_at, to_state, boundaries, options['leads'])
+        states_done = time.perf_counter()
+        matrices = transition_matrices(
+            transition_counts(states, segments, len(INTENTS) * len(INFRASTRUCTURES))
+        )
+        matrices_done = time.perf_counter()
+        current = states[:, -1]
+        is_open = current <= 1
+        owner_keys, expected = project(
+            matrices, segments[is_open], current[is_open].astype(np.int64), owners[is_open], options['weeks']
+        )
+        finished = time.perf_counter()
+
+        self.stdout.write(f'weekly states:  {states_done - started:.2f}s')
+        self.stdout.write(f'matrices:       {matrices_done - states_done:.2f}s')
+        self.stdout.write(f'projection:     {finished - matrices_done:.2f}s ({len(owner_keys)} reps)')
+        self.stdout.write(f'total:          {finished - started:.2f}s')
+        self.stdout.write(
+            f"open leads: {int(is_open.sum())}, expected team wins in {options['weeks']} weeks: "
+            f'{expected.sum(axis=0)[-1]:.0f}'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from leads.dedup import refresh_candidates
+
+
+class Command(BaseCommand):
+    help = 'Scan leads for likely duplicates and add them to the review queue.'
+
+    def handle(self, *args, **options):
+        found = refresh_candidates()
+        self.stdout.write(self.style.SUCCESS(f'Found {found} candidate pairs.'))
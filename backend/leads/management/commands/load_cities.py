@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from leads.cities import load_cities, read_seed, resolve_lead_cities
+
+
+class Command(BaseCommand):
+    help = 'Load territories and cities from a JSON dataset and re-resolve lead cities.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Dataset to load instead of the bundled leads/data/cities.json')
+
+    def handle(self, *args, **options):
+        cities = load_cities(read_seed(options['file']))
+        changed = resolve_lead_cities()
+        self.stdout.write(self.style.SUCCESS(f'Loaded {cities} cities; {changed} leads re-resolved.'))
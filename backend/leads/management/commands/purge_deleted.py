@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.purge import purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Remove leads and tasks deleted more than DELETE_UNDO_MINUTES ago, with their dependent rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=settings.PURGE_PAUSE_SECONDS,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        counts = purge_deleted(batch_size=options['batch_size'], pause=options['pause'])
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Purged {sum(counts.values())} rows.'))
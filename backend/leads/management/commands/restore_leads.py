@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from leads.archive import restore_leads
+from leads.models import ArchivedLead
+
+
+class Command(BaseCommand):
+    help = 'Move archived leads, with their tasks, back to the hot tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='+', type=int, help='Ids of the archived leads')
+
+    def handle(self, *args, **options):
+        restored = restore_leads(ArchivedLead.objects.filter(pk__in=options['ids']))
+        self.stdout.write(self.style.SUCCESS(f'Restored {restored} leads.'))
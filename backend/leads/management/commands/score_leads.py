@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from leads.scoring import score_leads
+
+
+class Command(BaseCommand):
+    help = 'Score leads for prioritization. Only leads changed since they were last scored unless --full.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Re-score every lead')
+
+    def handle(self, *args, **options):
+        scored, changed = score_leads(incremental=not options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} leads; {changed} scores changed.'))
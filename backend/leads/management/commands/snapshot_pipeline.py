@@ -0,0 +1,23 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from leads.snapshots import take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write daily pipeline snapshots for a date range (yesterday by default). Safe to re-run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        end = options['end'] or yesterday
+        start = options['start'] or end
+        if start > end:
+            raise CommandError('--from must not be after --to.')
+        days = take_snapshots(start, end)
+        self.stdout.write(self.style.SUCCESS(f'Wrote snapshots for {days} days ({start} to {end}).'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+from leads.phone import normalize_phone
+
+
+BATCH_SIZE = 2000
+
+
+def backfill_phone_keys(apps, schema_editor):
+    """Fill phone_key for existing rows in primary-key ordered batches."""
+    for model_name in ('Lead', 'Contact'):
+        model = apps.get_model('leads', model_name)
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'phone')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            for row in batch:
+                row.phone_key = normalize_phone(row.phone)
+            model.objects.bulk_update(batch, ['phone_key'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0003_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, help_text='E.164 form of phone', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, help_text='E.164 form of phone', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['phone_key'], name='contacts_phone_k_046f61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['phone_key'], name='leads_phone_k_29f5ce_idx'),
+        ),
+        migrations.RunPython(backfill_phone_keys, migrations.RunPython.noop),
+    ]
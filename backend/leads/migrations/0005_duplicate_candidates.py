@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0004_phone_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(blank=True, default=list, help_text='Signals that matched')),
+                ('status', models.CharField(choices=[('pending', 'Pending review'), ('dismissed', 'Not a duplicate')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lead_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='leads.lead')),
+                ('lead_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='leads.lead')),
+            ],
+            options={
+                'db_table': 'duplicate_candidates',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['status', '-score'], name='duplicate_c_status_37ebb8_idx')],
+                'unique_together': {('lead_a', 'lead_b')},
+            },
+        ),
+    ]
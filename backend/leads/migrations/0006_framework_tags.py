@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from leads.frameworks import framework_slug
+
+
+BATCH_SIZE = 2000
+
+
+def backfill_lead_frameworks(apps, schema_editor):
+    """Create tags and through rows for existing leads in primary-key ordered batches."""
+    FrameworkTag = apps.get_model('leads', 'FrameworkTag')
+    Lead = apps.get_model('leads', 'Lead')
+    LeadFramework = apps.get_model('leads', 'LeadFramework')
+    tag_ids = {}
+    last_pk = 0
+    while True:
+        batch = list(
+            Lead.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'frameworks_used')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        links = set()
+        for pk, names in batch:
+            for name in names or []:
+                slug = framework_slug(name)
+                if not slug:
+                    continue
+                if slug not in tag_ids:
+                    tag_ids[slug] = FrameworkTag.objects.get_or_create(
+                        slug=slug, defaults={'label': str(name).strip()}
+                    )[0].pk
+                links.add((pk, tag_ids[slug]))
+        LeadFramework.objects.bulk_create(
+            [LeadFramework(lead_id=pk, tag_id=tag_id) for pk, tag_id in links],
+            ignore_conflicts=True,
+        )
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0005_duplicate_candidates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrameworkTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.CharField(max_length=50, unique=True)),
+                ('label', models.CharField(max_length=100)),
+            ],
+            options={
+                'db_table': 'framework_tags',
+                'ordering': ['slug'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadFramework',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='framework_links', to='leads.lead')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lead_links', to='leads.frameworktag')),
+            ],
+            options={
+                'db_table': 'lead_frameworks',
+            },
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='frameworks',
+            field=models.ManyToManyField(blank=True, help_text='Normalized from frameworks_used', related_name='leads', through='leads.LeadFramework', to='leads.frameworktag'),
+        ),
+        migrations.AddIndex(
+            model_name='leadframework',
+            index=models.Index(fields=['tag', 'lead'], name='lead_framew_tag_id_be0c72_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leadframework',
+            unique_together={('lead', 'tag')},
+        ),
+        migrations.RunPython(backfill_lead_frameworks, migrations.RunPython.noop),
+    ]
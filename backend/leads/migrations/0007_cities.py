@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from leads.cities import city_key, read_seed
+
+
+BATCH_SIZE = 2000
+
+
+def seed_cities(apps, schema_editor):
+    """Load the bundled cities and resolve existing leads in batches."""
+    Territory = apps.get_model('leads', 'Territory')
+    City = apps.get_model('leads', 'City')
+    Lead = apps.get_model('leads', 'Lead')
+
+    seed = read_seed()
+    territories = {}
+    for row in seed['territories']:
+        territories[row['slug']] = Territory.objects.get_or_create(
+            slug=row['slug'], defaults={'name': row['name']}
+        )[0]
+
+    city_ids = {}
+    for row in seed['cities']:
+        city = City.objects.get_or_create(name=row['name'], defaults={
+            'state': row['state'],
+            'territory': territories[row['territory']],
+            'aliases': row['aliases'],
+        })[0]
+        for name in [city.name, *city.aliases]:
+            city_ids.setdefault(city_key(name), city.pk)
+
+    last_pk = 0
+    while True:
+        batch = list(Lead.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'city')[:BATCH_SIZE])
+        if not batch:
+            break
+        for lead in batch:
+            lead.canonical_city_id = city_ids.get(city_key(lead.city))
+        Lead.objects.bulk_update(batch, ['canonical_city'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0006_framework_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('state', models.CharField(blank=True, max_length=100)),
+                ('aliases', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+                'db_table': 'cities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Territory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name_plural': 'territories',
+                'db_table': 'territories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='canonical_city',
+            field=models.ForeignKey(blank=True, editable=False, help_text='City resolved from the free-text city and its aliases', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leads', to='leads.city'),
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='territory',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='cities', to='leads.territory'),
+        ),
+        migrations.RunPython(seed_cities, migrations.RunPython.noop),
+    ]
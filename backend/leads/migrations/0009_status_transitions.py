@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def _audited_status(changes):
+    """``(old, new)`` from an audit ``changes`` entry for ``status``, in any of the shapes it was logged in."""
+    value = changes.get('status') if isinstance(changes, dict) else None
+    if isinstance(value, dict):
+        return value.get('old') or value.get('from') or '', value.get('new') or value.get('to') or ''
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return value[0] or '', value[1] or ''
+    if isinstance(value, str):
+        return '', value
+    return None
+
+
+def backfill_transitions(apps, schema_editor):
+    """
+    Rebuild status history for existing leads.
+
+    Status changes found in the audit log are replayed in order; leads
+    without any start as open at ``created_at``. If the replayed history
+    doesn't end in the current status, a change to it is added at
+    ``updated_at``.
+    """
+    Lead = apps.get_model('leads', 'Lead')
+    LeadStatusTransition = apps.get_model('leads', 'LeadStatusTransition')
+    AuditLog = apps.get_model('core', 'AuditLog')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    content_type = ContentType.objects.filter(app_label='leads', model='lead').first()
+    last_pk = 0
+    while True:
+        leads = list(
+            Lead.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'status', 'created_by_id', 'created_at', 'updated_at')[:BATCH_SIZE]
+        )
+        if not leads:
+            break
+        last_pk = leads[-1][0]
+
+        audited = {}
+        if content_type is not None:
+            logs = AuditLog.objects.filter(
+                content_type=content_type, object_id__in=[lead[0] for lead in leads],
+                action__in=['update', 'status_change'],
+            ).order_by('created_at').values_list('object_id', 'changes', 'user_id', 'created_at')
+            for object_id, changes, user_id, created_at in logs:
+                change = _audited_status(changes)
+                if change:
+                    audited.setdefault(object_id, []).append((*change, user_id, created_at))
+
+        rows = []
+        for pk, status, created_by_id, created_at, updated_at in leads:
+            changes = audited.get(pk)
+            if changes:
+                first_status = changes[0][0] or 'open'
+                rows.append(LeadStatusTransition(
+                    lead_id=pk, from_status='', to_status=first_status,
+                    changed_by_id=created_by_id, changed_at=created_at,
+                ))
+                previous = first_status
+                for old, new, user_id, changed_at in changes:
+                    if new and new != previous:
+                        rows.append(LeadStatusTransition(
+                            lead_id=pk, from_status=previous, to_status=new,
+                            changed_by_id=user_id, changed_at=changed_at,
+                        ))
+                        previous = new
+            else:
+                rows.append(LeadStatusTransition(
+                    lead_id=pk, from_status='', to_status='open',
+                    changed_by_id=created_by_id, changed_at=created_at,
+                ))
+                previous = 'open'
+            if status != previous:
+                rows.append(LeadStatusTransition(
+                    lead_id=pk, from_status=previous, to_status=status,
+                    changed_at=max(updated_at, rows[-1].changed_at),
+                ))
+        LeadStatusTransition.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0002_initial'),
+        ('leads', '0008_lead_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('open', 'Open'), ('sales_nurture', 'Sales Nurture'), ('won', 'Won'), ('lost', 'Lost')], max_length=20)),
+                ('to_status', models.CharField(choices=[('open', 'Open'), ('sales_nurture', 'Sales Nurture'), ('won', 'Won'), ('lost', 'Lost')], max_length=20)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lead_status_transitions', to=settings.AUTH_USER_MODEL)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_transitions', to='leads.lead')),
+            ],
+            options={
+                'db_table': 'lead_status_transitions',
+                'ordering': ['changed_at'],
+                'indexes': [models.Index(fields=['to_status', 'changed_at'], name='lead_status_to_stat_3f41b3_idx'), models.Index(fields=['lead', 'changed_at'], name='lead_status_lead_id_b13ddd_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_transitions, migrations.RunPython.noop),
+    ]
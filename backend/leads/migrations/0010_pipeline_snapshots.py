@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0009_status_transitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('status', 'Status'), ('intent', 'Intent'), ('owner', 'Owner')], max_length=10)),
+                ('key', models.CharField(blank=True, help_text='Status, intent or owner user id', max_length=50)),
+                ('count', models.PositiveIntegerField()),
+            ],
+            options={
+                'db_table': 'pipeline_snapshots',
+                'ordering': ['date'],
+                'unique_together': {('dimension', 'date', 'key')},
+            },
+        ),
+    ]
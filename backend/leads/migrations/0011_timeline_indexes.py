@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0010_pipeline_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['lead', 'created_at'], name='contacts_lead_id_ffbe6f_idx'),
+        ),
+    ]
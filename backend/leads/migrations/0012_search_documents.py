@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:15
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from leads.search import POSTGRES_CONFIG, SOURCES, document_body, drop_text_index, install_text_index
+
+
+BATCH_SIZE = 2000
+
+
+def index_existing(apps, schema_editor):
+    """Create the text index, then a document for every lead, task and visit with notes."""
+    install_text_index(schema_editor)
+
+    SearchDocument = apps.get_model('leads', 'SearchDocument')
+    querysets = {
+        'lead': apps.get_model('leads', 'Lead').objects.only('pk', 'created_at', *SOURCES['lead']),
+        'task': apps.get_model('tasks', 'Task').objects.only('pk', 'lead_id', 'created_at', *SOURCES['task']),
+        'visit': apps.get_model('tasks', 'Visit').objects.select_related('task').only(
+            'pk', 'task__lead_id', 'created_at', *SOURCES['visit']
+        ),
+    }
+    for kind, queryset in querysets.items():
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+            if not batch:
+                break
+            documents = []
+            for instance in batch:
+                body = document_body(instance, kind)
+                if not body:
+                    continue
+                documents.append(SearchDocument(
+                    kind=kind,
+                    object_id=instance.pk,
+                    lead_id=instance.pk if kind == 'lead' else (
+                        instance.lead_id if kind == 'task' else instance.task.lead_id
+                    ),
+                    task_id=None if kind == 'lead' else (instance.pk if kind == 'task' else instance.task_id),
+                    visit_id=instance.pk if kind == 'visit' else None,
+                    body=body,
+                    created_at=instance.created_at,
+                ))
+            SearchDocument.objects.bulk_create(documents)
+            last_pk = batch[-1].pk
+
+    if schema_editor.connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+        SearchDocument.objects.update(vector=SearchVector('body', config=POSTGRES_CONFIG))
+
+
+def remove_text_index(apps, schema_editor):
+    drop_text_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0011_timeline_indexes'),
+        ('tasks', '0005_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lead', 'Lead'), ('task', 'Task'), ('visit', 'Visit')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('body', models.TextField()),
+                ('vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('created_at', models.DateTimeField(help_text='When the lead, task or visit was created')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='leads.lead')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tasks.task')),
+                ('visit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tasks.visit')),
+            ],
+            options={
+                'db_table': 'search_documents',
+                'indexes': [models.Index(fields=['lead', 'created_at'], name='search_docu_lead_id_742225_idx'), models.Index(fields=['task'], name='search_docu_task_id_da46c0_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(index_existing, remove_text_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from leads.cities import read_seed
+
+
+def seed_coordinates(apps, schema_editor):
+    """Add the bundled coordinates and localities to the cities already loaded."""
+    City = apps.get_model('leads', 'City')
+    Locality = apps.get_model('leads', 'Locality')
+
+    cities = {city.name: city for city in City.objects.all()}
+    for row in read_seed()['cities']:
+        city = cities.get(row['name'])
+        if city is None:
+            continue
+        city.latitude, city.longitude = row['latitude'], row['longitude']
+        city.save(update_fields=['latitude', 'longitude'])
+        Locality.objects.bulk_create([
+            Locality(
+                city=city, name=locality['name'], aliases=locality['aliases'],
+                latitude=locality['latitude'], longitude=locality['longitude'],
+            )
+            for locality in row['localities']
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0012_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='locality',
+            field=models.CharField(blank=True, help_text='Area within the city, e.g. Koramangala', max_length=100),
+        ),
+        migrations.CreateModel(
+            name='Locality',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('aliases', models.JSONField(blank=True, default=list)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='localities', to='leads.city')),
+            ],
+            options={
+                'verbose_name_plural': 'localities',
+                'db_table': 'localities',
+                'ordering': ['city', 'name'],
+                'unique_together': {('city', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='canonical_locality',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Locality resolved within the canonical city; used for route planning', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leads', to='leads.locality'),
+        ),
+        migrations.RunPython(seed_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:39
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0013_localities'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLead',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Id of the lead', primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('sales_nurture', 'Sales Nurture'), ('won', 'Won'), ('lost', 'Lost')], max_length=20)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('company_name', models.CharField(max_length=200)),
+                ('city', models.CharField(max_length=100)),
+                ('phone', models.CharField(max_length=15)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('intent', models.CharField(blank=True, choices=[('high', 'High'), ('medium', 'Medium'), ('low', 'Low')], max_length=10)),
+                ('frameworks', models.TextField(blank=True, help_text='Framework tag slugs, space separated and padded')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('canonical_city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='leads.city')),
+            ],
+            options={
+                'db_table': 'archived_leads',
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['-updated_at', '-id'], name='archived_le_updated_a49ce2_idx'), models.Index(fields=['assigned_to', '-updated_at'], name='archived_le_assigne_fbf94b_idx'), models.Index(fields=['canonical_city'], name='archived_le_canonic_7fa81a_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from core.models import SoftDeleteModel, VersionedModel
+from .cities import city_directory
+from .frameworks import sync_framework_tags
+from .phone import normalize_phone
+from .search import SearchIndexed
 
 
-class Lead(models.Model):
+class Lead(SearchIndexed, SoftDeleteModel, VersionedModel):
     """
     Core Lead model for tracking IT agencies and partnerships.
     """
@@ -33,6 +41,8 @@ class Lead(models.Model):
         ('both', 'Both'),
     ]
     
+    search_kind = 'lead'
+    
     # Basic Information
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     first_name = models.CharField(max_length=100)
@@ -41,12 +51,39 @@ class Lead(models.Model):
     company_size = models.CharField(max_length=50, blank=True)
     industry = models.CharField(max_length=100, blank=True)
     city = models.CharField(max_length=100)
+    canonical_city = models.ForeignKey(
+        'City',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='leads',
+        help_text="City resolved from the free-text city and its aliases"
+    )
+    locality = models.CharField(max_length=100, blank=True, help_text="Area within the city, e.g. Koramangala")
+    canonical_locality = models.ForeignKey(
+        'Locality',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='leads',
+        help_text="Locality resolved within the canonical city; used for route planning"
+    )
     state = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=15)
+    phone_key = models.CharField(max_length=16, blank=True, editable=False, help_text="E.164 form of phone")
     email = models.EmailField(blank=True)
     
     # Business & Technical Context
     frameworks_used = models.JSONField(default=list, blank=True, help_text="List of frameworks")
+    frameworks = models.ManyToManyField(
+        'FrameworkTag',
+        through='LeadFramework',
+        related_name='leads',
+        blank=True,
+        help_text="Normalized from frameworks_used"
+    )
     infrastructure = models.CharField(max_length=20, choices=INFRASTRUCTURE_CHOICES, blank=True)
     client_type = models.CharField(max_length=20, choices=CLIENT_TYPE_CHOICES, blank=True)
     cloud_spending = models.CharField(max_length=50, blank=True, help_text="Monthly estimate")
@@ -63,6 +100,10 @@ class Lead(models.Model):
         default='not_discussed'
     )
     
+    # Prioritization (see leads.scoring)
+    score = models.FloatField(default=0, editable=False)
+    scored_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     # Outcome
     won_reason = models.TextField(blank=True)
     lost_reason = models.TextField(blank=True)
@@ -90,10 +131,91 @@ class Lead(models.Model):
             models.Index(fields=['status', 'assigned_to']),
             models.Index(fields=['city']),
             models.Index(fields=['intent']),
+            models.Index(fields=['phone_key']),
+            models.Index(fields=['-score']),
+            models.Index(
+                fields=['deleted_at'], name='leads_deleted_at_idx', condition=models.Q(deleted_at__isnull=False)
+            ),
         ]
     
     def __str__(self):
         return f"{self.company_name} - {self.first_name} {self.last_name}"
+    
+    def soft_delete(self, now=None):
+        """
+        Hide the lead and its tasks. The tasks get the lead's ``deleted_at``,
+        so undelete can leave tasks that were deleted earlier alone.
+        """
+        with transaction.atomic():
+            if not super().soft_delete(now):
+                return False
+            self.tasks.update(deleted_at=self.deleted_at)
+        return True
+    
+    def undelete(self, now=None):
+        """Bring the lead back with the tasks deleted along with it."""
+        deleted_at = self.deleted_at
+        with transaction.atomic():
+            if not super().undelete(now):
+                return False
+            self.tasks.model.all_objects.filter(lead=self, deleted_at=deleted_at).update(deleted_at=None)
+        return True
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__.get('frameworks_used')
+        # A copy, so in-place edits of the list still count as a change in save()
+        instance._loaded_frameworks = list(loaded) if loaded is not None else None
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Save the lead, recording a ``LeadStatusTransition`` in the same
+        transaction when the status changed. Set ``_changed_by`` on the
+        instance to attribute the change to a user.
+        """
+        self.phone_key = normalize_phone(self.phone)
+        city = city_directory.resolve(self.city)
+        self.canonical_city_id = city.pk if city else None
+        locality = city_directory.resolve_locality(city, self.locality)
+        self.canonical_locality_id = locality.pk if locality else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {
+                'phone': ['phone_key'],
+                'city': ['canonical_city', 'canonical_locality'],
+                'locality': ['canonical_locality'],
+            }
+            kwargs['update_fields'] = {*update_fields, *(f for name in update_fields for f in derived.get(name, []))}
+        
+        previous_status = getattr(self, '_loaded_status', None)
+        status_changed = (
+            'status' not in self.get_deferred_fields()
+            and (update_fields is None or 'status' in update_fields)
+            and self.status != previous_status
+        )
+        
+        changed_by = getattr(self, '_changed_by', None)
+        
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if status_changed:
+                LeadStatusTransition.objects.create(
+                    lead=self,
+                    from_status=previous_status or '',
+                    to_status=self.status,
+                    changed_by_id=changed_by.pk if changed_by else (self.created_by_id if adding else None),
+                    changed_at=self.updated_at,
+                )
+                self._loaded_status = self.status
+            
+            if 'frameworks_used' not in self.get_deferred_fields() and \
+                    self.frameworks_used != getattr(self, '_loaded_frameworks', None):
+                sync_framework_tags(self, self.frameworks_used, LeadFramework, 'lead')
+                self._loaded_frameworks = list(self.frameworks_used)
 
 
 class Contact(models.Model):
@@ -104,6 +226,7 @@ class Contact(models.Model):
     name = models.CharField(max_length=100)
     role = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=15, blank=True)
+    phone_key = models.CharField(max_length=16, blank=True, editable=False, help_text="E.164 form of phone")
     email = models.EmailField(blank=True)
     decision_maker = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -111,6 +234,291 @@ class Contact(models.Model):
     class Meta:
         db_table = 'contacts'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['phone_key']),
+            models.Index(fields=['lead', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.lead.company_name})"
+    
+    def save(self, *args, **kwargs):
+        self.phone_key = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_key'}
+        super().save(*args, **kwargs)
+
+
+class DuplicateCandidate(models.Model):
+    """
+    A pair of leads that the dedup engine thinks may be the same company.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending review'),
+        ('dismissed', 'Not a duplicate'),
+    ]
+    
+    lead_a = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='+')
+    lead_b = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    reasons = models.JSONField(default=list, blank=True, help_text="Signals that matched")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'duplicate_candidates'
+        ordering = ['-score']
+        unique_together = ['lead_a', 'lead_b']
+        indexes = [
+            models.Index(fields=['status', '-score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lead_a_id} ~ {self.lead_b_id} ({self.score})"
+
+
+class FrameworkTag(models.Model):
+    """
+    A framework or platform (Django, Laravel, React, ...) leads and visits mention.
+    """
+    slug = models.CharField(max_length=50, unique=True)
+    label = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'framework_tags'
+        ordering = ['slug']
+    
+    def __str__(self):
+        return self.label
+
+
+class LeadFramework(models.Model):
+    """
+    Through-table linking leads to the frameworks in ``Lead.frameworks_used``.
+    """
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='framework_links')
+    tag = models.ForeignKey(FrameworkTag, on_delete=models.CASCADE, related_name='lead_links')
+    
+    class Meta:
+        db_table = 'lead_frameworks'
+        unique_together = ['lead', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'lead']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lead_id} - {self.tag_id}"
+
+
+class Territory(models.Model):
+    """
+    Sales territory grouping cities (e.g. South, West).
+    """
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'territories'
+        ordering = ['name']
+        verbose_name_plural = 'territories'
+    
+    def __str__(self):
+        return self.name
+
+
+class City(models.Model):
+    """
+    Canonical city. ``aliases`` lists other spellings that resolve to it.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    state = models.CharField(max_length=100, blank=True)
+    territory = models.ForeignKey(Territory, on_delete=models.PROTECT, related_name='cities')
+    aliases = models.JSONField(default=list, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'cities'
+        ordering = ['name']
+        verbose_name_plural = 'cities'
+    
+    def __str__(self):
+        return self.name
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        city_directory.clear()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        city_directory.clear()
+        return result
+
+
+class Locality(models.Model):
+    """
+    Area within a city with its coordinates, so leads can be placed on a map
+    without an online geocoder. ``aliases`` lists other spellings.
+    """
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='localities')
+    name = models.CharField(max_length=100)
+    aliases = models.JSONField(default=list, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    
+    class Meta:
+        db_table = 'localities'
+        ordering = ['city', 'name']
+        verbose_name_plural = 'localities'
+        unique_together = [['city', 'name']]
+    
+    def __str__(self):
+        return self.name
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        city_directory.clear()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        city_directory.clear()
+        return result
+
+
+class LeadStatusTransition(models.Model):
+    """
+    Append-only history of lead status changes, one row per change.
+    
+    A lead's first row has a blank ``from_status`` and marks when it entered
+    the funnel.
+    """
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='status_transitions')
+    from_status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='lead_status_transitions'
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'lead_status_transitions'
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['to_status', 'changed_at']),
+            models.Index(fields=['lead', 'changed_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lead_id}: {self.from_status or '-'} -> {self.to_status}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Status transitions are append-only.")
+        super().save(*args, **kwargs)
+
+
+class PipelineSnapshot(models.Model):
+    """
+    Lead count for one dimension value at the end of a day (see leads.snapshots).
+    """
+    DIMENSION_CHOICES = [
+        ('status', 'Status'),
+        ('intent', 'Intent'),
+        ('owner', 'Owner'),
+    ]
+    
+    date = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=50, blank=True, help_text="Status, intent or owner user id")
+    count = models.PositiveIntegerField()
+    
+    class Meta:
+        db_table = 'pipeline_snapshots'
+        ordering = ['date']
+        unique_together = ['dimension', 'date', 'key']
+    
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.key or '-'}: {self.count}"
+
+
+class SearchDocument(models.Model):
+    """
+    The notes of one lead, task or visit as indexed for full-text search
+    (see leads.search). ``vector`` is only filled on PostgreSQL; SQLite keeps
+    its FTS5 index in a separate table.
+    """
+    KIND_CHOICES = [
+        ('lead', 'Lead'),
+        ('task', 'Task'),
+        ('visit', 'Visit'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='+')
+    task = models.ForeignKey('tasks.Task', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    visit = models.ForeignKey('tasks.Visit', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    body = models.TextField()
+    vector = SearchVectorField(null=True, editable=False)
+    created_at = models.DateTimeField(help_text="When the lead, task or visit was created")
+    
+    class Meta:
+        db_table = 'search_documents'
+        unique_together = ['kind', 'object_id']
+        indexes = [
+            models.Index(fields=['lead', 'created_at']),
+            models.Index(fields=['task']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class ArchivedLead(models.Model):
+    """
+    A closed lead moved out of the hot tables (see leads.archive).
+    
+    The columns the lead list filters and sorts on are kept, under the same
+    names as on ``Lead``; ``data`` holds the lead with its contacts, status
+    history, framework links and task templates as serialized rows, so it
+    can be restored with its original ids. Its tasks are in ``ArchivedTask``.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Id of the lead")
+    status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES)
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    company_name = models.CharField(max_length=200)
+    city = models.CharField(max_length=100)
+    canonical_city = models.ForeignKey(City, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    phone = models.CharField(max_length=15)
+    email = models.EmailField(blank=True)
+    intent = models.CharField(max_length=10, choices=Lead.INTENT_CHOICES, blank=True)
+    frameworks = models.TextField(blank=True, help_text="Framework tag slugs, space separated and padded")
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    
+    class Meta:
+        db_table = 'archived_leads'
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['-updated_at', '-id']),
+            models.Index(fields=['assigned_to', '-updated_at']),
+            models.Index(fields=['canonical_city']),
+        ]
+    
+    def __str__(self):
+        return f"{self.company_name} - {self.first_name} {self.last_name} (archived)"
@@ -0,0 +1,82 @@
+"""
+Phone number normalization and caller-ID lookup helpers.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def normalize_phone(value, country_code=None):
+    """
+    Return ``value`` in E.164 form (e.g. ``'+919845012345'``), or ``''`` if it
+    doesn't look like a phone number.
+
+    Numbers without a ``+``/``00`` international prefix are taken to be local
+    to ``country_code`` (``PHONE_DEFAULT_COUNTRY_CODE`` by default) and lose
+    their trunk ``0``.
+    """
+    if not value:
+        return ''
+    country_code = country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+    value = value.strip()
+    digits = _NON_DIGITS.sub('', value)
+
+    if value.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    else:
+        digits = digits.lstrip('0')
+        if not (len(digits) > 10 and digits.startswith(country_code)):
+            digits = country_code + digits
+
+    if not 8 <= len(digits) <= 15:
+        return ''
+    return '+' + digits
+
+
+class PhoneLookupCache:
+    """
+    Thread-safe LRU of ``(owner_id, phone_key) -> (lead_id, contact_id)``,
+    where ``owner_id`` is the sales executive the match was limited to, or
+    ``None`` for a match across all leads.
+
+    Entries are only hints: callers re-check the phone key on the rows they
+    load and ``discard()`` stale entries, so no cross-process invalidation is
+    needed.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+lookup_cache = PhoneLookupCache(maxsize=settings.PHONE_LOOKUP_CACHE_SIZE)
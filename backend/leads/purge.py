@@ -0,0 +1,115 @@
+"""
+Background purge of soft-deleted leads and tasks.
+
+Deleting a lead or task through the API only sets ``deleted_at`` (see
+core.models.SoftDeleteModel), so the request does one small UPDATE instead of
+cascading through every contact, task, visit and reminder of the account while
+holding their locks. The default managers hide the row straight away, which
+keeps lists, stats, the funnel, the forecast, search and reminders from
+counting it, and the delete can be undone for ``DELETE_UNDO_MINUTES``.
+
+Once the undo window has passed, ``purge_deleted`` removes the rows for good.
+Dependent rows go first, leaves before their parents, ``PURGE_BATCH_SIZE``
+rows per transaction with ``PURGE_PAUSE_SECONDS`` between batches, so no
+transaction holds many locks and a purge of a big account cannot saturate
+the database. A run that is interrupted leaves hidden rows behind and the
+next run picks up where it stopped. Undelete is refused past the window, so
+it never races a purge.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import undo_cutoff
+
+
+def _task_plan():
+    from tasks.models import Reminder, Visit, VisitFramework
+    from .models import SearchDocument
+
+    return [
+        (Reminder, 'task_id__in'),
+        (VisitFramework, 'visit__task_id__in'),
+        (SearchDocument, 'task_id__in'),
+        (Visit, 'task_id__in'),
+    ]
+
+
+def _lead_plan():
+    from tasks.models import TaskTemplate
+    from .models import Contact, DuplicateCandidate, LeadFramework, LeadStatusTransition, SearchDocument
+
+    return [
+        (Contact, 'lead_id__in'),
+        (LeadFramework, 'lead_id__in'),
+        (LeadStatusTransition, 'lead_id__in'),
+        (DuplicateCandidate, 'lead_a_id__in'),
+        (DuplicateCandidate, 'lead_b_id__in'),
+        (SearchDocument, 'lead_id__in'),
+        (TaskTemplate, 'lead_id__in'),
+    ]
+
+
+def _chunks(queryset, size):
+    """The primary keys of ``queryset`` in ascending chunks of ``size``."""
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def delete_in_batches(queryset, batch_size, pause=0, counts=None):
+    """
+    Delete the rows of ``queryset`` ``batch_size`` at a time, each batch in
+    its own transaction, sleeping ``pause`` seconds between batches. Returns
+    the rows deleted per model, including anything cascaded.
+    """
+    counts = Counter() if counts is None else counts
+    model = queryset.model
+    for ids in _chunks(queryset, batch_size):
+        with transaction.atomic():
+            _, deleted = model._base_manager.filter(pk__in=ids).delete()
+        counts.update(deleted)
+        if pause and len(ids) == batch_size:
+            time.sleep(pause)
+    return counts
+
+
+def _purge_tasks(ids, batch_size, pause, counts):
+    from tasks.models import Task
+
+    for model, lookup in _task_plan():
+        delete_in_batches(model._base_manager.filter(**{lookup: ids}), batch_size, pause, counts)
+    delete_in_batches(Task.all_objects.filter(pk__in=ids), batch_size, pause, counts)
+
+
+def purge_deleted(now=None, batch_size=None, pause=None):
+    """
+    Remove the leads and tasks deleted before the undo window, with their
+    dependent rows. Returns the number of rows removed per model.
+    """
+    from tasks.models import Task
+    from .models import Lead
+
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_PAUSE_SECONDS if pause is None else pause
+    cutoff = undo_cutoff(now)
+    counts = Counter()
+
+    for ids in _chunks(Task.all_objects.filter(deleted_at__lt=cutoff), batch_size):
+        _purge_tasks(ids, batch_size, pause, counts)
+
+    for lead_ids in _chunks(Lead.all_objects.filter(deleted_at__lt=cutoff), batch_size):
+        # Whatever tasks the lead still has, e.g. ones created after it was deleted
+        for ids in _chunks(Task.all_objects.filter(lead_id__in=lead_ids), batch_size):
+            _purge_tasks(ids, batch_size, pause, counts)
+        for model, lookup in _lead_plan():
+            delete_in_batches(model._base_manager.filter(**{lookup: lead_ids}), batch_size, pause, counts)
+        delete_in_batches(Lead.all_objects.filter(pk__in=lead_ids), batch_size, pause, counts)
+
+    return dict(counts)
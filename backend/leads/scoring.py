@@ -0,0 +1,156 @@
+"""
+Batch lead scoring.
+
+Features for every lead are read in one ``values_list`` pass into NumPy
+columns, scored with a weighted sum in a single vectorized step and written
+back in batched ``UPDATE``s. Each feature is mapped onto ``[0, 1]``; with the
+default ``LEAD_SCORE_WEIGHTS`` (summing to 100) scores range from 0 to 100.
+Won and lost leads score 0 so they sink below the open pipeline.
+
+Incremental runs only re-score leads changed since they were last scored:
+leads never scored, leads saved after ``scored_at`` and leads with a visit
+recorded or edited after it.
+"""
+import re
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+
+INTENT_VALUES = {'high': 1.0, 'medium': 0.5, 'low': 0.15}
+INTEREST_VALUES = {'high': 1.0, 'medium': 0.5, 'low': 0.1}
+CLIENT_TYPE_VALUES = {'foreign': 1.0, 'both': 0.8, 'indian': 0.5}
+CLOSED_STATUSES = ('won', 'lost')
+
+_AMOUNT = re.compile(r'(\d+(?:\.\d+)?)\s*(k|l|lakhs?|lacs?|cr|crores?|m|mn|million)?\b')
+_MULTIPLIERS = {
+    'k': 1e3, 'l': 1e5, 'lakh': 1e5, 'lakhs': 1e5, 'lac': 1e5, 'lacs': 1e5,
+    'cr': 1e7, 'crore': 1e7, 'crores': 1e7, 'm': 1e6, 'mn': 1e6, 'million': 1e6,
+}
+
+
+def parse_amount(text):
+    """
+    Largest amount mentioned in a free-text estimate such as ``'50k'``,
+    ``'₹2-3 lakh'`` or ``'1,20,000'``; 0 if there is none.
+    """
+    text = (text or '').lower().replace(',', '')
+    amounts = [float(n) * _MULTIPLIERS.get(unit or '', 1) for n, unit in _AMOUNT.findall(text)]
+    return max(amounts, default=0.0)
+
+
+def _encode(values, mapping):
+    """
+    Map a column of strings to floats, evaluating ``mapping`` (a dict or a
+    function) once per distinct value.
+    """
+    if not len(values):
+        return np.zeros(0)
+    uniques, inverse = np.unique(np.array(values, dtype=object), return_inverse=True)
+    lookup = mapping if callable(mapping) else (lambda value: mapping.get(value, 0.0))
+    return np.array([lookup(value) for value in uniques], dtype=float)[inverse]
+
+
+class LeadFeatures:
+    """Columnar scoring features for a set of leads."""
+
+    COLUMNS = [
+        'id', 'status', 'intent', 'decision_maker', 'cloud_spending',
+        'client_type', 'latest_interest', 'score',
+    ]
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) if rows else [()] * len(self.COLUMNS)
+        data = dict(zip(self.COLUMNS, columns))
+        self.ids = np.array(data['id'], dtype=np.int64)
+        self.closed = np.isin(np.array(data['status'], dtype=object), CLOSED_STATUSES)
+        self.previous = np.array(data['score'], dtype=float)
+        self.values = {
+            'intent': _encode(data['intent'], INTENT_VALUES),
+            'decision_maker': np.array(data['decision_maker'], dtype=float),
+            'cloud_spending': _encode(data['cloud_spending'], self.spend_value),
+            'client_type': _encode(data['client_type'], CLIENT_TYPE_VALUES),
+            'interest_level': _encode([v or '' for v in data['latest_interest']], INTEREST_VALUES),
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def spend_value(text):
+        """Monthly spend on a log scale, reaching 1 at ``LEAD_SCORE_SPEND_CAP``."""
+        amount = parse_amount(text)
+        return min(np.log1p(amount) / np.log1p(settings.LEAD_SCORE_SPEND_CAP), 1.0)
+
+    @classmethod
+    def load(cls, queryset, chunk_size=5000):
+        from tasks.models import Visit
+
+        latest_interest = Visit.objects.filter(task__lead=OuterRef('pk'), task__deleted_at__isnull=True).exclude(
+            interest_level=''
+        ).order_by('-created_at').values('interest_level')[:1]
+        rows = queryset.order_by().annotate(
+            latest_interest=Subquery(latest_interest)
+        ).values_list(*cls.COLUMNS)
+        return cls(list(rows.iterator(chunk_size=chunk_size)))
+
+
+def compute_scores(features, weights=None):
+    """Weighted scores for ``features``, rounded to two decimals."""
+    weights = weights or settings.LEAD_SCORE_WEIGHTS
+    scores = np.zeros(len(features))
+    for name, weight in weights.items():
+        scores += weight * features.values[name]
+    scores[features.closed] = 0.0
+    return np.round(scores, 2)
+
+
+def touched_leads(queryset):
+    """Leads whose score may be out of date."""
+    from tasks.models import Visit
+
+    visit_changed = Visit.objects.filter(
+        task__lead=OuterRef('pk'), task__deleted_at__isnull=True, updated_at__gt=OuterRef('scored_at')
+    )
+    return queryset.filter(
+        Q(scored_at__isnull=True) | Q(updated_at__gt=F('scored_at')) | Exists(visit_changed)
+    )
+
+
+def score_leads(queryset=None, incremental=False, batch_size=1000):
+    """
+    Score leads and store the results. Returns ``(scored, changed)``.
+
+    Scores are rounded, so many leads share one; rows are written with one
+    ``UPDATE ... WHERE id IN (...)`` per distinct score and batch, which is
+    far cheaper than ``bulk_update``'s per-row ``CASE``.
+
+    ``scored_at`` is set to the time the run started, so a lead edited while
+    the run is in progress is picked up again by the next incremental run.
+    """
+    from .models import Lead
+
+    started = timezone.now()
+    queryset = Lead.objects.all() if queryset is None else queryset
+    if incremental:
+        queryset = touched_leads(queryset)
+
+    features = LeadFeatures.load(queryset)
+    scores = compute_scores(features)
+    changed = int(np.count_nonzero(scores != features.previous))
+
+    if len(features):
+        distinct, groups = np.unique(scores, return_inverse=True)
+        order = np.argsort(groups, kind='stable')
+        bounds = np.searchsorted(groups[order], np.arange(len(distinct) + 1))
+        with transaction.atomic():
+            for index, score in enumerate(distinct.tolist()):
+                ids = features.ids[order[bounds[index]:bounds[index + 1]]].tolist()
+                for start in range(0, len(ids), batch_size):
+                    Lead.objects.filter(pk__in=ids[start:start + batch_size]).update(
+                        score=score, scored_at=started
+                    )
+    return len(features), changed
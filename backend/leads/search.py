@@ -0,0 +1,256 @@
+"""
+Full-text search over the free-text notes on leads, tasks and visits.
+
+Each lead, task or visit with notes has one ``SearchDocument`` row holding its
+notes joined into ``body``, the lead it belongs to and, for tasks and visits,
+the task. The row is rewritten when the model is saved with different notes
+(see ``SearchIndexed``), so the index never needs a full rebuild.
+
+The text index itself depends on the database:
+
+* SQLite: an external-content FTS5 table over ``body``, kept in sync by
+  triggers on ``search_documents`` and ranked with ``bm25()``.
+* PostgreSQL: a ``tsvector`` column with a GIN index, written alongside
+  ``body`` and ranked with ``ts_rank``.
+
+Both return a highlighted snippet around the matched words.
+"""
+import re
+from html import escape
+
+from django.db import connection, connections
+from django.db.models import Q
+
+
+# Notes indexed for each kind of document, in the order they are joined.
+SOURCES = {
+    'lead': ['research_notes', 'closing_strategy'],
+    'task': ['outcome_notes'],
+    'visit': ['deployment_pain_points', 'effort_and_team_involved', 'next_steps_agreed'],
+}
+
+FTS_TABLE = 'search_documents_fts'
+POSTGRES_CONFIG = 'english'
+SNIPPET_WORDS = 16
+
+# Markers put around matches by the database, swapped for <mark> after the
+# snippet has been HTML-escaped.
+_START, _STOP = '\x02', '\x03'
+_WORD = re.compile(r'\w+')
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END",
+    f"CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); END",
+    f"CREATE TRIGGER search_documents_au AFTER UPDATE OF body ON search_documents BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS search_documents_ai',
+    'DROP TRIGGER IF EXISTS search_documents_ad',
+    'DROP TRIGGER IF EXISTS search_documents_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRES_SCHEMA = [
+    'CREATE INDEX search_documents_vector_gin ON search_documents USING gin (vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS search_documents_vector_gin',
+]
+
+
+def install_text_index(schema_editor):
+    """Create the database-specific text index over ``search_documents``."""
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_SCHEMA, 'postgresql': POSTGRES_SCHEMA}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_text_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def document_body(instance, kind):
+    """The notes of ``instance`` joined into one text, or '' if it has none."""
+    return '\n\n'.join(
+        text.strip() for text in (getattr(instance, field) for field in SOURCES[kind]) if text and text.strip()
+    )
+
+
+def _postgres_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('body', config=POSTGRES_CONFIG)
+
+
+def index_document(instance, kind):
+    """
+    Write the search document for ``instance`` (a lead, task or visit), or
+    delete it if the instance has no notes.
+    """
+    from .models import SearchDocument
+
+    body = document_body(instance, kind)
+    documents = SearchDocument.objects.filter(kind=kind, object_id=instance.pk)
+    if not body:
+        documents.delete()
+        return
+
+    if kind == 'lead':
+        lead_id, task_id, visit_id = instance.pk, None, None
+    elif kind == 'task':
+        lead_id, task_id, visit_id = instance.lead_id, instance.pk, None
+        # A task moved to another lead takes its visit's document along.
+        SearchDocument.objects.filter(task_id=task_id).exclude(lead_id=lead_id).update(lead_id=lead_id)
+    else:
+        lead_id, task_id, visit_id = instance.task.lead_id, instance.task_id, instance.pk
+
+    values = {'body': body, 'lead_id': lead_id, 'task_id': task_id, 'visit_id': visit_id}
+    if not documents.update(**values):
+        SearchDocument.objects.create(
+            kind=kind, object_id=instance.pk, created_at=instance.created_at, **values
+        )
+    if connection.vendor == 'postgresql':
+        documents.update(vector=_postgres_vector())
+
+
+class SearchIndexed:
+    """
+    Model mixin that keeps the instance's ``SearchDocument`` in step with its
+    notes. The document is only rewritten when the notes (or the lead or task
+    it belongs to) changed since the instance was loaded.
+    """
+    search_kind = None
+    search_parent = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._indexed_state = instance._search_state()
+        return instance
+
+    def _search_state(self):
+        fields = [*SOURCES[self.search_kind], *([self.search_parent] if self.search_parent else [])]
+        if any(field not in self.__dict__ for field in fields):
+            return None
+        return tuple(self.__dict__[field] for field in fields)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        watched = {*SOURCES[self.search_kind], *([self.search_parent] if self.search_parent else [])}
+        if update_fields is not None and not watched.intersection(update_fields):
+            return
+        state = self._search_state()
+        if state is None or state != getattr(self, '_indexed_state', None):
+            index_document(self, self.search_kind)
+            self._indexed_state = state
+
+
+def visible_documents(user, queryset=None):
+    """
+    Documents ``user`` may see: sales executives see their own leads and the
+    tasks and visits assigned to them, as in the lead and task viewsets.
+    """
+    from .models import SearchDocument
+
+    queryset = SearchDocument.objects.all() if queryset is None else queryset
+    # Leave out soft-deleted leads and tasks; the task join is outer, so lead documents match too
+    queryset = queryset.filter(lead__deleted_at__isnull=True, task__deleted_at__isnull=True)
+    if user.is_sales_executive():
+        queryset = queryset.filter(owned_by(user.pk))
+    return queryset
+
+
+def owned_by(user_id):
+    """Lead documents of leads, and task/visit documents of tasks, assigned to ``user_id``."""
+    return Q(task__isnull=True, lead__assigned_to_id=user_id) | Q(task__assigned_to_id=user_id)
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _fts5_query(text):
+    """Quote every word so user input can't use (or break) FTS5 query syntax."""
+    return ' '.join(f'"{word}"' for word in _WORD.findall(text))
+
+
+def _search_sqlite(documents, text, limit, offset):
+    match = _fts5_query(text)
+    if not match:
+        return []
+    subquery, params = documents.values('id').query.sql_with_params()
+    sql = (
+        f"SELECT rowid, -bm25({FTS_TABLE}), "
+        f"snippet({FTS_TABLE}, 0, %s, %s, '…', {SNIPPET_WORDS}) "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({subquery}) "
+        f"ORDER BY bm25({FTS_TABLE}) LIMIT %s OFFSET %s"
+    )
+    # The database the router picked for ``documents``, which may be the replica
+    with connections[documents.db].cursor() as cursor:
+        cursor.execute(sql, [_START, _STOP, match, *params, limit, offset])
+        return cursor.fetchall()
+
+
+def _search_postgres(documents, text, limit, offset):
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+
+    query = SearchQuery(text, config=POSTGRES_CONFIG, search_type='websearch')
+    return list(
+        documents.filter(vector=query)
+        .annotate(
+            rank=SearchRank('vector', query),
+            highlight=SearchHeadline(
+                'body', query, config=POSTGRES_CONFIG, start_sel=_START, stop_sel=_STOP,
+                max_words=SNIPPET_WORDS, min_words=SNIPPET_WORDS // 2,
+            ),
+        )
+        .order_by('-rank', 'pk')
+        .values_list('pk', 'rank', 'highlight')[offset:offset + limit]
+    )
+
+
+def search(documents, text, limit=20, offset=0):
+    """
+    Rank the ``documents`` matching ``text``, best first.
+
+    Returns dicts with the document's kind, object and lead, a relevance
+    ``rank`` (higher is better) and an HTML-escaped ``highlight`` snippet with
+    the matched words in ``<mark>``.
+    """
+    if connections[documents.db].vendor == 'postgresql':
+        hits = _search_postgres(documents, text, limit, offset)
+    else:
+        hits = _search_sqlite(documents, text, limit, offset)
+    if not hits:
+        return []
+
+    rows = {
+        row['id']: row for row in documents.model.objects.using(documents.db).filter(pk__in=[pk for pk, _, _ in hits]).values(
+            'id', 'kind', 'object_id', 'lead_id', 'lead__company_name', 'lead__status', 'task_id', 'created_at'
+        )
+    }
+    results = []
+    for pk, rank, snippet in hits:
+        row = rows.get(pk)
+        if row is None:
+            # Removed between the two queries
+            continue
+        results.append({
+            'kind': row['kind'],
+            'id': row['object_id'],
+            'lead': row['lead_id'],
+            'lead_company_name': row['lead__company_name'],
+            'lead_status': row['lead__status'],
+            'task': row['task_id'],
+            'created_at': row['created_at'],
+            'rank': round(rank, 4),
+            'highlight': _highlight(snippet),
+        })
+    return results
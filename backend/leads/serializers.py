@@ -1,9 +1,28 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Lead, Contact
+from .frameworks import framework_slug
+from .models import Lead, Contact, DuplicateCandidate, FrameworkTag
 from users.serializers import UserSerializer
+from core.projection import ProjectionSerializerMixin
 
 
-class ContactSerializer(serializers.ModelSerializer):
+def validate_frameworks(value):
+    """Reject framework names whose tag (see leads.frameworks) would not fit ``FrameworkTag``."""
+    if value is None:
+        return value
+    if not isinstance(value, list):
+        raise serializers.ValidationError('Expected a list of framework names.')
+    slug_length = FrameworkTag._meta.get_field('slug').max_length
+    label_length = FrameworkTag._meta.get_field('label').max_length
+    for name in value:
+        if not isinstance(name, str):
+            raise serializers.ValidationError('Framework names must be strings.')
+        if len(name.strip()) > label_length or len(framework_slug(name)) > slug_length:
+            raise serializers.ValidationError(f'Framework name too long: {name[:label_length]!r}.')
+    return value
+
+
+class ContactSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for Contact model."""
     
     class Meta:
@@ -12,7 +31,7 @@ class ContactSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class LeadSerializer(serializers.ModelSerializer):
+class LeadSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for Lead model."""
     contacts = ContactSerializer(many=True, read_only=True)
     assigned_to_detail = UserSerializer(source='assigned_to', read_only=True)
@@ -22,15 +41,19 @@ class LeadSerializer(serializers.ModelSerializer):
         model = Lead
         fields = [
             'id', 'status', 'first_name', 'last_name', 'company_name', 'company_size',
-            'industry', 'city', 'state', 'phone', 'email',
+            'industry', 'city', 'canonical_city', 'locality', 'canonical_locality', 'state',
+            'phone', 'email',
             'frameworks_used', 'infrastructure', 'client_type', 'cloud_spending',
             'decision_maker', 'role',
             'intent', 'research_notes', 'closing_strategy', 'partnership_interest',
-            'won_reason', 'lost_reason',
+            'won_reason', 'lost_reason', 'score',
             'assigned_to', 'assigned_to_detail', 'created_by', 'created_by_detail',
-            'contacts', 'created_at', 'updated_at'
+            'contacts', 'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at', 'created_by']
+    
+    def validate_frameworks_used(self, value):
+        return validate_frameworks(value)
     
     def validate_status(self, value):
         """Ensure won/lost reasons are provided when status changes."""
@@ -48,19 +71,20 @@ class LeadCreateSerializer(serializers.ModelSerializer):
         model = Lead
         fields = [
             'status', 'first_name', 'last_name', 'company_name', 'company_size',
-            'industry', 'city', 'state', 'phone', 'email',
+            'industry', 'city', 'locality', 'state', 'phone', 'email',
             'frameworks_used', 'infrastructure', 'client_type', 'cloud_spending',
             'decision_maker', 'role',
             'intent', 'research_notes', 'closing_strategy', 'partnership_interest',
             'assigned_to', 'contacts'
         ]
     
+    def validate_frameworks_used(self, value):
+        return validate_frameworks(value)
+    
     def create(self, validated_data):
         contacts_data = validated_data.pop('contacts', [])
-        lead = Lead.objects.create(
-            created_by=self.context['request'].user,
-            **validated_data
-        )
+        validated_data.setdefault('created_by', self.context['request'].user)
+        lead = Lead.objects.create(**validated_data)
         for contact_data in contacts_data:
             Contact.objects.create(lead=lead, **contact_data)
         return lead
@@ -74,14 +98,18 @@ class LeadUpdateSerializer(serializers.ModelSerializer):
         model = Lead
         fields = [
             'status', 'first_name', 'last_name', 'company_name', 'company_size',
-            'industry', 'city', 'state', 'phone', 'email',
+            'industry', 'city', 'locality', 'state', 'phone', 'email',
             'frameworks_used', 'infrastructure', 'client_type', 'cloud_spending',
             'decision_maker', 'role',
             'intent', 'research_notes', 'closing_strategy', 'partnership_interest',
             'won_reason', 'lost_reason',
-            'assigned_to', 'contacts'
+            'assigned_to', 'contacts', 'version'
         ]
     
+    def validate_frameworks_used(self, value):
+        return validate_frameworks(value)
+    
+    @transaction.atomic
     def update(self, instance, validated_data):
         contacts_data = validated_data.pop('contacts', None)
         
@@ -98,3 +126,53 @@ class LeadUpdateSerializer(serializers.ModelSerializer):
                 Contact.objects.create(lead=instance, **contact_data)
         
         return instance
+
+
+class DuplicateCandidateSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
+    """Serializer for DuplicateCandidate model."""
+    lead_a_detail = LeadSerializer(source='lead_a', read_only=True)
+    lead_b_detail = LeadSerializer(source='lead_b', read_only=True)
+    
+    class Meta:
+        model = DuplicateCandidate
+        fields = [
+            'id', 'lead_a', 'lead_a_detail', 'lead_b', 'lead_b_detail',
+            'score', 'reasons', 'status', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class LeadMergeSerializer(serializers.Serializer):
+    """Serializer for merging duplicate leads into a surviving lead."""
+    survivor = serializers.PrimaryKeyRelatedField(queryset=Lead.objects.all())
+    duplicates = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    
+    def validate(self, attrs):
+        if attrs['survivor'].pk in attrs['duplicates']:
+            raise serializers.ValidationError({'duplicates': 'The surviving lead cannot also be merged away.'})
+        return attrs
+
+
+class LeadAutoAssignSerializer(serializers.Serializer):
+    """Serializer for auto-assigning leads; without ``ids`` every unassigned open lead is assigned."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000, required=False)
+
+
+class LeadRestoreSerializer(serializers.Serializer):
+    """Serializer for restoring archived leads."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000)
+
+
+class LeadBulkStatusSerializer(serializers.Serializer):
+    """Serializer for moving many leads to one status."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000)
+    status = serializers.ChoiceField(choices=Lead.STATUS_CHOICES)
+    won_reason = serializers.CharField(required=False, allow_blank=False)
+    lost_reason = serializers.CharField(required=False, allow_blank=False)
+    
+    def validate(self, attrs):
+        if attrs['status'] == 'won' and not attrs.get('won_reason'):
+            raise serializers.ValidationError({'won_reason': 'Won reason is required when status is Won.'})
+        if attrs['status'] == 'lost' and not attrs.get('lost_reason'):
+            raise serializers.ValidationError({'lost_reason': 'Lost reason is required when status is Lost.'})
+        return attrs
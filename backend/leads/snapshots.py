@@ -0,0 +1,131 @@
+"""
+Daily pipeline snapshots.
+
+Each snapshot is a handful of rows per day: lead counts by status, intent and
+owner as they stood at the end of that day. The trends endpoint only reads
+these rows, so its cost depends on the number of days shown, not on the
+number of leads.
+
+Status at the end of a past day is reconstructed from ``LeadStatusTransition``.
+Intent and owner have no history, so snapshots taken after the fact use their
+current values; the nightly job records them while they are still current.
+
+Archived leads (leads.archive) are counted too, so the nightly archive run
+does not show up as a drop in won and lost leads. They were closed and left
+untouched before being archived, so their status is their current one for
+every day after their last update; for earlier days it is read from the
+status history kept in the archive row.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+DIMENSION_COLUMNS = {
+    'status': 'snapshot_status',
+    'intent': 'intent',
+    'owner': 'assigned_to_id',
+}
+
+
+def end_of_day(day):
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def _key(value):
+    return '' if value is None else str(value)
+
+
+def _count_levels(queryset, counts):
+    """Add ``queryset``'s lead counts per dimension (it must annotate ``snapshot_status``) to ``counts``."""
+    for dimension, column in DIMENSION_COLUMNS.items():
+        for key, count in queryset.values_list(column).annotate(count=Count('id')).values_list(column, 'count'):
+            counts[dimension, _key(key)] += count
+
+
+def _archived_status_at(archived, end):
+    """Status of an archived lead just before ``end``, from the history in its archive row."""
+    status, latest = archived.status, None
+    for row in archived.data['rows']:
+        if row['model'] != 'leads.leadstatustransition':
+            continue
+        changed_at = row['fields']['changed_at']
+        if not isinstance(changed_at, datetime):
+            changed_at = parse_datetime(changed_at)
+        # Rows are in id order, so ``>=`` keeps the later of two equal timestamps
+        if changed_at < end and (latest is None or changed_at >= latest):
+            status, latest = row['fields']['to_status'], changed_at
+    return status
+
+
+def take_snapshot(day):
+    """(Re)write the snapshot rows for ``day``. Returns the number of rows written."""
+    from .models import ArchivedLead, Lead, LeadStatusTransition, PipelineSnapshot
+
+    end = end_of_day(day)
+    leads = Lead.objects.filter(created_at__lt=end).order_by()
+    if day >= timezone.localdate():
+        leads = leads.annotate(snapshot_status=F('status'))
+    else:
+        status_then = LeadStatusTransition.objects.filter(
+            lead=OuterRef('pk'), changed_at__lt=end
+        ).order_by('-changed_at', '-id').values('to_status')[:1]
+        leads = leads.annotate(snapshot_status=Coalesce(Subquery(status_then), 'status'))
+
+    counts = Counter()
+    _count_levels(leads, counts)
+    archived = ArchivedLead.objects.filter(created_at__lt=end).order_by()
+    _count_levels(archived.filter(updated_at__lt=end).annotate(snapshot_status=F('status')), counts)
+    for lead in archived.filter(updated_at__gte=end):
+        counts['status', _archived_status_at(lead, end)] += 1
+        counts['intent', _key(lead.intent)] += 1
+        counts['owner', _key(lead.assigned_to_id)] += 1
+
+    rows = [
+        PipelineSnapshot(date=day, dimension=dimension, key=key, count=count)
+        for (dimension, key), count in counts.items()
+    ]
+    with transaction.atomic():
+        PipelineSnapshot.objects.filter(date=day).delete()
+        PipelineSnapshot.objects.bulk_create(rows)
+    return len(rows)
+
+
+def take_snapshots(start, end):
+    """Snapshot every day from ``start`` to ``end`` inclusive. Returns the number of days."""
+    day = start
+    while day <= end:
+        take_snapshot(day)
+        day += timedelta(days=1)
+    return (end - start).days + 1
+
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def downsample(snapshots, interval):
+    """
+    Collapse ``(date, key, count)`` rows into one point per ``interval``.
+
+    Counts are levels, not flows, so each period is represented by its last
+    snapshot rather than a sum.
+    """
+    points = {}
+    for day, key, count in snapshots:
+        bucket = bucket_start(day, interval)
+        point = points.get(bucket)
+        if point is None or point['as_of'] < day:
+            point = points[bucket] = {'date': bucket, 'as_of': day, 'values': {}}
+        if point['as_of'] == day:
+            point['values'][key] = count
+    return [points[bucket] for bucket in sorted(points)]
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .archive import archive_leads
+from .purge import purge_deleted
+from .scoring import score_leads
+from .snapshots import take_snapshot
+
+
+@shared_task
+def score_touched_leads():
+    """Re-score leads changed since they were last scored."""
+    scored, changed = score_leads(incremental=True)
+    return {'scored': scored, 'changed': changed}
+
+
+@shared_task
+def snapshot_pipeline():
+    """Snapshot the pipeline as it stood at the end of yesterday."""
+    day = timezone.localdate() - timedelta(days=1)
+    return {'date': day.isoformat(), 'rows': take_snapshot(day)}
+
+
+@shared_task
+def archive_closed_leads():
+    """Move closed leads untouched for ARCHIVE_AFTER_DAYS to the archive."""
+    return {'archived': archive_leads()}
+
+
+@shared_task
+def purge_deleted_records():
+    """Remove leads and tasks deleted longer than DELETE_UNDO_MINUTES ago."""
+    return purge_deleted()
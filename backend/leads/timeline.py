@@ -0,0 +1,109 @@
+"""
+Chronological timeline of everything that happened to a lead.
+
+Tasks, visits, contacts, status changes and audit entries live in separate
+tables. Each source is read with one indexed query, newest first and limited
+to a page's worth of rows past the cursor, and the sorted streams are merged
+with a heap (``heapq.merge``), so a page never loads more than
+``sources x (page size + 1)`` rows.
+
+Entries are ordered by ``(timestamp, source, id)`` descending; the cursor is
+that key for the last entry of the previous page.
+"""
+import base64
+import heapq
+import json
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class TimelineSource:
+    """One table feeding the timeline."""
+
+    def __init__(self, name, rank, timestamp_field, fields, queryset):
+        self.name = name
+        self.rank = rank
+        self.timestamp_field = timestamp_field
+        self.fields = fields
+        self.queryset = queryset
+
+    def after(self, cursor):
+        """Rows that sort after ``cursor`` (i.e. are older), newest first."""
+        queryset = self.queryset
+        if cursor is not None:
+            timestamp, rank, pk = cursor
+            older = Q(**{f'{self.timestamp_field}__lt': timestamp})
+            if self.rank < rank:
+                older |= Q(**{self.timestamp_field: timestamp})
+            elif self.rank == rank:
+                older |= Q(**{self.timestamp_field: timestamp, 'pk__lt': pk})
+            queryset = queryset.filter(older)
+        return queryset.order_by(f'-{self.timestamp_field}', '-pk')
+
+    def entries(self, cursor, limit):
+        rows = self.after(cursor).values('pk', self.timestamp_field, *self.fields)[:limit]
+        for row in rows:
+            pk = row.pop('pk')
+            timestamp = row.pop(self.timestamp_field)
+            yield (timestamp, self.rank, pk), {
+                'type': self.name,
+                'id': pk,
+                'timestamp': timestamp,
+                'data': row,
+            }
+
+
+def lead_sources(lead):
+    from django.contrib.contenttypes.models import ContentType
+    from core.models import AuditLog
+    from tasks.models import Task, Visit
+    from .models import Contact, LeadStatusTransition
+
+    return [
+        TimelineSource('task', 0, 'created_at', [
+            'task_type', 'status', 'scheduled_at', 'outcome_notes', 'assigned_to__username',
+        ], Task.objects.filter(lead=lead)),
+        TimelineSource('visit', 1, 'created_at', [
+            'task_id', 'person_spoken_to', 'person_role', 'interest_level', 'frameworks_discussed',
+            'deployment_pain_points',
+        ], Visit.objects.filter(task__lead=lead, task__deleted_at__isnull=True)),
+        TimelineSource('contact', 2, 'created_at', [
+            'name', 'role', 'phone', 'email', 'decision_maker',
+        ], Contact.objects.filter(lead=lead)),
+        TimelineSource('status', 3, 'changed_at', [
+            'from_status', 'to_status', 'changed_by__username',
+        ], LeadStatusTransition.objects.filter(lead=lead)),
+        TimelineSource('audit', 4, 'created_at', [
+            'action', 'changes', 'user__username',
+        ], AuditLog.objects.filter(content_type=ContentType.objects.get_for_model(lead), object_id=lead.pk)),
+    ]
+
+
+def encode_cursor(key):
+    timestamp, rank, pk = key
+    raw = json.dumps([timestamp.isoformat(), rank, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Parse a cursor from ``encode_cursor``; raises ``ValueError`` if it is malformed."""
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        timestamp, rank, pk = json.loads(base64.urlsafe_b64decode(padded))
+        timestamp = parse_datetime(timestamp)
+    except (TypeError, ValueError) as exc:
+        raise ValueError('Invalid cursor.') from exc
+    if timestamp is None or not isinstance(rank, int) or not isinstance(pk, int):
+        raise ValueError('Invalid cursor.')
+    return timestamp, rank, pk
+
+
+def read_timeline(sources, cursor=None, limit=20):
+    """Return ``(entries, next_cursor)`` for one page."""
+    streams = [source.entries(cursor, limit + 1) for source in sources]
+    merged = list(islice(heapq.merge(*streams, key=lambda item: item[0], reverse=True), limit + 1))
+    page = merged[:limit]
+    next_cursor = encode_cursor(page[-1][0]) if len(merged) > limit else None
+    return [entry for _, entry in page], next_cursor
@@ -1,11 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LeadViewSet, ContactViewSet
+from .views import (
+    LeadViewSet, ContactViewSet, DuplicateCandidateViewSet, LeadLookupView,
+    CityAutocompleteView, PipelineTrendsView, LeadForecastView, NoteSearchView
+)
 
 router = DefaultRouter()
 router.register(r'leads', LeadViewSet, basename='lead')
 router.register(r'contacts', ContactViewSet, basename='contact')
+router.register(r'duplicates', DuplicateCandidateViewSet, basename='duplicate')
 
 urlpatterns = [
+    path('lookup/', LeadLookupView.as_view(), name='lead-lookup'),
+    path('cities/', CityAutocompleteView.as_view(), name='city-autocomplete'),
+    path('search/', NoteSearchView.as_view(), name='note-search'),
+    path('trends/', PipelineTrendsView.as_view(), name='pipeline-trends'),
+    path('forecast/', LeadForecastView.as_view(), name='lead-forecast'),
     path('', include(router.urls)),
 ]
@@ -2,26 +2,64 @@ from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.db.models import Q, Count, F
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
-from .models import Lead, Contact
+from datetime import date, timedelta
+from functools import reduce
+import operator
+from .models import (
+    Lead, Contact, DuplicateCandidate, LeadFramework, LeadStatusTransition, PipelineSnapshot,
+    SearchDocument, ArchivedLead
+)
+from .archive import ArchiveUnion, archived_leads, flag_archived, include_archived, restore_leads
+from .assignment import assign_leads, choose_assignee
+from .cities import city_directory
+from .dedup import merge_leads
+from .frameworks import parse_frameworks
+from .forecast import get_forecast
+from .funnel import FunnelHistory, bulk_change_status
+from .phone import lookup_cache, normalize_phone
+from .search import owned_by, search, visible_documents
+from .snapshots import downsample, end_of_day
+from .timeline import decode_cursor, lead_sources, read_timeline
 from .serializers import (
-    LeadSerializer, LeadCreateSerializer, LeadUpdateSerializer, ContactSerializer
+    LeadSerializer, LeadCreateSerializer, LeadUpdateSerializer, ContactSerializer,
+    DuplicateCandidateSerializer, LeadMergeSerializer, LeadBulkStatusSerializer,
+    LeadAutoAssignSerializer, LeadRestoreSerializer
 )
+from users.models import User
 from users.permissions import IsManagerOrAdmin, IsSalesExecutiveOrAbove
+from core.conditional import ConditionalRequestMixin
+from core.middleware import log_audit
+from core.projection import ProjectionViewSetMixin
+from core.replicas import ReplicaReadMixin
 
 
-class LeadViewSet(viewsets.ModelViewSet):
+class LeadViewSet(ReplicaReadMixin, ConditionalRequestMixin, ProjectionViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Lead management.
     """
     queryset = Lead.objects.all()
     permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    replica_actions = ('list', 'retrieve', 'stats', 'at_risk', 'funnel', 'cohorts', 'timeline')
+    throttle_costs = {
+        'stats': 5, 'funnel': 5, 'cohorts': 5, 'at_risk': 3, 'timeline': 2, 'auto_assign': 5, 'bulk_status': 3,
+    }
+    # Scores are written without touching updated_at.
+    conditional_timestamp_fields = ['updated_at', 'scored_at']
     
     def get_queryset(self):
-        user = self.request.user
         queryset = Lead.objects.select_related('assigned_to', 'created_by').prefetch_related('contacts')
+        return self.filter_leads(queryset)
+    
+    def filter_leads(self, queryset):
+        """Apply the list filters to ``queryset`` of ``Lead`` or ``ArchivedLead``."""
+        user = self.request.user
         
         # Sales executives see only their assigned leads
         if user.is_sales_executive():
@@ -34,7 +72,17 @@ class LeadViewSet(viewsets.ModelViewSet):
         
         city_filter = self.request.query_params.get('city')
         if city_filter:
-            queryset = queryset.filter(city__icontains=city_filter)
+            # Known cities and their aliases go through the canonical_city index;
+            # anything else falls back to matching the free text.
+            city = city_directory.resolve(city_filter)
+            if city is not None:
+                queryset = queryset.filter(canonical_city_id=city.pk)
+            else:
+                queryset = queryset.filter(city__icontains=city_filter)
+        
+        territory_filter = self.request.query_params.get('territory')
+        if territory_filter:
+            queryset = queryset.filter(canonical_city__territory__slug=territory_filter)
         
         intent_filter = self.request.query_params.get('intent')
         if intent_filter:
@@ -44,6 +92,10 @@ class LeadViewSet(viewsets.ModelViewSet):
         if assigned_to_filter and (user.is_sales_manager() or user.is_admin_user()):
             queryset = queryset.filter(assigned_to_id=assigned_to_filter)
         
+        frameworks_filter = self.request.query_params.get('frameworks')
+        if frameworks_filter:
+            queryset = self._filter_frameworks(queryset, parse_frameworks(frameworks_filter))
+        
         # Search
         search = self.request.query_params.get('search')
         if search:
@@ -57,6 +109,49 @@ class LeadViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def _filter_frameworks(self, queryset, slugs):
+        """
+        Keep leads using any (default) or, with ``frameworks_match=all``, every
+        one of ``slugs``. Matches are found through the (tag, lead) index on the
+        through-table rather than by scanning the JSON column.
+        """
+        match = self.request.query_params.get('frameworks_match', 'any')
+        if match not in ('any', 'all'):
+            raise serializers.ValidationError({'frameworks_match': "Must be 'any' or 'all'."})
+        
+        if queryset.model is ArchivedLead:
+            # Archived leads keep their tag slugs in one padded, space separated column
+            combine = operator.and_ if match == 'all' else operator.or_
+            return queryset.filter(reduce(combine, [Q(frameworks__contains=f' {slug} ') for slug in slugs], Q()))
+        
+        links = LeadFramework.objects.filter(tag__slug__in=slugs)
+        if match == 'all':
+            links = links.values('lead_id').annotate(matched=Count('tag_id')).filter(matched=len(slugs))
+        return queryset.filter(id__in=links.values('lead_id'))
+    
+    def list(self, request, *args, **kwargs):
+        """With ``include_archived=true``, archived leads are listed too, most recently updated first."""
+        if not include_archived(request):
+            return super().list(request, *args, **kwargs)
+        leads = ArchiveUnion(
+            self.filter_queryset(self.get_queryset()),
+            self.filter_leads(ArchivedLead.objects.all()),
+            ('-updated_at', '-id'),
+            archived_leads,
+        )
+        page = self.paginate_queryset(leads)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(flag_archived(serializer.data, page))
+    
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get('pk', '')
+        if include_archived(request) and pk.isdigit():
+            archived = self.filter_leads(ArchivedLead.objects.filter(pk=pk))
+            if archived.exists():
+                lead = archived_leads(archived)[0]
+                return Response(flag_archived([self.get_serializer(lead).data], [lead])[0])
+        return super().retrieve(request, *args, **kwargs)
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return LeadCreateSerializer
@@ -65,7 +160,15 @@ class LeadViewSet(viewsets.ModelViewSet):
         return LeadSerializer
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        user = self.request.user
+        fields = {'created_by': user}
+        if serializer.validated_data.get('assigned_to') is None:
+            # Sales executives only see their own leads, so keep theirs with them
+            if user.is_sales_executive():
+                fields['assigned_to'] = user
+            elif settings.LEAD_AUTO_ASSIGN:
+                fields['assigned_to_id'] = choose_assignee(serializer.validated_data.get('city'))
+        serializer.save(**fields)
     
     def perform_update(self, serializer):
         instance = serializer.instance
@@ -81,8 +184,119 @@ class LeadViewSet(viewsets.ModelViewSet):
                 'lost_reason': 'Lost reason is required when status is Lost.'
             })
         
+        instance._changed_by = self.request.user
         serializer.save()
     
+    def perform_destroy(self, instance):
+        """
+        Hide the lead and its tasks at once; they can be undeleted for
+        ``DELETE_UNDO_MINUTES`` and are then removed in the background (see
+        leads.purge).
+        """
+        instance.soft_delete()
+        log_audit(
+            self.request.user, 'delete', instance,
+            ip_address=self.request.META.get('REMOTE_ADDR'),
+            user_agent=self.request.META.get('HTTP_USER_AGENT', '')[:255],
+        )
+    
+    @action(detail=True, methods=['post'])
+    def undelete(self, request, pk=None):
+        """Bring back a lead deleted less than ``DELETE_UNDO_MINUTES`` ago, with its tasks."""
+        lead = get_object_or_404(self.filter_leads(Lead.all_objects.filter(deleted_at__isnull=False)), pk=pk)
+        if not lead.undelete():
+            return Response(
+                {'detail': 'This lead was deleted too long ago to be undeleted.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        log_audit(
+            request.user, 'update', lead,
+            changes={'undeleted': True},
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+        )
+        return Response(self.get_serializer(self.get_queryset().get(pk=lead.pk)).data)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsManagerOrAdmin])
+    def bulk_status(self, request):
+        """Move the leads in ``ids`` to ``status`` in one transaction."""
+        serializer = LeadBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        fields = {name: data[name] for name in ('won_reason', 'lost_reason') if name in data}
+        queryset = Lead.objects.filter(pk__in=self.get_queryset().filter(pk__in=data['ids']).values('pk'))
+        updated = bulk_change_status(queryset, data['status'], user=request.user, **fields)
+        return Response({'updated': updated})
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsManagerOrAdmin])
+    def auto_assign(self, request):
+        """
+        Assign unassigned open leads (those in ``ids``, or all of them) to sales
+        executives by territory and load.
+        """
+        serializer = LeadAutoAssignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = Lead.objects.all()
+        if 'ids' in serializer.validated_data:
+            queryset = queryset.filter(pk__in=serializer.validated_data['ids'])
+        assigned = assign_leads(queryset)
+        return Response({
+            'assigned': sum(assigned.values()),
+            'by_user': [{'user': user_id, 'count': count} for user_id, count in assigned.items()],
+        })
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsManagerOrAdmin])
+    def restore(self, request):
+        """Move the archived leads in ``ids`` back, with their tasks (see leads.archive)."""
+        serializer = LeadRestoreSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        restored = restore_leads(ArchivedLead.objects.filter(pk__in=serializer.validated_data['ids']))
+        return Response({'restored': restored})
+    
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        Tasks, visits, contacts, status changes and audit entries for the lead,
+        newest first. Follow ``next`` for older entries.
+        """
+        lead = get_object_or_404(self.get_queryset().select_related(None).prefetch_related(None).only('id'), pk=pk)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            cursor = request.query_params.get('cursor')
+            cursor = decode_cursor(cursor) if cursor else None
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries, next_cursor = read_timeline(lead_sources(lead), cursor, limit)
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({'next': next_url, 'results': entries})
+    
+    def _funnel_history(self):
+        leads = self.get_queryset().values('id')
+        return FunnelHistory.load(LeadStatusTransition.objects.filter(lead_id__in=leads))
+    
+    @action(detail=False, methods=['get'])
+    def funnel(self, request):
+        """Time spent in each stage and conversion from each stage to won/lost."""
+        history = self._funnel_history()
+        stages = [value for value, _ in Lead.STATUS_CHOICES]
+        return Response({
+            'durations': history.stage_durations(stages),
+            'conversion': history.conversion_rates(['open', 'sales_nurture']),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def cohorts(self, request):
+        """Monthly cohorts with their cumulative win rate by week since entering the funnel."""
+        try:
+            weeks = min(max(int(request.query_params.get('weeks', 12)), 1), 52)
+        except ValueError:
+            return Response({'weeks': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self._funnel_history().cohort_curves(weeks=weeks))
+    
     @action(detail=False, methods=['get'])
     def at_risk(self, request):
         """Get leads without future tasks (at risk)."""
@@ -94,7 +308,7 @@ class LeadViewSet(viewsets.ModelViewSet):
             scheduled_at__gte=timezone.now()
         ).values_list('lead_id', flat=True).distinct()
         
-        queryset = self.get_queryset().exclude(id__in=leads_with_tasks)
+        queryset = self.project_queryset(self.get_queryset().exclude(id__in=leads_with_tasks))
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -107,13 +321,25 @@ class LeadViewSet(viewsets.ModelViewSet):
             'total': queryset.count(),
             'by_status': dict(queryset.values('status').annotate(count=Count('id')).values_list('status', 'count')),
             'by_intent': dict(queryset.values('intent').annotate(count=Count('id')).values_list('intent', 'count')),
-            'by_city': dict(queryset.values('city').annotate(count=Count('id')).values_list('city', 'count')),
+            'by_city': dict(
+                queryset.annotate(city_name=Coalesce('canonical_city__name', 'city'))
+                .values('city_name').annotate(count=Count('id')).values_list('city_name', 'count')
+            ),
+            'by_territory': dict(
+                queryset.filter(canonical_city__isnull=False)
+                .values('canonical_city__territory__slug').annotate(count=Count('id'))
+                .values_list('canonical_city__territory__slug', 'count')
+            ),
+            'by_framework': dict(
+                LeadFramework.objects.filter(lead_id__in=queryset.values('id'))
+                .values('tag__slug').annotate(count=Count('lead_id')).values_list('tag__slug', 'count')
+            ),
         }
         
         return Response(stats)
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(ProjectionViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Contact management.
     """
@@ -132,4 +358,311 @@ class ContactViewSet(viewsets.ModelViewSet):
         if lead_id:
             queryset = queryset.filter(lead_id=lead_id)
         
+        return queryset.filter(lead__deleted_at__isnull=True)
+    
+    def _touch_lead(self, lead_id):
+        # Contacts are rendered inside the lead, so bump its validators and version.
+        Lead.objects.filter(pk=lead_id).update(updated_at=timezone.now(), version=F('version') + 1)
+    
+    def perform_create(self, serializer):
+        contact = serializer.save()
+        self._touch_lead(contact.lead_id)
+    
+    def perform_update(self, serializer):
+        contact = serializer.save()
+        self._touch_lead(contact.lead_id)
+    
+    def perform_destroy(self, instance):
+        lead_id = instance.lead_id
+        instance.delete()
+        self._touch_lead(lead_id)
+
+
+class DuplicateCandidateViewSet(ProjectionViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Review queue of possible duplicate leads, highest score first.
+    
+    Run ``python manage.py find_duplicates`` to refresh the queue.
+    """
+    queryset = DuplicateCandidate.objects.all()
+    serializer_class = DuplicateCandidateSerializer
+    permission_classes = [IsAuthenticated, IsManagerOrAdmin]
+    
+    def get_queryset(self):
+        queryset = DuplicateCandidate.objects.select_related(
+            'lead_a', 'lead_a__assigned_to', 'lead_a__created_by',
+            'lead_b', 'lead_b__assigned_to', 'lead_b__created_by',
+        ).prefetch_related('lead_a__contacts', 'lead_b__contacts').filter(
+            lead_a__deleted_at__isnull=True, lead_b__deleted_at__isnull=True
+        )
+        
+        status_filter = self.request.query_params.get('status', 'pending')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        
+        min_score = self.request.query_params.get('min_score')
+        if min_score:
+            queryset = queryset.filter(score__gte=min_score)
+        
+        return queryset
+    
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """Mark a pair as not being duplicates."""
+        candidate = self.get_object()
+        candidate.status = 'dismissed'
+        candidate.save(update_fields=['status'])
+        return Response(self.get_serializer(candidate).data)
+    
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Merge the pair, keeping ``survivor`` (defaults to the older lead)."""
+        candidate = self.get_object()
+        survivor_id = request.data.get('survivor', candidate.lead_a_id)
+        if str(survivor_id) not in (str(candidate.lead_a_id), str(candidate.lead_b_id)):
+            raise serializers.ValidationError({'survivor': 'Must be one of the two leads in the pair.'})
+        if str(survivor_id) == str(candidate.lead_a_id):
+            survivor, duplicate_id = candidate.lead_a, candidate.lead_b_id
+        else:
+            survivor, duplicate_id = candidate.lead_b, candidate.lead_a_id
+        return self._merge(request, survivor, [duplicate_id])
+    
+    @action(detail=False, methods=['post'])
+    def bulk_merge(self, request):
+        """Merge any number of ``duplicates`` into ``survivor``."""
+        serializer = LeadMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._merge(request, serializer.validated_data['survivor'], serializer.validated_data['duplicates'])
+    
+    def _merge(self, request, survivor, duplicate_ids):
+        counts = merge_leads(survivor, duplicate_ids)
+        survivor = Lead.objects.select_related('assigned_to', 'created_by').prefetch_related('contacts').get(pk=survivor.pk)
+        log_audit(
+            request.user, 'update', survivor,
+            changes={'merged_leads': duplicate_ids},
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+        )
+        return Response({
+            'survivor': LeadSerializer(survivor, context=self.get_serializer_context()).data,
+            **counts,
+        })
+
+
+class LeadLookupView(APIView):
+    """
+    Resolve a phone number to a lead (caller ID).
+    
+    ``GET /api/leads/lookup/?phone=+91 98450 12345`` returns the lead whose own
+    number or one of whose contacts' numbers matches, plus the matching contact.
+    """
+    permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    
+    def get(self, request):
+        phone_key = normalize_phone(request.query_params.get('phone', ''))
+        if not phone_key:
+            return Response({'phone': 'A valid phone number is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Sales executives only match their own leads; everyone else matches any lead
+        owner_id = request.user.pk if request.user.is_sales_executive() else None
+        match = self._cached_match(phone_key, owner_id) or self._find_match(phone_key, owner_id)
+        if match is None:
+            return Response({'detail': 'No lead found for this number.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        lead, contact = match
+        return Response({
+            'lead': LeadSerializer(lead, context={'request': request}).data,
+            'contact': ContactSerializer(contact).data if contact else None,
+        })
+    
+    def _leads(self, owner_id):
+        queryset = Lead.objects.select_related('assigned_to', 'created_by').prefetch_related('contacts')
+        if owner_id is not None:
+            queryset = queryset.filter(assigned_to_id=owner_id)
         return queryset
+    
+    def _cached_match(self, phone_key, owner_id):
+        entry = lookup_cache.get((owner_id, phone_key))
+        if entry is None:
+            return None
+        lead_id, contact_id = entry
+        lead = self._leads(owner_id).filter(pk=lead_id).first()
+        contact = None
+        if lead is not None and contact_id is not None:
+            contact = next((c for c in lead.contacts.all() if c.pk == contact_id), None)
+        # The number or the lead's owner may have changed since the entry was cached.
+        owner = contact if contact_id is not None else lead
+        if owner is None or owner.phone_key != phone_key:
+            lookup_cache.discard((owner_id, phone_key))
+            return None
+        return lead, contact
+    
+    def _find_match(self, phone_key, owner_id):
+        lead = self._leads(owner_id).filter(phone_key=phone_key).order_by('-updated_at').first()
+        contact = None
+        if lead is None:
+            contacts = Contact.objects.filter(phone_key=phone_key, lead__deleted_at__isnull=True)
+            if owner_id is not None:
+                contacts = contacts.filter(lead__assigned_to_id=owner_id)
+            contact = contacts.order_by('-created_at').first()
+            if contact is None:
+                return None
+            lead = self._leads(owner_id).get(pk=contact.lead_id)
+        lookup_cache.set((owner_id, phone_key), (lead.pk, contact.pk if contact else None))
+        return lead, contact
+
+
+class CityAutocompleteView(APIView):
+    """
+    Suggest canonical cities for a typed prefix.
+    
+    ``GET /api/leads/cities/?q=beng`` matches city names and aliases and is
+    served from the in-memory city directory.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'limit': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cities = city_directory.search(request.query_params.get('q', ''), limit=limit)
+        return Response([
+            {
+                'id': city.pk,
+                'name': city.name,
+                'state': city.state,
+                'territory': city.territory.slug,
+            }
+            for city in cities
+        ])
+
+
+class NoteSearchView(ReplicaReadMixin, APIView):
+    """
+    Full-text search over lead, task and visit notes (see leads.search).
+    
+    ``GET /api/leads/search/?q=kubernetes migration`` returns the best matches
+    first with a highlighted snippet. Narrow with ``kind``, ``status`` (of the
+    lead), ``owner`` (user id) and ``date_from``/``date_to`` (YYYY-MM-DD, on
+    when the note's record was created). Sales executives only see their own
+    leads, tasks and visits.
+    """
+    permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    replica_actions = ('get',)
+    throttle_costs = {'get': 5}
+    
+    def get(self, request):
+        params = request.query_params
+        text = params.get('q', '').strip()
+        if not text:
+            return Response({'q': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(params.get('limit', 20)), 1), 100)
+            offset = max(int(params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'detail': 'limit and offset must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        documents = visible_documents(request.user)
+        kind = params.get('kind')
+        if kind:
+            if kind not in dict(SearchDocument.KIND_CHOICES):
+                return Response({'kind': 'Must be one of lead, task, visit.'}, status=status.HTTP_400_BAD_REQUEST)
+            documents = documents.filter(kind=kind)
+        lead_status = params.get('status')
+        if lead_status:
+            documents = documents.filter(lead__status=lead_status)
+        owner = params.get('owner')
+        if owner:
+            if not owner.isdigit():
+                return Response({'owner': 'Must be a user id.'}, status=status.HTTP_400_BAD_REQUEST)
+            documents = documents.filter(owned_by(int(owner)))
+        for name, lookup, to_bound in (
+            ('date_from', 'created_at__gte', lambda day: end_of_day(day - timedelta(days=1))),
+            ('date_to', 'created_at__lt', end_of_day),
+        ):
+            if params.get(name):
+                try:
+                    day = date.fromisoformat(params[name])
+                except ValueError:
+                    return Response({name: 'Must be a date (YYYY-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+                documents = documents.filter(**{lookup: to_bound(day)})
+        
+        results = search(documents, text, limit=limit + 1, offset=offset)
+        next_url = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+        return Response({'next': next_url, 'results': results})
+
+
+class PipelineTrendsView(ReplicaReadMixin, APIView):
+    """
+    Pipeline counts over time, read from daily snapshots.
+    
+    ``GET /api/leads/trends/?dimension=status&days=90&interval=week`` returns one
+    point per day, week or month with the counts as of the last snapshot in it.
+    """
+    permission_classes = [IsAuthenticated, IsManagerOrAdmin]
+    replica_actions = ('get',)
+    throttle_costs = {'get': 5}
+    INTERVALS = ('day', 'week', 'month')
+    
+    def get(self, request):
+        dimension = request.query_params.get('dimension', 'status')
+        interval = request.query_params.get('interval', 'day')
+        if dimension not in dict(PipelineSnapshot.DIMENSION_CHOICES):
+            return Response({'dimension': 'Must be one of status, intent, owner.'}, status=status.HTTP_400_BAD_REQUEST)
+        if interval not in self.INTERVALS:
+            return Response({'interval': 'Must be one of day, week, month.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = min(max(int(request.query_params.get('days', 90)), 1), 730)
+        except ValueError:
+            return Response({'days': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        since = timezone.localdate() - timedelta(days=days - 1)
+        rows = PipelineSnapshot.objects.filter(
+            dimension=dimension, date__gte=since
+        ).order_by('date').values_list('date', 'key', 'count')
+        data = {
+            'dimension': dimension,
+            'interval': interval,
+            'series': downsample(rows, interval),
+        }
+        if dimension == 'owner':
+            owner_ids = {key for point in data['series'] for key in point['values'] if key}
+            data['labels'] = {
+                str(user.pk): user.get_full_name() or user.username
+                for user in User.objects.filter(pk__in=owner_ids).only('username', 'first_name', 'last_name')
+            }
+        return Response(data)
+
+
+class LeadForecastView(ReplicaReadMixin, APIView):
+    """
+    Expected wins over the next ``weeks`` weeks, per rep and for the team.
+    
+    ``GET /api/leads/forecast/?weeks=12`` returns cumulative expected wins by
+    week, projected from historical stage conversion (see leads.forecast).
+    """
+    permission_classes = [IsAuthenticated, IsManagerOrAdmin]
+    replica_actions = ('get',)
+    throttle_costs = {'get': 5}
+    
+    def get(self, request):
+        try:
+            weeks = min(max(int(request.query_params.get('weeks', 12)), 1), 52)
+        except ValueError:
+            return Response({'weeks': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        forecast = get_forecast(weeks)
+        user_ids = [rep['user_id'] for rep in forecast['reps'] if rep['user_id']]
+        names = {
+            user.pk: user.get_full_name() or user.username
+            for user in User.objects.filter(pk__in=user_ids).only('username', 'first_name', 'last_name')
+        }
+        return Response({
+            **forecast,
+            'reps': [{**rep, 'name': names.get(rep['user_id'], '')} for rep in forecast['reps']],
+        })
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task, Visit
+from .models import Reminder, Task, TaskTemplate, Visit
 
 
 @admin.register(Task)
@@ -8,6 +8,7 @@ class TaskAdmin(admin.ModelAdmin):
     list_filter = ['task_type', 'status', 'scheduled_at']
     search_fields = ['lead__company_name', 'lead__first_name', 'lead__last_name']
     date_hierarchy = 'scheduled_at'
+    readonly_fields = ['version']
 
 
 @admin.register(Visit)
@@ -15,3 +16,21 @@ class VisitAdmin(admin.ModelAdmin):
     list_display = ['task', 'person_spoken_to', 'interest_level', 'meeting_permitted', 'created_at']
     list_filter = ['interest_level', 'meeting_permitted', 'meeting_declined', 'meeting_rescheduled']
     search_fields = ['task__lead__company_name', 'person_spoken_to']
+    readonly_fields = ['version']
+
+
+@admin.register(TaskTemplate)
+class TaskTemplateAdmin(admin.ModelAdmin):
+    list_display = ['task_type', 'lead', 'frequency', 'interval', 'starts_at', 'assigned_to', 'active']
+    list_filter = ['task_type', 'frequency', 'active']
+    search_fields = ['lead__company_name']
+    readonly_fields = ['materialized_until']
+
+
+@admin.register(Reminder)
+class ReminderAdmin(admin.ModelAdmin):
+    list_display = ['task', 'user', 'due_at', 'status', 'sent_at']
+    list_filter = ['status', 'due_at']
+    search_fields = ['task__lead__company_name', 'user__username']
+    raw_id_fields = ['task']
+    readonly_fields = ['claim', 'claimed_at', 'sent_at']
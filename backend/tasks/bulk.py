@@ -0,0 +1,57 @@
+"""
+Set-based changes to many tasks at once (reschedule, reassign, change status).
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+CHUNK_SIZE = 1000
+
+
+def bulk_update_tasks(queryset, reschedule_by=None, assign_to=None, status=None):
+    """
+    Apply the given changes to every task in ``queryset`` in one transaction.
+
+    ``reschedule_by`` is a ``timedelta`` added to ``scheduled_at``,
+    ``assign_to`` a user and ``status`` a task status. Each chunk of tasks is
+    written with a single ``UPDATE`` that also bumps ``version`` and
+    ``updated_at``; pending reminders follow the new assignee and are
+    cancelled for moved or closed tasks (see tasks.reminders).
+
+    Returns ``(ids, counts)``: the ids of the matched tasks and how many of
+    them each change actually affected.
+    """
+    from .models import Reminder, Task
+
+    fields = {}
+    if reschedule_by is not None:
+        fields['scheduled_at'] = F('scheduled_at') + reschedule_by
+    if assign_to is not None:
+        fields['assigned_to'] = assign_to
+    if status is not None:
+        fields['status'] = status
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            queryset.order_by('pk').select_for_update().values_list('id', 'assigned_to_id', 'status')
+        )
+        ids = [task_id for task_id, _, _ in rows]
+        counts = {'matched': len(ids)}
+        if reschedule_by is not None:
+            counts['rescheduled'] = len(ids) if reschedule_by else 0
+        if assign_to is not None:
+            counts['reassigned'] = sum(1 for _, user_id, _ in rows if user_id != assign_to.pk)
+        if status is not None:
+            counts['status_changed'] = sum(1 for _, _, current in rows if current != status)
+
+        for start in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[start:start + CHUNK_SIZE]
+            Task.objects.filter(pk__in=chunk).update(updated_at=now, version=F('version') + 1, **fields)
+            reminders = Reminder.objects.filter(task_id__in=chunk, status='pending')
+            if reschedule_by or (status is not None and status != 'planned'):
+                reminders.update(status='cancelled')
+            elif assign_to is not None:
+                reminders.update(user=assign_to)
+    return ids, counts
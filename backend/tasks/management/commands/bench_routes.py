@@ -0,0 +1,49 @@
+"""
+Benchmark the visit route solver on synthetic stops (no database access).
+
+Usage:
+    python manage.py bench_routes [--stops 25 50 100 200] [--runs 5]
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from leads.cities import haversine_matrix
+from tasks.routes import nearest_neighbour, path_length, solve
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the visit route solver on synthetic stops.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stops', type=int, nargs='+', default=[25, 50, 100, 200])
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(42)
+        self.stdout.write('stops  matrix    solve     scheduled km  nearest km  solved km')
+        for count in options['stops']:
+            timings, lengths = [], []
+            for _ in range(options['runs']):
+                # Stops spread over a ~30 km city, in random (as-scheduled) order
+                points = np.column_stack([
+                    12.97 + rng.uniform(-0.14, 0.14, count), 77.59 + rng.uniform(-0.14, 0.14, count)
+                ])
+                started = time.perf_counter()
+                matrix = haversine_matrix(points)
+                built = time.perf_counter()
+                order = solve(matrix)
+                finished = time.perf_counter()
+                timings.append((built - started, finished - built))
+                lengths.append((
+                    path_length(matrix, list(range(count))),
+                    path_length(matrix, nearest_neighbour(matrix)),
+                    path_length(matrix, order),
+                ))
+            matrix_time, solve_time = np.mean(timings, axis=0)
+            scheduled, nearest, solved = np.mean(lengths, axis=0)
+            self.stdout.write(
+                f'{count:>5}  {matrix_time * 1000:6.2f}ms  {solve_time * 1000:7.1f}ms  '
+                f'{scheduled:12.1f}  {nearest:10.1f}  {solved:9.1f}'
+            )
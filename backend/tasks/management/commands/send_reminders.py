@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tasks.reminders import deliver_digest, due_assignees, plan_reminders, release_stale_claims
+
+
+class Command(BaseCommand):
+    help = 'Plan reminders for upcoming tasks and send due digests in this process, without Celery workers.'
+
+    def handle(self, *args, **options):
+        planned = plan_reminders()
+        release_stale_claims()
+        sent = sum(deliver_digest(user_id) for user_id in due_assignees())
+        self.stdout.write(self.style.SUCCESS(f'Planned {planned} reminders; sent {sent}.'))
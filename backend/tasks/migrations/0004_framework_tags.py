@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from leads.frameworks import framework_slug
+
+
+BATCH_SIZE = 2000
+
+
+def backfill_visit_frameworks(apps, schema_editor):
+    """Create tags and through rows for existing visits in primary-key ordered batches."""
+    FrameworkTag = apps.get_model('leads', 'FrameworkTag')
+    Visit = apps.get_model('tasks', 'Visit')
+    VisitFramework = apps.get_model('tasks', 'VisitFramework')
+    tag_ids = {}
+    last_pk = 0
+    while True:
+        batch = list(
+            Visit.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'frameworks_discussed')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        links = set()
+        for pk, names in batch:
+            for name in names or []:
+                slug = framework_slug(name)
+                if not slug:
+                    continue
+                if slug not in tag_ids:
+                    tag_ids[slug] = FrameworkTag.objects.get_or_create(
+                        slug=slug, defaults={'label': str(name).strip()}
+                    )[0].pk
+                links.add((pk, tag_ids[slug]))
+        VisitFramework.objects.bulk_create(
+            [VisitFramework(visit_id=pk, tag_id=tag_id) for pk, tag_id in links],
+            ignore_conflicts=True,
+        )
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0006_framework_tags'),
+        ('tasks', '0003_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitFramework',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visit_links', to='leads.frameworktag')),
+                ('visit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='framework_links', to='tasks.visit')),
+            ],
+            options={
+                'db_table': 'visit_frameworks',
+            },
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='frameworks',
+            field=models.ManyToManyField(blank=True, help_text='Normalized from frameworks_discussed', related_name='visits', through='tasks.VisitFramework', to='leads.frameworktag'),
+        ),
+        migrations.AddIndex(
+            model_name='visitframework',
+            index=models.Index(fields=['tag', 'visit'], name='visit_frame_tag_id_2ed1e2_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='visitframework',
+            unique_together={('visit', 'tag')},
+        ),
+        migrations.RunPython(backfill_visit_frameworks, migrations.RunPython.noop),
+    ]
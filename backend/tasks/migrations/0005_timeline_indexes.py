@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0011_timeline_indexes'),
+        ('tasks', '0004_framework_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['lead', 'created_at'], name='tasks_lead_id_7990ed_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_timeline_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheduled_for', models.DateTimeField(help_text='Task.scheduled_at when the reminder was planned')),
+                ('due_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('claimed', 'Claimed by a worker'), ('sent', 'Sent'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('claim', models.UUIDField(blank=True, help_text='Delivery attempt holding the reminder', null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reminders',
+                'ordering': ['due_at'],
+                'indexes': [models.Index(fields=['status', 'due_at'], name='reminders_status_e2eadb_idx'), models.Index(fields=['user', 'status', 'due_at'], name='reminders_user_id_2b341a_idx'), models.Index(fields=['claim'], name='reminders_claim_786b2d_idx')],
+                'unique_together': {('task', 'scheduled_for')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0012_search_documents'),
+        ('tasks', '0006_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='occurrence_at',
+            field=models.DateTimeField(blank=True, help_text='The template occurrence this task was created for', null=True),
+        ),
+        migrations.CreateModel(
+            name='TaskTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(choices=[('visit', 'Visit'), ('online_meeting', 'Online Meeting'), ('call', 'Call'), ('whatsapp', 'WhatsApp')], max_length=20)),
+                ('starts_at', models.DateTimeField(help_text='First occurrence; later ones keep its local time of day')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Every N days/weeks/months')),
+                ('weekdays', models.JSONField(blank=True, default=list, help_text='For weekly rules: 0=Monday ... 6=Sunday')),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Stop after this many occurrences', null=True)),
+                ('until', models.DateTimeField(blank=True, help_text='No occurrences after this', null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('materialized_until', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assigned_to', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_templates', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_task_templates', to=settings.AUTH_USER_MODEL)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_templates', to='leads.lead')),
+            ],
+            options={
+                'db_table': 'task_templates',
+                'ordering': ['starts_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='tasks.tasktemplate'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='task',
+            unique_together={('template', 'occurrence_at')},
+        ),
+        migrations.AddIndex(
+            model_name='tasktemplate',
+            index=models.Index(fields=['active', 'materialized_until'], name='task_templa_active_eec923_idx'),
+        ),
+    ]
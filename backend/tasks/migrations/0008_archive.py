@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:39
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0014_archive'),
+        ('tasks', '0007_task_templates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Id of the task', primary_key=True, serialize=False)),
+                ('task_type', models.CharField(choices=[('visit', 'Visit'), ('online_meeting', 'Online Meeting'), ('call', 'Call'), ('whatsapp', 'WhatsApp')], max_length=20)),
+                ('status', models.CharField(choices=[('planned', 'Planned'), ('completed', 'Completed'), ('missed', 'Missed')], max_length=20)),
+                ('scheduled_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='leads.archivedlead')),
+            ],
+            options={
+                'db_table': 'archived_tasks',
+                'ordering': ['scheduled_at'],
+                'indexes': [models.Index(fields=['scheduled_at', 'id'], name='archived_ta_schedul_c51f10_idx'), models.Index(fields=['assigned_to', 'scheduled_at'], name='archived_ta_assigne_e2589f_idx'), models.Index(fields=['lead', 'scheduled_at'], name='archived_ta_lead_id_988557_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from core.models import SoftDeleteModel, VersionedModel
+from leads.frameworks import sync_framework_tags
+from leads.search import SearchIndexed
 
 
-class Task(models.Model):
+class Task(SearchIndexed, SoftDeleteModel, VersionedModel):
     """
     Task model for tracking visits, calls, meetings, and WhatsApp follow-ups.
     """
@@ -19,6 +23,9 @@ class Task(models.Model):
         ('missed', 'Missed'),
     ]
     
+    search_kind = 'task'
+    search_parent = 'lead_id'
+    
     task_type = models.CharField(max_length=20, choices=TASK_TYPE_CHOICES)
     lead = models.ForeignKey('leads.Lead', on_delete=models.CASCADE, related_name='tasks')
     scheduled_at = models.DateTimeField()
@@ -31,23 +38,38 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='planned')
     outcome_notes = models.TextField(blank=True)
     next_action_required = models.BooleanField(default=False)
+    template = models.ForeignKey(
+        'TaskTemplate',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences'
+    )
+    occurrence_at = models.DateTimeField(
+        null=True, blank=True, help_text="The template occurrence this task was created for"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'tasks'
+        unique_together = ['template', 'occurrence_at']
         ordering = ['scheduled_at']
         indexes = [
             models.Index(fields=['status', 'scheduled_at']),
             models.Index(fields=['lead', 'status']),
             models.Index(fields=['assigned_to', 'scheduled_at']),
+            models.Index(fields=['lead', 'created_at']),
+            models.Index(
+                fields=['deleted_at'], name='tasks_deleted_at_idx', condition=models.Q(deleted_at__isnull=False)
+            ),
         ]
     
     def __str__(self):
         return f"{self.get_task_type_display()} - {self.lead.company_name} - {self.scheduled_at}"
 
 
-class Visit(models.Model):
+class Visit(SearchIndexed, VersionedModel):
     """
     Detailed visit information for on-field visits.
     """
@@ -57,12 +79,22 @@ class Visit(models.Model):
         ('high', 'High'),
     ]
     
+    search_kind = 'visit'
+    search_parent = 'task_id'
+    
     task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name='visit_details')
     
     # Meeting Details
     person_spoken_to = models.CharField(max_length=100, blank=True)
     person_role = models.CharField(max_length=100, blank=True)
     frameworks_discussed = models.JSONField(default=list, blank=True)
+    frameworks = models.ManyToManyField(
+        'leads.FrameworkTag',
+        through='VisitFramework',
+        related_name='visits',
+        blank=True,
+        help_text="Normalized from frameworks_discussed"
+    )
     confirmed_client_types = models.CharField(max_length=20, blank=True)
     infrastructure_discussed = models.CharField(max_length=20, blank=True)
     
@@ -104,3 +136,159 @@ class Visit(models.Model):
     
     def __str__(self):
         return f"Visit - {self.task.lead.company_name} - {self.task.scheduled_at}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__.get('frameworks_discussed')
+        # A copy, so in-place edits of the list still count as a change in save()
+        instance._loaded_frameworks = list(loaded) if loaded is not None else None
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if 'frameworks_discussed' not in self.get_deferred_fields() and \
+                self.frameworks_discussed != getattr(self, '_loaded_frameworks', None):
+            sync_framework_tags(self, self.frameworks_discussed, VisitFramework, 'visit')
+            self._loaded_frameworks = list(self.frameworks_discussed)
+
+
+class VisitFramework(models.Model):
+    """
+    Through-table linking visits to the frameworks in ``Visit.frameworks_discussed``.
+    """
+    visit = models.ForeignKey(Visit, on_delete=models.CASCADE, related_name='framework_links')
+    tag = models.ForeignKey('leads.FrameworkTag', on_delete=models.CASCADE, related_name='visit_links')
+    
+    class Meta:
+        db_table = 'visit_frameworks'
+        unique_together = ['visit', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'visit']),
+        ]
+    
+    def __str__(self):
+        return f"{self.visit_id} - {self.tag_id}"
+
+
+class TaskTemplate(models.Model):
+    """
+    A recurring task, e.g. a WhatsApp check-in every Tuesday for 8 weeks.
+    
+    Occurrences are computed from the rule on demand (see tasks.recurrence)
+    and only stored as ``Task`` rows up to ``materialized_until``.
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+    
+    lead = models.ForeignKey('leads.Lead', on_delete=models.CASCADE, related_name='task_templates')
+    task_type = models.CharField(max_length=20, choices=Task.TASK_TYPE_CHOICES)
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='task_templates'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='created_task_templates'
+    )
+    
+    # Recurrence rule
+    starts_at = models.DateTimeField(help_text="First occurrence; later ones keep its local time of day")
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Every N days/weeks/months")
+    weekdays = models.JSONField(default=list, blank=True, help_text="For weekly rules: 0=Monday ... 6=Sunday")
+    count = models.PositiveIntegerField(null=True, blank=True, help_text="Stop after this many occurrences")
+    until = models.DateTimeField(null=True, blank=True, help_text="No occurrences after this")
+    
+    active = models.BooleanField(default=True)
+    materialized_until = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'task_templates'
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(fields=['active', 'materialized_until']),
+        ]
+    
+    def __str__(self):
+        return f"Every {self.interval} {self.frequency} {self.get_task_type_display()} - {self.lead_id}"
+
+
+class Reminder(models.Model):
+    """
+    A reminder for a planned task, delivered to its assignee in a digest
+    (see tasks.reminders). One row per task and scheduled time, so planning
+    the same task twice is a no-op and a rescheduled task gets a fresh one.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('claimed', 'Claimed by a worker'),
+        ('sent', 'Sent'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reminders')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reminders')
+    scheduled_for = models.DateTimeField(help_text="Task.scheduled_at when the reminder was planned")
+    due_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    claim = models.UUIDField(null=True, blank=True, help_text="Delivery attempt holding the reminder")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'reminders'
+        ordering = ['due_at']
+        unique_together = ['task', 'scheduled_for']
+        indexes = [
+            models.Index(fields=['status', 'due_at']),
+            models.Index(fields=['user', 'status', 'due_at']),
+            models.Index(fields=['claim']),
+        ]
+    
+    def __str__(self):
+        return f"Reminder for task {self.task_id} at {self.due_at}"
+
+
+class ArchivedTask(models.Model):
+    """
+    A task of an archived lead (see leads.archive). ``data`` holds the task
+    with its visit, visit framework links and reminders as serialized rows.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Id of the task")
+    lead = models.ForeignKey('leads.ArchivedLead', on_delete=models.CASCADE, related_name='tasks')
+    task_type = models.CharField(max_length=20, choices=Task.TASK_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    scheduled_at = models.DateTimeField()
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    
+    class Meta:
+        db_table = 'archived_tasks'
+        ordering = ['scheduled_at']
+        indexes = [
+            models.Index(fields=['scheduled_at', 'id']),
+            models.Index(fields=['assigned_to', 'scheduled_at']),
+            models.Index(fields=['lead', 'scheduled_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archived task {self.pk} - {self.scheduled_at}"
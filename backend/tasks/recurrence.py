@@ -0,0 +1,156 @@
+"""
+Recurring tasks.
+
+A ``TaskTemplate`` holds a recurrence rule instead of a row per occurrence.
+Occurrences are computed with ``dateutil.rrule`` in local time, so a 10:00
+check-in stays at 10:00 across DST changes, and are split at the template's
+``materialized_until``:
+
+* up to it they are ordinary ``Task`` rows (with ``template`` and
+  ``occurrence_at`` set), created in bulk as they come within
+  ``TASK_RECURRENCE_HORIZON_DAYS`` (by the hourly
+  ``materialize_recurring_tasks`` task and when a template is saved) or
+  when someone acts on one;
+* after it they are *virtual*: unsaved ``Task`` instances built on the fly
+  for calendar windows and never written.
+
+``(template, occurrence_at)`` is unique, so materializing an occurrence
+twice, or one that was since rescheduled, is a no-op.
+"""
+from datetime import timedelta
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+FREQUENCIES = {'daily': DAILY, 'weekly': WEEKLY, 'monthly': MONTHLY}
+
+
+def build_rule(template):
+    return rrule(
+        FREQUENCIES[template.frequency],
+        dtstart=timezone.localtime(template.starts_at),
+        interval=template.interval,
+        byweekday=template.weekdays or None,
+        count=template.count,
+        until=timezone.localtime(template.until) if template.until else None,
+    )
+
+
+def occurrences(template, after, until):
+    """Occurrence times of ``template`` in ``(after, until]``; ``after`` may be None."""
+    start = timezone.localtime(after or template.starts_at)
+    return [
+        when for when in build_rule(template).between(start, timezone.localtime(until), inc=True)
+        if after is None or when > after
+    ]
+
+
+def is_occurrence(template, when):
+    when = timezone.localtime(when)
+    return bool(build_rule(template).between(when, when, inc=True))
+
+
+def default_horizon(now=None):
+    return (now or timezone.now()) + timedelta(days=settings.TASK_RECURRENCE_HORIZON_DAYS)
+
+
+def _occurrence_task(template, when):
+    from .models import Task
+
+    return Task(
+        template=template,
+        occurrence_at=when,
+        scheduled_at=when,
+        lead_id=template.lead_id,
+        task_type=template.task_type,
+        assigned_to_id=template.assigned_to_id,
+        status='planned',
+    )
+
+
+def materialize(template, until):
+    """Create the ``Task`` rows for occurrences up to ``until``. Returns how many."""
+    from .models import Task, TaskTemplate
+
+    if template.materialized_until and template.materialized_until >= until:
+        return 0
+    tasks = [_occurrence_task(template, when) for when in occurrences(template, template.materialized_until, until)]
+    Task.objects.bulk_create(tasks, batch_size=1000, ignore_conflicts=True)
+    TaskTemplate.objects.filter(pk=template.pk).update(materialized_until=until)
+    template.materialized_until = until
+    return len(tasks)
+
+
+def materialize_due(until=None):
+    """Materialize every active template up to ``until`` (default: the horizon)."""
+    from .models import TaskTemplate
+
+    until = until or default_horizon()
+    templates = TaskTemplate.objects.filter(active=True, lead__deleted_at__isnull=True).filter(
+        Q(materialized_until__isnull=True) | Q(materialized_until__lt=until)
+    )
+    return sum(materialize(template, until) for template in templates)
+
+
+def materialize_occurrence(template, when):
+    """
+    The ``Task`` row for one occurrence, created if it is still virtual. A
+    deleted occurrence is returned as it is, with ``deleted_at`` set.
+    """
+    from .models import Task
+
+    task, _ = Task.all_objects.get_or_create(
+        template=template,
+        occurrence_at=when,
+        defaults={
+            'scheduled_at': when,
+            'lead_id': template.lead_id,
+            'task_type': template.task_type,
+            'assigned_to_id': template.assigned_to_id,
+        },
+    )
+    return task
+
+
+def virtual_occurrences(templates, start, end):
+    """
+    Unsaved ``Task`` instances for the not yet materialized occurrences of
+    ``templates`` between ``start`` and ``end``, ordered by time.
+    """
+    from .models import Task
+
+    templates = list(templates.filter(active=True).select_related('lead', 'assigned_to'))
+    # Occurrences past the horizon that were materialized because someone acted on them (or deleted)
+    stored = set(
+        Task.all_objects.filter(template__in=templates, occurrence_at__gte=start, occurrence_at__lte=end)
+        .values_list('template_id', 'occurrence_at')
+    )
+    tasks = []
+    for template in templates:
+        after = max(filter(None, [template.materialized_until, start - timedelta(microseconds=1)]))
+        for when in occurrences(template, after, end):
+            if (template.pk, when) in stored:
+                continue
+            task = _occurrence_task(template, when)
+            task.lead = template.lead
+            task.assigned_to = template.assigned_to
+            tasks.append(task)
+    return sorted(tasks, key=lambda task: task.scheduled_at)
+
+
+def reset_future(template, now=None):
+    """
+    Drop planned occurrences after ``now`` so they are regenerated from the
+    template's current rule. Returns how many tasks were deleted.
+    """
+    from .models import Task, TaskTemplate
+
+    now = now or timezone.now()
+    deleted, _ = Task.all_objects.filter(template=template, status='planned', occurrence_at__gt=now).delete()
+    if template.materialized_until and template.materialized_until > now:
+        TaskTemplate.objects.filter(pk=template.pk).update(materialized_until=now)
+        template.materialized_until = now
+    return deleted
@@ -0,0 +1,195 @@
+"""
+Reminders for planned tasks, delivered to each assignee as a digest.
+
+There are no per-task timers. A periodic sweep (``tasks.tasks.dispatch_reminders``)
+
+1. plans a ``Reminder`` for every planned task starting within
+   ``REMINDER_LEAD_MINUTES`` + ``REMINDER_LOOKAHEAD_MINUTES``, read with a
+   range scan on the ``(status, scheduled_at)`` task index and copied into
+   the reminders table in one statement; the ``(task, scheduled_for)``
+   unique key makes re-planning a no-op,
+2. releases claims held by workers that died mid-delivery, and
+3. queues one ``send_reminder_digest`` job per assignee with reminders due.
+
+A worker claims the assignee's due reminders with a single ``UPDATE``, sends
+them as one digest through the configured channel and only then marks them
+sent. A crash between sending and marking leaves the claim to expire and the
+digest is sent again, so delivery is at-least-once; every digest carries a
+``key`` derived from its reminders so channels can drop repeats.
+"""
+import hashlib
+import json
+import sys
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection
+from django.db.models import DateTimeField, Exists, ExpressionWrapper, F, OuterRef, Value
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class ReminderChannel:
+    """Delivers digests. Sending the same digest ``key`` twice must be harmless."""
+
+    def send(self, digest):
+        raise NotImplementedError
+
+
+class ConsoleChannel(ReminderChannel):
+    """Writes digests to stdout; the local stand-in for a real channel."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, digest):
+        self.stream.write(format_digest(digest) + '\n')
+        self.stream.flush()
+
+
+class FileChannel(ReminderChannel):
+    """Appends digests as JSON lines to ``REMINDER_FILE``."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.REMINDER_FILE
+
+    def send(self, digest):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(digest, default=str) + '\n')
+
+
+class EmailChannel(ReminderChannel):
+    """Emails digests through Django's configured email backend."""
+
+    def send(self, digest):
+        if digest['user']['email']:
+            send_mail(
+                f"{len(digest['items'])} upcoming task(s)",
+                format_digest(digest),
+                None,
+                [digest['user']['email']],
+            )
+
+
+def get_channel():
+    return import_string(settings.REMINDER_CHANNEL)()
+
+
+def format_digest(digest):
+    lines = [f"Upcoming tasks for {digest['user']['name']}:"]
+    for item in digest['items']:
+        when = timezone.localtime(item['scheduled_at']).strftime('%d %b %H:%M')
+        lines.append(f"- {when} {item['task_type']} with {item['company_name']} ({item['phone']})")
+    return '\n'.join(lines)
+
+
+def plan_reminders(now=None):
+    """
+    Create reminders for planned tasks starting soon. Returns how many were new.
+
+    The rows are copied with one ``INSERT ... SELECT`` so no task is loaded
+    into Python; ``ON CONFLICT DO NOTHING`` (SQLite and PostgreSQL) skips
+    tasks a concurrent sweep already planned.
+    """
+    from .models import Reminder, Task
+
+    now = now or timezone.now()
+    lead = timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+    horizon = now + lead + timedelta(minutes=settings.REMINDER_LOOKAHEAD_MINUTES)
+    rows = Task.objects.filter(
+        status='planned', scheduled_at__gt=now, scheduled_at__lte=horizon, assigned_to__isnull=False
+    ).exclude(
+        Exists(Reminder.objects.filter(task=OuterRef('pk'), scheduled_for=OuterRef('scheduled_at')))
+    ).order_by().values_list(
+        'pk', 'assigned_to_id', 'scheduled_at',
+        ExpressionWrapper(F('scheduled_at') - lead, output_field=DateTimeField()),
+        Value('pending'),
+        Value(now, output_field=DateTimeField()),
+    )
+    select, params = rows.query.sql_with_params()
+    table = connection.ops.quote_name(Reminder._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (task_id, user_id, scheduled_for, due_at, status, created_at) '
+            f'{select} ON CONFLICT DO NOTHING',
+            params,
+        )
+        return cursor.rowcount
+
+
+def release_stale_claims(now=None):
+    """Put reminders claimed longer than ``REMINDER_CLAIM_TIMEOUT`` seconds back in the queue."""
+    from .models import Reminder
+
+    now = now or timezone.now()
+    return Reminder.objects.filter(
+        status='claimed', claimed_at__lt=now - timedelta(seconds=settings.REMINDER_CLAIM_TIMEOUT)
+    ).update(status='pending', claim=None, claimed_at=None)
+
+
+def due_assignees(now=None):
+    """Ids of users with pending reminders that are due."""
+    from .models import Reminder
+
+    now = now or timezone.now()
+    return list(
+        Reminder.objects.filter(status='pending', due_at__lte=now)
+        .order_by().values_list('user_id', flat=True).distinct()
+    )
+
+
+def digest_key(reminders):
+    keys = sorted(f'{r.task_id}:{r.scheduled_for.isoformat()}' for r in reminders)
+    return hashlib.sha1('|'.join(keys).encode()).hexdigest()
+
+
+def deliver_digest(user_id, channel=None, now=None):
+    """
+    Claim ``user_id``'s due reminders and send them as one digest.
+
+    Reminders whose task was completed, missed, moved or deleted in the
+    meantime are cancelled instead. Returns the number of reminders sent.
+    """
+    from .models import Reminder
+
+    now = now or timezone.now()
+    claim = uuid.uuid4()
+    if not Reminder.objects.filter(user_id=user_id, status='pending', due_at__lte=now).update(
+        status='claimed', claim=claim, claimed_at=now
+    ):
+        return 0
+
+    claimed = Reminder.objects.filter(claim=claim)
+    reminders = list(claimed.select_related('user', 'task__lead').order_by('scheduled_for'))
+    live = [
+        r for r in reminders
+        if r.task.status == 'planned' and r.task.scheduled_at == r.scheduled_for and r.task.deleted_at is None
+    ]
+    claimed.exclude(pk__in=[r.pk for r in live]).update(status='cancelled', claim=None)
+    if not live:
+        return 0
+
+    user = live[0].user
+    digest = {
+        'key': digest_key(live),
+        'user': {'id': user.pk, 'name': user.get_full_name() or user.username, 'email': user.email},
+        'items': [
+            {
+                'task': r.task_id,
+                'task_type': r.task.get_task_type_display(),
+                'scheduled_at': r.task.scheduled_at,
+                'lead': r.task.lead_id,
+                'company_name': r.task.lead.company_name,
+                'phone': r.task.lead.phone,
+            }
+            for r in live
+        ],
+    }
+    try:
+        (channel or get_channel()).send(digest)
+    except Exception:
+        claimed.update(status='pending', claim=None, claimed_at=None)
+        raise
+    return claimed.update(status='sent', sent_at=timezone.now())
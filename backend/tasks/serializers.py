@@ -1,10 +1,12 @@
 from rest_framework import serializers
-from .models import Task, Visit
-from leads.serializers import LeadSerializer
+from .models import Task, TaskTemplate, Visit
+from leads.serializers import LeadSerializer, validate_frameworks
+from users.models import User
 from users.serializers import UserSerializer
+from core.projection import ProjectionSerializerMixin
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for Task model."""
     lead_detail = LeadSerializer(source='lead', read_only=True)
     assigned_to_detail = UserSerializer(source='assigned_to', read_only=True)
@@ -14,12 +16,12 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'task_type', 'lead', 'lead_detail', 'scheduled_at',
             'assigned_to', 'assigned_to_detail', 'status', 'outcome_notes',
-            'next_action_required', 'created_at', 'updated_at'
+            'next_action_required', 'template', 'occurrence_at', 'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'template', 'occurrence_at', 'created_at', 'updated_at']
 
 
-class VisitSerializer(serializers.ModelSerializer):
+class VisitSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for Visit model."""
     task_detail = TaskSerializer(source='task', read_only=True)
     
@@ -36,9 +38,12 @@ class VisitSerializer(serializers.ModelSerializer):
             'deployment_roadmap', 'next_steps_agreed',
             'meeting_permitted', 'meeting_declined', 'decline_reason',
             'meeting_rescheduled', 'reschedule_reason', 'suggested_followup_date',
-            'created_at', 'updated_at'
+            'version', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_frameworks_discussed(self, value):
+        return validate_frameworks(value)
 
 
 class TaskCreateSerializer(serializers.ModelSerializer):
@@ -77,6 +82,9 @@ class VisitCreateSerializer(serializers.ModelSerializer):
             'meeting_rescheduled', 'reschedule_reason', 'suggested_followup_date',
         ]
     
+    def validate_frameworks_discussed(self, value):
+        return validate_frameworks(value)
+    
     def create(self, validated_data):
         task_data = validated_data.pop('task_data')
         task_data['task_type'] = 'visit'
@@ -86,3 +94,53 @@ class VisitCreateSerializer(serializers.ModelSerializer):
         
         visit = Visit.objects.create(task=task, **validated_data)
         return visit
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    """Serializer for rescheduling, reassigning or changing the status of many tasks."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=5000)
+    reschedule_by = serializers.DurationField(required=False, help_text="e.g. '2 00:00:00' or 'P2D'; may be negative")
+    assign_to = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(is_active=True), required=False)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    
+    def validate(self, attrs):
+        if not any(name in attrs for name in ('reschedule_by', 'assign_to', 'status')):
+            raise serializers.ValidationError('Pass at least one of reschedule_by, assign_to, status.')
+        return attrs
+
+
+class TaskTemplateSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
+    """Serializer for TaskTemplate model."""
+    lead_detail = LeadSerializer(source='lead', read_only=True)
+    assigned_to_detail = UserSerializer(source='assigned_to', read_only=True)
+    
+    class Meta:
+        model = TaskTemplate
+        fields = [
+            'id', 'lead', 'lead_detail', 'task_type', 'assigned_to', 'assigned_to_detail',
+            'starts_at', 'frequency', 'interval', 'weekdays', 'count', 'until', 'active',
+            'materialized_until', 'created_by', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'materialized_until', 'created_by', 'created_at', 'updated_at']
+    
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or any(not isinstance(day, int) or not 0 <= day <= 6 for day in value):
+            raise serializers.ValidationError('Must be a list of weekday numbers, 0 (Monday) to 6 (Sunday).')
+        return sorted(set(value))
+    
+    def validate_interval(self, value):
+        if value < 1:
+            raise serializers.ValidationError('Must be at least 1.')
+        return value
+    
+    def validate(self, attrs):
+        starts_at = attrs.get('starts_at', getattr(self.instance, 'starts_at', None))
+        until = attrs.get('until', getattr(self.instance, 'until', None))
+        if until and starts_at and until < starts_at:
+            raise serializers.ValidationError({'until': 'Must not be before starts_at.'})
+        return attrs
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    """Serializer naming one occurrence of a task template."""
+    occurrence_at = serializers.DateTimeField()
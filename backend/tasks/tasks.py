@@ -0,0 +1,30 @@
+from celery import shared_task
+from django.utils import timezone
+
+from .recurrence import materialize_due
+from .reminders import deliver_digest, due_assignees, plan_reminders, release_stale_claims
+
+
+@shared_task
+def dispatch_reminders():
+    """Plan reminders for upcoming tasks and queue one digest per assignee with reminders due."""
+    now = timezone.now()
+    planned = plan_reminders(now)
+    released = release_stale_claims(now)
+    users = due_assignees(now)
+    for user_id in users:
+        send_reminder_digest.delay(user_id)
+    return {'planned': planned, 'released': released, 'digests': len(users)}
+
+
+# Acknowledged only once delivered, so a digest lost with its worker is retried.
+@shared_task(acks_late=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
+def send_reminder_digest(user_id):
+    """Send ``user_id``'s due reminders as one digest."""
+    return deliver_digest(user_id)
+
+
+@shared_task
+def materialize_recurring_tasks():
+    """Create task rows for recurring-task occurrences coming within the horizon."""
+    return {'created': materialize_due()}
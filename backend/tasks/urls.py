@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet, VisitViewSet
+from .views import TaskViewSet, TaskTemplateViewSet, VisitViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'visits', VisitViewSet, basename='visit')
+router.register(r'templates', TaskTemplateViewSet, basename='task-template')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,28 +1,54 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import timedelta
-from .models import Task, Visit
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.duration import duration_string
+from datetime import datetime, time, timedelta
+from .bulk import bulk_update_tasks
+from .models import ArchivedTask, Task, TaskTemplate, Visit
+from .recurrence import (
+    default_horizon, is_occurrence, materialize, materialize_occurrence, reset_future,
+    virtual_occurrences
+)
+from .routes import plan_day
 from .serializers import (
-    TaskSerializer, TaskCreateSerializer, VisitSerializer, VisitCreateSerializer
+    TaskSerializer, TaskCreateSerializer, TaskBulkSerializer, VisitSerializer, VisitCreateSerializer,
+    TaskTemplateSerializer, OccurrenceSerializer
 )
+from leads.archive import ArchiveUnion, archived_tasks, flag_archived, include_archived
+from users.models import User
 from users.permissions import IsSalesExecutiveOrAbove, IsManagerOrAdmin
+from core.conditional import ConditionalRequestMixin
+from core.middleware import log_audit, log_bulk_audit
+from core.projection import ProjectionViewSetMixin
+from core.replicas import ReplicaReadMixin
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ReplicaReadMixin, ConditionalRequestMixin, ProjectionViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Task management.
     """
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    conditional_timestamp_fields = ['updated_at', 'lead__updated_at']
+    replica_actions = ('list', 'retrieve', 'calendar')
+    throttle_costs = {'calendar': 2, 'route': 5, 'bulk': 3}
+    filter_params = ('status', 'task_type', 'lead', 'date_from', 'date_to', 'today', 'overdue')
+    # Longest calendar window virtual occurrences are generated for
+    MAX_VIRTUAL_DAYS = 366
     
     def get_queryset(self):
+        return self.filter_tasks(Task.objects.select_related('lead', 'assigned_to'))
+    
+    def filter_tasks(self, queryset):
+        """Apply the list filters to ``queryset`` of ``Task`` or ``ArchivedTask``."""
         user = self.request.user
-        queryset = Task.objects.select_related('lead', 'assigned_to')
         
         # Sales executives see only their tasks
         if user.is_sales_executive():
@@ -67,6 +93,29 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        """With ``include_archived=true``, tasks of archived leads are listed too."""
+        if not include_archived(request):
+            return super().list(request, *args, **kwargs)
+        tasks = ArchiveUnion(
+            self.filter_queryset(self.get_queryset()),
+            self.filter_tasks(ArchivedTask.objects.all()),
+            ('scheduled_at', 'id'),
+            archived_tasks,
+        )
+        page = self.paginate_queryset(tasks)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(flag_archived(serializer.data, page))
+    
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get('pk', '')
+        if include_archived(request) and pk.isdigit():
+            archived = self.filter_tasks(ArchivedTask.objects.filter(pk=pk))
+            if archived.exists():
+                task = archived_tasks(archived)[0]
+                return Response(flag_archived([self.get_serializer(task).data], [task])[0])
+        return super().retrieve(request, *args, **kwargs)
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return TaskCreateSerializer
@@ -79,28 +128,76 @@ class TaskViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
     
+    def perform_destroy(self, instance):
+        """Hide the task; it can be undeleted for ``DELETE_UNDO_MINUTES`` (see leads.purge)."""
+        instance.soft_delete()
+        log_audit(
+            self.request.user, 'delete', instance,
+            ip_address=self.request.META.get('REMOTE_ADDR'),
+            user_agent=self.request.META.get('HTTP_USER_AGENT', '')[:255],
+        )
+    
+    @action(detail=True, methods=['post'])
+    def undelete(self, request, pk=None):
+        """Bring back a task deleted less than ``DELETE_UNDO_MINUTES`` ago."""
+        task = get_object_or_404(
+            self.filter_tasks(Task.all_objects.filter(deleted_at__isnull=False).select_related('lead')), pk=pk
+        )
+        if task.lead.deleted_at is not None:
+            return Response(
+                {'detail': "The task's lead is deleted; undelete the lead instead."},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not task.undelete():
+            return Response(
+                {'detail': 'This task was deleted too long ago to be undeleted.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        log_audit(
+            request.user, 'update', task,
+            changes={'undeleted': True},
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+        )
+        return Response(self.get_serializer(self.get_queryset().get(pk=task.pk)).data)
+    
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
-        """Mark task as completed and optionally create next action."""
+        """
+        Mark task as completed and optionally create next action.
+        
+        Pass the ``version`` the client last saw to get a 409 instead of
+        completing a task someone else changed in the meantime.
+        """
         task = self.get_object()
         outcome_notes = request.data.get('outcome_notes', '')
         next_action_required = request.data.get('next_action_required', False)
         next_action_data = request.data.get('next_action', None)
+        version = request.data.get('version')
+        if version is not None:
+            try:
+                task.version = int(version)
+            except (TypeError, ValueError):
+                raise serializers.ValidationError({'version': 'A valid integer is required.'})
         
-        task.status = 'completed'
-        task.outcome_notes = outcome_notes
-        task.next_action_required = next_action_required
-        task.save()
-        
-        # Create next action if required
-        if next_action_required and next_action_data:
-            next_task = Task.objects.create(
-                task_type=next_action_data.get('task_type', 'call'),
-                lead=task.lead,
-                scheduled_at=next_action_data.get('scheduled_at'),
-                assigned_to=task.assigned_to,
-                status='planned'
-            )
+        with transaction.atomic():
+            task.status = 'completed'
+            task.outcome_notes = outcome_notes
+            task.next_action_required = next_action_required
+            task.save()
+            
+            # Create next action if required
+            next_task = None
+            if next_action_required and next_action_data:
+                next_task = Task.objects.create(
+                    task_type=next_action_data.get('task_type', 'call'),
+                    lead=task.lead,
+                    scheduled_at=next_action_data.get('scheduled_at'),
+                    assigned_to=task.assigned_to,
+                    status='planned'
+                )
+        
+        if next_task is not None:
             serializer = self.get_serializer(next_task)
             return Response({
                 'task': self.get_serializer(task).data,
@@ -109,9 +206,55 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         return Response(self.get_serializer(task).data, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsManagerOrAdmin])
+    def bulk(self, request):
+        """
+        Reschedule, reassign or change the status of many tasks at once.
+        
+        The tasks are the ``ids`` in the body or, without ids, every task
+        matching the list filters in the query string (``?status=planned&
+        date_from=...``). Returns how many tasks each change affected.
+        """
+        serializer = TaskBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        queryset = self.get_queryset()
+        if 'ids' in data:
+            queryset = queryset.filter(pk__in=data['ids'])
+        elif not any(request.query_params.get(name) for name in self.filter_params):
+            return Response(
+                {'detail': 'Pass ids or at least one filter: ' + ', '.join(self.filter_params) + '.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        changes = {name: data[name] for name in ('reschedule_by', 'assign_to', 'status') if name in data}
+        ids, counts = bulk_update_tasks(Task.objects.filter(pk__in=queryset.values('pk')), **changes)
+        if ids:
+            audited = dict(changes)
+            if 'reschedule_by' in audited:
+                audited['reschedule_by'] = duration_string(audited['reschedule_by'])
+            if 'assign_to' in audited:
+                audited['assign_to'] = audited['assign_to'].pk
+            log_bulk_audit(
+                request.user, Task, ids,
+                changes=audited,
+                ip_address=request.META.get('REMOTE_ADDR'),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+            )
+        return Response(counts)
+    
     @action(detail=False, methods=['get'])
     def calendar(self, request):
-        """Get tasks in calendar format."""
+        """
+        Get tasks in calendar format.
+        
+        Occurrences of recurring tasks beyond the materialization horizon are
+        included with ``id: null``; act on one through
+        ``POST /api/tasks/templates/{template}/materialize/``. Reads never
+        materialize (they may run on the replica); the hourly beat task and
+        template saves do.
+        """
         queryset = self.get_queryset()
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
@@ -119,21 +262,145 @@ class TaskViewSet(viewsets.ModelViewSet):
         if date_from and date_to:
             queryset = queryset.filter(scheduled_at__gte=date_from, scheduled_at__lte=date_to)
         
-        serializer = self.get_serializer(queryset, many=True)
+        tasks = list(self.project_queryset(queryset))
+        start, end = _parse_bound(date_from), _parse_bound(date_to)
+        if start and end and request.query_params.get('status', 'planned') == 'planned':
+            end = min(end, start + timedelta(days=self.MAX_VIRTUAL_DAYS))
+            virtual = virtual_occurrences(self._templates(), start, end)
+            if virtual:
+                tasks = sorted(tasks + virtual, key=lambda task: task.scheduled_at)
+        
+        serializer = self.get_serializer(tasks, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def route(self, request):
+        """
+        Planned visits of ``user`` (default: you; sales executives get their own)
+        on ``date`` (default: today) in an order that minimises travel, with
+        nearby at-risk leads for the gaps. See tasks.routes.
+        """
+        user = request.user
+        user_id = request.query_params.get('user')
+        if user_id and not user.is_sales_executive():
+            if not user_id.isdigit():
+                return Response({'user': 'Must be a user id.'}, status=status.HTTP_400_BAD_REQUEST)
+            user = get_object_or_404(User, pk=user_id)
+        day = request.query_params.get('date')
+        try:
+            day = parse_date(day) if day else timezone.localdate()
+        except ValueError:
+            day = None
+        if day is None:
+            return Response({'date': 'Must be a date (YYYY-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(plan_day(user, day))
+    
+    def _templates(self):
+        """Templates whose occurrences the list filters would show."""
+        templates = TaskTemplate.objects.filter(lead__deleted_at__isnull=True)
+        if self.request.user.is_sales_executive():
+            templates = templates.filter(assigned_to=self.request.user)
+        for param, field in (('task_type', 'task_type'), ('lead', 'lead_id')):
+            value = self.request.query_params.get(param)
+            if value:
+                templates = templates.filter(**{field: value})
+        return templates
+
+
+def _parse_bound(value):
+    """A date or datetime query parameter as an aware datetime (dates at midnight), or None."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class TaskTemplateViewSet(ProjectionViewSetMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for recurring task templates (see tasks.recurrence).
+    
+    Changing a template's rule replaces its planned future occurrences;
+    deleting it removes them and keeps the ones already done.
+    """
+    serializer_class = TaskTemplateSerializer
+    permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    
+    def get_queryset(self):
+        user = self.request.user
+        queryset = TaskTemplate.objects.select_related('lead', 'assigned_to').filter(lead__deleted_at__isnull=True)
+        if user.is_sales_executive():
+            queryset = queryset.filter(assigned_to=user)
+        
+        lead_id = self.request.query_params.get('lead')
+        if lead_id:
+            queryset = queryset.filter(lead_id=lead_id)
+        return queryset
+    
+    @transaction.atomic
+    def perform_create(self, serializer):
+        if 'assigned_to' not in serializer.validated_data:
+            template = serializer.save(assigned_to=self.request.user, created_by=self.request.user)
+        else:
+            template = serializer.save(created_by=self.request.user)
+        if template.active:
+            materialize(template, default_horizon())
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        template = serializer.save()
+        reset_future(template)
+        if template.active:
+            materialize(template, default_horizon())
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        reset_future(instance)
+        instance.delete()
+    
+    @action(detail=True, methods=['post'])
+    def materialize(self, request, pk=None):
+        """Create (or return) the task for the occurrence at ``occurrence_at``."""
+        template = self.get_object()
+        serializer = OccurrenceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        when = serializer.validated_data['occurrence_at']
+        if not is_occurrence(template, when):
+            return Response(
+                {'occurrence_at': 'Not an occurrence of this template.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        task = materialize_occurrence(template, when)
+        if task.deleted_at is not None:
+            return Response(
+                {'occurrence_at': 'This occurrence was deleted.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(TaskSerializer(task, context=self.get_serializer_context()).data)
 
 
-class VisitViewSet(viewsets.ModelViewSet):
+class VisitViewSet(ReplicaReadMixin, ConditionalRequestMixin, ProjectionViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Visit management.
     """
     queryset = Visit.objects.all()
     serializer_class = VisitSerializer
     permission_classes = [IsAuthenticated, IsSalesExecutiveOrAbove]
+    conditional_timestamp_fields = ['updated_at', 'task__updated_at', 'task__lead__updated_at']
+    replica_actions = ('list', 'retrieve')
     
     def get_queryset(self):
         user = self.request.user
-        queryset = Visit.objects.select_related('task', 'task__lead', 'task__assigned_to')
+        queryset = Visit.objects.select_related('task', 'task__lead', 'task__assigned_to').filter(
+            task__deleted_at__isnull=True
+        )
         
         if user.is_sales_executive():
             queryset = queryset.filter(task__assigned_to=user)
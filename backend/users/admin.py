@@ -8,7 +8,7 @@ class UserAdmin(BaseUserAdmin):
     list_display = ['username', 'email', 'first_name', 'last_name', 'role', 'city', 'is_active']
     list_filter = ['role', 'is_active', 'city']
     fieldsets = BaseUserAdmin.fieldsets + (
-        ('Kuberns CRM Info', {'fields': ('role', 'phone', 'city')}),
+        ('Kuberns CRM Info', {'fields': ('role', 'phone', 'city', 'assignment_weight')}),
     )
     add_fieldsets = BaseUserAdmin.add_fieldsets + (
         ('Kuberns CRM Info', {'fields': ('role', 'phone', 'city', 'email', 'first_name', 'last_name')}),
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='assignment_weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Share of auto-assigned leads relative to other reps; 0 opts out'),
+        ),
+    ]
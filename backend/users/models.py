@@ -15,6 +15,9 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='sales_executive')
     phone = models.CharField(max_length=15, blank=True)
     city = models.CharField(max_length=100, blank=True, help_text="Assigned city/territory")
+    assignment_weight = models.PositiveSmallIntegerField(
+        default=1, help_text="Share of auto-assigned leads relative to other reps; 0 opts out"
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -34,3 +37,10 @@ class User(AbstractUser):
     
     def is_admin_user(self):
         return self.role == 'admin'
+    
+    def get_territory(self):
+        """Territory of the user's assigned city, or ``None`` if it isn't a known city."""
+        from leads.cities import city_directory
+        
+        city = city_directory.resolve(self.city)
+        return city.territory if city else None
@@ -1,16 +1,19 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import User
+from core.projection import ProjectionSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProjectionSerializerMixin, serializers.ModelSerializer):
     """Serializer for User model."""
     role_display = serializers.CharField(source='get_role_display', read_only=True)
+    territory = serializers.SlugRelatedField(source='get_territory', slug_field='slug', read_only=True)
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 
-                  'role', 'role_display', 'phone', 'city', 'is_active', 'date_joined']
+                  'role', 'role_display', 'phone', 'city', 'territory', 'assignment_weight',
+                  'is_active', 'date_joined']
         read_only_fields = ['id', 'date_joined']
 
 
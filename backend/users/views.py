@@ -7,9 +7,10 @@ from rest_framework.authtoken.models import Token
 from .models import User
 from .serializers import UserSerializer, UserCreateSerializer, LoginSerializer
 from .permissions import IsManagerOrAdmin, IsAdminOrSelf
+from core.projection import ProjectionViewSetMixin
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ProjectionViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for User management.
     """
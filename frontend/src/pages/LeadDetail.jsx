@@ -1,5 +1,5 @@
 import { useParams, useNavigate } from 'react-router-dom'
-import { useQuery } from '@tanstack/react-query'
+import { useQuery, useInfiniteQuery } from '@tanstack/react-query'
 import { api } from '../services/api'
 import { ArrowLeft, Edit, Phone, Mail, MapPin } from 'lucide-react'
 import { format } from 'date-fns'
@@ -7,7 +7,6 @@ import { format } from 'date-fns'
 export default function LeadDetail() {
   const { id } = useParams()
   const navigate = useNavigate()
-  const queryClient = useQueryClient()
 
   const { data: lead, isLoading } = useQuery({
     queryKey: ['lead', id],
@@ -17,13 +16,63 @@ export default function LeadDetail() {
     },
   })
 
-  const { data: tasks } = useQuery({
-    queryKey: ['tasks', 'lead', id],
-    queryFn: async () => {
-      const res = await api.get(`/tasks/tasks/?lead=${id}`)
-      return res.data.results || res.data
+  const {
+    data: timeline,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
+    queryKey: ['timeline', 'lead', id],
+    queryFn: async ({ pageParam }) => {
+      const res = await api.get(pageParam || `/leads/leads/${id}/timeline/`)
+      return res.data
     },
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.next,
   })
+  const entries = timeline ? timeline.pages.flatMap((page) => page.results) : []
+
+  const describeEntry = (entry) => {
+    const data = entry.data
+    switch (entry.type) {
+      case 'task':
+        return {
+          title: data.task_type.replace('_', ' ').toUpperCase(),
+          detail: data.outcome_notes,
+          badge: data.status,
+        }
+      case 'visit':
+        return {
+          title: `VISIT NOTES${data.person_spoken_to ? ` - ${data.person_spoken_to}` : ''}`,
+          detail: data.deployment_pain_points,
+          badge: data.interest_level && `${data.interest_level} interest`,
+        }
+      case 'contact':
+        return { title: `CONTACT ADDED - ${data.name}`, detail: data.role }
+      case 'status':
+        return {
+          title: data.from_status
+            ? `STATUS: ${data.from_status.replace('_', ' ')} → ${data.to_status.replace('_', ' ')}`
+            : 'LEAD CREATED',
+          detail: data.changed_by__username && `by ${data.changed_by__username}`,
+        }
+      default:
+        return {
+          title: data.action.replace('_', ' ').toUpperCase(),
+          detail: data.user__username && `by ${data.user__username}`,
+        }
+    }
+  }
+
+  const getEntryColor = (type) => {
+    const colors = {
+      task: 'border-blue-500',
+      visit: 'border-green-500',
+      contact: 'border-purple-500',
+      status: 'border-yellow-500',
+    }
+    return colors[type] || 'border-gray-300'
+  }
 
   const getStatusColor = (status) => {
     const colors = {
@@ -144,35 +193,45 @@ export default function LeadDetail() {
           </div>
         </div>
         <div className="px-6 py-5">
-          {tasks && tasks.length > 0 ? (
+          {entries.length > 0 ? (
             <div className="space-y-4">
-              {tasks.map((task) => (
-                <div key={task.id} className="border-l-4 border-blue-500 pl-4 py-2">
-                  <div className="flex items-center justify-between">
-                    <div>
-                      <p className="text-sm font-medium text-gray-900">
-                        {task.task_type.replace('_', ' ').toUpperCase()}
-                      </p>
-                      <p className="text-xs text-gray-500">
-                        {format(new Date(task.scheduled_at), 'MMM d, yyyy h:mm a')}
-                      </p>
-                      {task.outcome_notes && (
-                        <p className="text-sm text-gray-700 mt-1">{task.outcome_notes}</p>
+              {entries.map((entry) => {
+                const { title, detail, badge } = describeEntry(entry)
+                return (
+                  <div key={`${entry.type}-${entry.id}`} className={`border-l-4 ${getEntryColor(entry.type)} pl-4 py-2`}>
+                    <div className="flex items-center justify-between">
+                      <div>
+                        <p className="text-sm font-medium text-gray-900">{title}</p>
+                        <p className="text-xs text-gray-500">
+                          {format(new Date(entry.timestamp), 'MMM d, yyyy h:mm a')}
+                        </p>
+                        {detail && <p className="text-sm text-gray-700 mt-1">{detail}</p>}
+                      </div>
+                      {badge && (
+                        <span className={`inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium ${
+                          badge === 'completed' ? 'bg-green-100 text-green-800' :
+                          badge === 'missed' ? 'bg-red-100 text-red-800' :
+                          'bg-yellow-100 text-yellow-800'
+                        }`}>
+                          {badge}
+                        </span>
                       )}
                     </div>
-                    <span className={`inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium ${
-                      task.status === 'completed' ? 'bg-green-100 text-green-800' :
-                      task.status === 'missed' ? 'bg-red-100 text-red-800' :
-                      'bg-yellow-100 text-yellow-800'
-                    }`}>
-                      {task.status}
-                    </span>
                   </div>
-                </div>
-              ))}
+                )
+              })}
+              {hasNextPage && (
+                <button
+                  onClick={() => fetchNextPage()}
+                  disabled={isFetchingNextPage}
+                  className="text-sm text-blue-600 hover:text-blue-800 disabled:opacity-50"
+                >
+                  {isFetchingNextPage ? 'Loading...' : 'Load older activity'}
+                </button>
+              )}
             </div>
           ) : (
-            <p className="text-sm text-gray-500">No tasks yet</p>
+            <p className="text-sm text-gray-500">No activity yet</p>
           )}
         </div>
       </div>
@@ -26,6 +26,7 @@ export default function LeadForm() {
     company_size: '',
     industry: '',
     city: '',
+    locality: '',
     state: '',
     phone: '',
     email: '',
@@ -52,6 +53,7 @@ export default function LeadForm() {
         company_size: lead.company_size || '',
         industry: lead.industry || '',
         city: lead.city || '',
+        locality: lead.locality || '',
         state: lead.state || '',
         phone: lead.phone || '',
         email: lead.email || '',
@@ -210,6 +212,19 @@ export default function LeadForm() {
               />
             </div>
 
+            <div>
+              <label className="block text-sm font-medium text-gray-700 mb-2">
+                Locality
+              </label>
+              <input
+                type="text"
+                name="locality"
+                value={formData.locality}
+                onChange={handleChange}
+                className="block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500"
+              />
+            </div>
+
             <div>
               <label className="block text-sm font-medium text-gray-700 mb-2">
                 State